@@ -2,8 +2,9 @@ import axios from "axios";
 
 const API = "http://127.0.0.1:8000";
 
-export const getHistory = async (store, product) => {
-  const res = await axios.get(`${API}/history/${store}/${product}`);
+// params (optional): { resolution: "day" | "week" | "month", start, end }
+export const getHistory = async (store, product, params = {}) => {
+  const res = await axios.get(`${API}/history/${store}/${product}`, { params });
   return res.data;
 };
 
@@ -31,10 +32,12 @@ export const predictWithContext = async (data) => {
   return res.data;
 };
 
-export const getBulkPrediction = async (storeId, predictionDate) => {
+// options (optional): { status, category, min_lost_revenue_risk, sort, order, limit, cursor }
+export const getBulkPrediction = async (storeId, predictionDate, options = {}) => {
   const res = await axios.post(`${API}/bulk_predict`, {
     store_id: storeId,
-    prediction_date: predictionDate
+    prediction_date: predictionDate,
+    ...options
   });
   return res.data;
 };
@@ -1,14 +1,59 @@
-from fastapi import FastAPI, Body, UploadFile, File, HTTPException
+from fastapi import FastAPI, Body, UploadFile, File, HTTPException, Request
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
 import joblib
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pathlib import Path
 import io
+import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from typing import Optional
 
-from features import create_features
+from features import create_features, FEATURES, TARGET
+from data_loader import (
+    HISTORY_PATH,
+    load_history,
+    clean_history,
+    encode_categoricals,
+    normalize_columns,
+    unseen_labels,
+)
+from scoring import ERROR_WINDOW, recent_window, score_latest
+from hierarchy import HierarchicalForecast
+from feature_store import OnlineFeatureStore
+from forest import FlatForest, model_fingerprint
+from inventory_math import predict_quantiles, quantile_columns, load_quantile_model
+from responses import FastJSONResponse, negotiate, table_response, document_response
+from config import (
+    STORE_MODEL_PARAMS,
+    FLAT_FOREST_MAX_ROWS,
+    BULK_CACHE_STORES,
+    BULK_PAGE_LIMIT,
+    BULK_PAGE_MAX_LIMIT,
+    TRAIN_CHUNK_ROWS,
+    SERVICE_QUANTILE,
+)
+from tuning import load_model_params
+from incremental import warm_start
+from external_memory import train_external_memory
+from training import load_featurized, encode_frame, time_split, fit_model
+from rollups import SeriesRollups, rollup_key, load_rollups
+from db_loader import HISTORY_SOURCE, history_source
+from profiling import RequestProfiler, span, exposition, EXPOSITION_MEDIA_TYPE
+from logs import setup_logging, get_logger, ErrorAggregator
+from drift import DriftMonitor, training_reference
+
+# =========================================================
+# 📝 LOGGING (queued, leveled; INVENTORY_LOG_LEVEL / _FORMAT)
+# =========================================================
+setup_logging()
+log = get_logger("api")
 
 # =========================================================
 # 📁 PATH SETUP
@@ -23,13 +68,77 @@ DATA_DIR = BASE_DIR / "data"
 model = joblib.load(MODEL_DIR / "demand_model.pkl")
 encoders = joblib.load(MODEL_DIR / "encoders.pkl")
 
+# Optional multi-quantile model (train.py --quantiles)
+quantile_model, quantile_warning = load_quantile_model(MODEL_DIR / "quantile_model.pkl", encoders)
+if quantile_warning:
+    log.warning(quantile_warning)
+
+# Demand band columns: P10 (low), P50 (median), service level (high)
+band_columns = quantile_columns(quantile_model, 0.1, 0.5, SERVICE_QUANTILE)
+if quantile_model is not None and band_columns is None:
+    log.warning("Quantile model lacks P10/P50/service-level alphas, using the error band",
+                extra={'service_quantile': SERVICE_QUANTILE})
+
+# Flattened copy of the served model for small requests (bit-identical
+# output): the train.py export when it matches demand_model.pkl
+_forest = {"model": model, "forest": FlatForest.for_model(model, MODEL_DIR / "demand_forest.npz")}
+
+
+def served_forest() -> FlatForest:
+    """
+    Flattened forest of the current `model`, re-flattened whenever the
+    model is replaced, so the two never disagree
+    """
+    if _forest["model"] is not model:
+        current = model
+        _forest["forest"], _forest["model"] = FlatForest.from_model(current), current
+    return _forest["forest"]
+
+
+def predict_log_demand(X: pd.DataFrame) -> np.ndarray:
+    """
+    model.predict for feature rows: the flattened forest for small
+    requests, XGBoost for large batches
+    """
+    with span("predict"):
+        if len(X) <= FLAT_FOREST_MAX_ROWS:
+            return served_forest().predict(X)
+        return model.predict(X)
+
+
+def predict_band(X: pd.DataFrame):
+    """
+    (low, median, high) weekly demand per row from one batched
+    quantile-model call, or None without a quantile model that has the
+    band alphas (callers then use the mean %-error band)
+    """
+    if band_columns is None:
+        return None
+    with span("predict"):
+        quantiles = predict_quantiles(quantile_model, X)
+    return tuple(quantiles[col] for col in band_columns)
+
+# =========================================================
+# 📚 HISTORY (typed, loaded once per version: CSV file or
+#    Postgres UploadedData, see INVENTORY_HISTORY_SOURCE)
+# =========================================================
+history_cache = history_source()
+
+# =========================================================
+# 📈 DRIFT MONITOR (uploads vs. the training distribution)
+# =========================================================
+drift_monitor = DriftMonitor.load(MODEL_DIR / "drift_reference.pkl", DATA_DIR / "drift_state.pkl")
+if drift_monitor.reference is None:
+    log.warning("No drift reference, /drift is inactive until the global model is retrained (or python drift.py runs)")
+
 # =========================================================
 # 🚀 FASTAPI APP
 # =========================================================
 app = FastAPI(
     title="Retail Weekly Demand & Inventory Intelligence API",
     description="XGBoost-based demand forecasting with explainability",
-    version="1.0"
+    version="1.0",
+    default_response_class=FastJSONResponse
 )
 
 # =========================================================
@@ -43,6 +152,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# =========================================================
+# ⏱ PROFILING (per-stage spans → /metrics, ?profile=1 stacks)
+# =========================================================
+app.add_middleware(RequestProfiler)
+
 # =========================================================
 # 📥 INPUT SCHEMAS
 # =========================================================
@@ -85,37 +199,135 @@ class ContextPredictionInput(BaseModel):
 
 
 # =========================================================
-# 🧠 FEATURE ORDER (MUST MATCH TRAINING)
+# 🗂 ONLINE FEATURE STORE (latest lags per store/product)
 # =========================================================
-FEATURES = [
-    'store_id','product_id','category','region',
-    'inventory_level','price','discount',
-    'competitor_pricing','holiday_promotion',
-    'seasonality','is_weekend','week','month',
-    'lag_7','lag_14','lag_30','lag_60',
-    'rolling_mean_7','rolling_mean_30'
-]
+_feature_store = {"store": None}
+
+
+def _known_series(df: pd.DataFrame) -> pd.Series:
+    return (
+        df['store_id'].astype(str).isin(encoders['store_id'].classes_) &
+        df['product_id'].astype(str).isin(encoders['product_id'].classes_)
+    )
+
+
+def get_feature_store() -> OnlineFeatureStore:
+    """
+    Feature store for the current history version (rebuilt only when the
+    file changed by something other than /upload_data)
+    """
+    hist = history_cache.get()
+    store = _feature_store["store"]
+
+    if store is None or store.version != history_cache.version:
+        rows = hist.loc[_known_series(hist), ['store_id', 'product_id', 'date', 'units_sold']]
+        store = OnlineFeatureStore.from_history(encode_categoricals(rows, encoders), encoders)
+        store.version = history_cache.version
+        _feature_store["store"] = store
+
+    return store
+
+
+def update_feature_store(new_rows: pd.DataFrame, version: int) -> bool:
+    """
+    Append uploaded rows in O(upload size); fall back to a lazy rebuild
+    when the upload rewrites dates that were already ingested
+    """
+    store = _feature_store["store"]
+    if store is None:
+        return False
+
+    rows = new_rows.loc[_known_series(new_rows), ['store_id', 'product_id', 'date', 'units_sold']]
+    rows = encode_categoricals(rows.dropna(), encoders)
+
+    if not store.is_append(rows):
+        return False
+
+    store.ingest(rows)
+    store.version = version
+    return True
+
 
 # =========================================================
 # 🛠 HELPER
 # =========================================================
+def series_history(store_code: int, product_code: int, end) -> pd.DataFrame:
+    """
+    Encoded history of one series up to `end`, for feature store lookups
+    of dates its buffer does not reach
+    """
+    with span("load"):
+        rows = history_cache.load(
+            store_id=encoders['store_id'].classes_[store_code],
+            product_id=encoders['product_id'].classes_[product_code],
+            end=end
+        )
+    return encode_categoricals(rows[['store_id', 'product_id', 'date', 'units_sold']], encoders)
+
+
 def prepare_single_row(df: pd.DataFrame) -> pd.DataFrame:
-    for col, le in encoders.items():
-        df[col] = le.transform(df[col].astype(str))
+    with span("encode"):
+        df = encode_categoricals(df, encoders)
 
-    df['lag_7'] = 0
-    df['lag_14'] = 0
-    df['lag_30'] = 0
-    df['lag_60'] = 0
-    df['rolling_mean_7'] = 0
-    df['rolling_mean_30'] = 0
+    with span("featurize"):
+        # Real lag / rolling features for the series: O(1) from the buffer,
+        # from the series' history for dates further back
+        lag_features = get_feature_store().lookup(
+            df['store_id'], df['product_id'], df['date'], history=series_history
+        )
+        for col, values in lag_features.items():
+            df[col] = values
 
-    df['week'] = df['date'].dt.isocalendar().week.astype(int)
-    df['month'] = df['date'].dt.month
-    df['is_weekend'] = df['date'].dt.weekday.isin([5, 6]).astype(int)
+        df['week'] = df['date'].dt.isocalendar().week.astype(int)
+        df['month'] = df['date'].dt.month
+        df['is_weekend'] = df['date'].dt.weekday.isin([5, 6]).astype(int)
 
     return df
 
+# =========================================================
+# 📈 HISTORY ROLLUPS (day / week / month per series)
+# =========================================================
+_rollups = {"version": None, "model": None, "rollups": None}
+
+
+def get_rollups() -> SeriesRollups:
+    """
+    Rollups for the current history file and model: loaded from next to
+    the dataset, or scored and built once
+    """
+    df = history_cache.get()
+
+    if _rollups["version"] != history_cache.version or _rollups["model"] is not model:
+        def build():
+            scored = create_features(encode_categoricals(df[_known_series(df)], encoders))
+            scored['predicted'] = np.expm1(predict_log_demand(scored[FEATURES]))
+            return SeriesRollups.build(scored)
+
+        key = rollup_key(history_cache.manifest(), model_fingerprint(model))
+        _rollups["rollups"], source = load_rollups(key, build)
+        _rollups["version"], _rollups["model"] = history_cache.version, model
+        log.info("History rollups ready", extra={'key': key, 'source': source})
+
+    return _rollups["rollups"]
+
+
+def series_rollup(store_id: str, product_id: str, resolution: str = "day",
+                  start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """
+    One series' rollup rows (empty for unknown stores/products)
+
+    Raises:
+        ValueError for an unknown resolution or an unparseable date
+    """
+    rollups = get_rollups()
+    try:
+        store_code = encoders['store_id'].transform([store_id])[0]
+        product_code = encoders['product_id'].transform([product_id])[0]
+    except ValueError:
+        store_code = product_code = -1
+
+    return rollups.series(resolution, store_code, product_code, start, end)
+
 # =========================================================
 # 1️⃣ BASIC PREDICTION
 # =========================================================
@@ -138,7 +350,7 @@ def predict(data: PredictInput):
     }])
 
     df = prepare_single_row(df)
-    weekly_demand = float(np.expm1(model.predict(df[FEATURES])[0]))
+    weekly_demand = float(np.expm1(predict_log_demand(df[FEATURES])[0]))
 
     return {
         "time_window": "Next 7 days",
@@ -155,35 +367,27 @@ def predict_with_context(
 
     target_date = pd.to_datetime(data.prediction_for_date)
 
-    hist = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-    hist.columns = hist.columns.str.lower().str.replace(" ", "_").str.replace("/", "_")
-    hist['date'] = pd.to_datetime(hist['date'])
+    # Error window and chart bins from the precomputed rollups
+    with span("load"):
+        hist = series_rollup(data.store_id, data.product_id, "day").tail(ERROR_WINDOW)
+        weeks = series_rollup(data.store_id, data.product_id, "week").tail(6)
+        months = series_rollup(data.store_id, data.product_id, "month").tail(3)
 
-    hist = hist[
-        (hist['store_id'] == data.store_id) &
-        (hist['product_id'] == data.product_id)
-    ]
+    with span("postprocess"):
+        hist = hist.rename(columns={'units_sold_7d': 'actual'})
 
-    for col, le in encoders.items():
-        hist[col] = le.transform(hist[col].astype(str))
+        hist['error_pct'] = abs(hist['predicted'] - hist['actual']) / hist['actual'] * 100
+        mean_error = hist['error_pct'].mean()
 
-    hist = create_features(hist)
+        # Time windows
+        last_7_days = hist.tail(7)[['date','predicted','actual']].copy()
+        last_7_days['date'] = last_7_days['date'].dt.strftime('%Y-%m-%d')
 
-    hist['predicted'] = np.expm1(model.predict(hist[FEATURES]))
-    hist['actual'] = hist['units_sold_7d']
+        last_6_weeks = weeks.rename(columns={'units_sold_7d': 'actual'})[['date','predicted','actual']].copy()
+        last_6_weeks['date'] = last_6_weeks['date'].dt.strftime('%Y-%m-%d')
 
-    hist['error_pct'] = abs(hist['predicted'] - hist['actual']) / hist['actual'] * 100
-    mean_error = hist['error_pct'].tail(30).mean()
-
-    # Time windows
-    last_7_days = hist.sort_values("date").tail(7)[['date','predicted','actual']].copy()
-    last_7_days['date'] = last_7_days['date'].dt.strftime('%Y-%m-%d')
-    
-    last_6_weeks = hist.set_index("date").resample("W-SUN").mean().tail(6)[['predicted','actual']].copy()
-    last_6_weeks.index = last_6_weeks.index.strftime('%Y-%m-%d')
-    
-    last_3_months = hist.set_index("date").resample("ME").mean().tail(3)[['predicted','actual']].copy()
-    last_3_months.index = last_3_months.index.strftime('%Y-%m-%d')
+        last_3_months = months.rename(columns={'units_sold_7d': 'actual'})[['date','predicted','actual']].copy()
+        last_3_months['date'] = last_3_months['date'].dt.strftime('%Y-%m-%d')
 
     # Prediction input
     input_df = pd.DataFrame([{
@@ -202,15 +406,23 @@ def predict_with_context(
     }])
 
     input_df = prepare_single_row(input_df)
-    prediction = float(np.expm1(model.predict(input_df[FEATURES])[0]))
+    prediction = float(np.expm1(predict_log_demand(input_df[FEATURES])[0]))
+    band = predict_band(input_df[FEATURES])
 
     # Calculate stock recommendations
     current_stock = data.inventory_level
     predicted_demand = round(prediction, 2)
     
-    # With error margin (conservative estimate)
-    low_estimate = round(prediction * (1 - mean_error/100), 2)
-    high_estimate = round(prediction * (1 + mean_error/100), 2)
+    if band is not None:
+        # Service-level quantiles; safety stock is their spread above the median
+        low_estimate = round(float(band[0][0]), 2)
+        high_estimate = round(float(band[2][0]), 2)
+        safety_stock = max(float(band[2][0]) - float(band[1][0]), 0)
+    else:
+        # With error margin (conservative estimate)
+        low_estimate = round(prediction * (1 - mean_error/100), 2)
+        high_estimate = round(prediction * (1 + mean_error/100), 2)
+        safety_stock = high_estimate - predicted_demand
     
     # Stock status
     shortage = max(predicted_demand - current_stock, 0)
@@ -287,7 +499,7 @@ def predict_with_context(
             "recommended_order_quantity": recommended_order,
             "shortage_units": round(shortage, 2),
             "surplus_units": round(surplus, 2),
-            "safety_stock_needed": round(high_estimate - predicted_demand, 2)
+            "safety_stock_needed": round(safety_stock, 2)
         },
         
         # Demand estimates with error margin
@@ -323,8 +535,8 @@ def predict_with_context(
         # Historical performance
         "performance_context": {
             "last_7_days": last_7_days.round(2).to_dict("records"),
-            "last_6_weeks": last_6_weeks.round(2).reset_index().to_dict("records"),
-            "last_3_months": last_3_months.round(2).reset_index().to_dict("records")
+            "last_6_weeks": last_6_weeks.round(2).to_dict("records"),
+            "last_3_months": last_3_months.round(2).to_dict("records")
         }
     }
 
@@ -332,70 +544,77 @@ def predict_with_context(
 # 3️⃣ HISTORY FOR GRAPHS
 # =========================================================
 @app.get("/history/{store_id}/{product_id}")
-def history(store_id: str, product_id: str):
-
-    df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-    df.columns = df.columns.str.lower().str.replace(" ", "_").str.replace("/", "_")
-    df['date'] = pd.to_datetime(df['date'])
-
-    df = df[
-        (df['store_id'] == store_id) &
-        (df['product_id'] == product_id)
-    ]
-
-    for col, le in encoders.items():
-        if col in df.columns:
-            df[col] = le.transform(df[col].astype(str))
+def history(
+    store_id: str,
+    product_id: str,
+    request: Request,
+    resolution: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    format: Optional[str] = None
+):
+    """
+    Actual vs predicted series, served from the precomputed rollups
+    e.g. /history/S001/P0001?resolution=week&start=2023-01-01&end=2023-12-31
+    resolution=day|week|month (week/month rows are bin means dated by the
+    bin's last day); start/end keep the bins overlapping that date range;
+    ?format=columnar|msgpack|arrow (or the Accept header) sends it column-wise
+    """
+    fmt = negotiate(request, format)
 
-    df = create_features(df)
-    df['predicted'] = np.expm1(model.predict(df[FEATURES]))
+    try:
+        with span("load"):
+            rows = series_rollup(store_id, product_id, resolution, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Convert date to string for JSON serialization
-    result_df = df.sort_values("date")[[
+    result_df = rows[[
         'date','units_sold_7d','predicted',
         'inventory_level','price','discount'
     ]].copy()
     
     result_df['date'] = result_df['date'].dt.strftime('%Y-%m-%d')
-    result_df['units_sold_7d'] = result_df['units_sold_7d'].round(2)
-    result_df['predicted'] = result_df['predicted'].round(2)
-    result_df['price'] = result_df['price'].round(2)
-    result_df['discount'] = result_df['discount'].round(2)
+    # float32 storage → float64 so rounded values serialize cleanly
+    rounded = ['units_sold_7d', 'predicted', 'price', 'discount']
+    if resolution != "day":
+        rounded.append('inventory_level')
+    for col in rounded:
+        result_df[col] = result_df[col].astype(np.float64).round(2)
     
-    return result_df.to_dict("records")
+    return table_response(result_df, fmt)
 
 # =========================================================
 # 4️⃣ FUTURE FORECAST
 # =========================================================
 @app.post("/forecast")
-def forecast(data: ForecastInput):
+def forecast(data: ForecastInput, request: Request, format: Optional[str] = None):
 
-    df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-    df.columns = df.columns.str.lower().str.replace(" ", "_").str.replace("/", "_")
-    df['date'] = pd.to_datetime(df['date'])
+    fmt = negotiate(request, format)
 
-    df = df[
-        (df['store_id'] == data.store_id) &
-        (df['product_id'] == data.product_id)
-    ]
+    with span("load"):
+        df = history_cache.load(store_id=data.store_id, product_id=data.product_id)
 
-    for col, le in encoders.items():
-        if col in df.columns:
-            df[col] = le.transform(df[col].astype(str))
-
-    df = create_features(df)
-    preds = np.expm1(model.predict(df[FEATURES]))
+    with span("encode"):
+        df = encode_categoricals(df, encoders)
+    with span("featurize"):
+        df = create_features(df)
 
     weeks = data.months * 4
-    future = preds[-weeks:]
+    future = np.expm1(predict_log_demand(recent_window(df, rows=weeks)[FEATURES]))
+
+    weeks_df = pd.DataFrame({
+        "week": np.arange(1, len(future) + 1),
+        "expected_demand": np.round(future.astype(np.float64), 2)
+    })
 
-    return [
+    return table_response(weeks_df, fmt, records=[
         {
             "week": i + 1,
             "expected_demand": round(float(v), 2)
         }
         for i, v in enumerate(future)
-    ]
+    ])
 
 # =========================================================
 # 5️⃣ PRODUCT LIST
@@ -403,8 +622,7 @@ def forecast(data: ForecastInput):
 @app.get("/products/{store_id}")
 def products(store_id: str):
 
-    df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-    df.columns = df.columns.str.lower().str.replace(" ", "_").str.replace("/", "_")
+    df = history_cache.get()
 
     products = (
         df[df['store_id'] == store_id]['product_id']
@@ -419,8 +637,7 @@ def products(store_id: str):
 # =========================================================
 @app.get("/stores")
 def get_stores():
-    df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-    df.columns = df.columns.str.lower().str.replace(" ", "_").str.replace("/", "_")
+    df = history_cache.get()
     
     stores = df['store_id'].unique().tolist()
     return {"stores": stores}
@@ -428,12 +645,370 @@ def get_stores():
 # =========================================================
 # 7️⃣ BULK PREDICTION FOR ALL PRODUCTS IN A STORE
 # =========================================================
+BREAKDOWN_HORIZONS = ('weekly', 'daily_average', 'monthly', 'quarterly')
+
+STATUS_PRIORITY = {"CRITICAL": 1, "LOW": 2, "ADEQUATE": 3, "EXCESS": 4}
+
+# Fields a bulk page can be sorted on (ties keep the priority order)
+BULK_SORT_FIELDS = (
+    'priority', 'lost_revenue_risk', 'shortage', 'recommended_order',
+    'predicted_demand', 'potential_revenue', 'current_stock', 'product_id'
+)
+BULK_PAGE_PARAMS = ('status', 'category', 'min_lost_revenue_risk', 'sort', 'order', 'limit', 'cursor')
+
+# Scored stores: (store, date, history version) → (model, predictions), newest last
+_bulk_cache = OrderedDict()
+# Sync endpoints run in the threadpool; guards every _bulk_cache access
+_bulk_lock = threading.Lock()
+
+
+def compact_predictions(predictions):
+    """
+    Bulk predictions column-wise: one array per field, demand_breakdown
+    flattened to <horizon>_<low|average|high> columns, and its constant
+    period/explanation texts sent once as a legend
+    """
+    columns = {}
+    for key in (predictions[0] if predictions else {}):
+        if key != "demand_breakdown":
+            columns[key] = [p[key] for p in predictions]
+
+    for horizon in BREAKDOWN_HORIZONS:
+        for stat in ("low", "average", "high"):
+            columns[f"{horizon}_{stat}"] = [p["demand_breakdown"][horizon][stat] for p in predictions]
+
+    legend = {
+        horizon: {
+            "period": predictions[0]["demand_breakdown"][horizon]["period"],
+            "explanation": predictions[0]["demand_breakdown"][horizon]["explanation"]
+        }
+        for horizon in BREAKDOWN_HORIZONS
+    } if predictions else {}
+
+    return columns, {"demand_breakdown_legend": legend}
+
+
+def bulk_entry(product_id, category, latest, predicted_demand, mean_error, recent, band=None):
+    """
+    One product's bulk prediction: interval, stock status, order
+    recommendation and demand breakdown
+
+    Args:
+        product_id, category: Original labels
+        latest: Newest history row of the product (unencoded)
+        predicted_demand: Weekly demand forecast for the target date
+        mean_error: Mean absolute % error over the error window
+        recent: Scored error-window rows ('date', 'predicted', 'actual')
+        band: Optional (low, median, high) demand quantiles; None uses
+            the mean %-error band
+    """
+    # float32 storage → 2-decimal currency value
+    price = round(float(latest['price']), 2)
+
+    # Calculate recommendations
+    current_stock = int(latest['inventory_level'])
+    if band is not None:
+        low_estimate = round(float(band[0]), 2)
+        high_estimate = round(float(band[2]), 2)
+    else:
+        low_estimate = round(predicted_demand * (1 - mean_error/100), 2)
+        high_estimate = round(predicted_demand * (1 + mean_error/100), 2)
+
+    shortage = max(predicted_demand - current_stock, 0)
+
+    # Determine status
+    if current_stock < low_estimate:
+        status = "CRITICAL"
+        recommended_order = round(high_estimate - current_stock + (high_estimate * 0.2))
+    elif current_stock < predicted_demand:
+        status = "LOW"
+        recommended_order = round(predicted_demand - current_stock + (predicted_demand * 0.15))
+    elif current_stock < high_estimate:
+        status = "ADEQUATE"
+        recommended_order = round(max(high_estimate - current_stock, 0))
+    else:
+        status = "EXCESS"
+        recommended_order = 0
+
+    # Historical performance (last 4 weeks)
+    last_4_weeks = recent.sort_values('date').tail(4)[['date', 'predicted', 'actual']].copy()
+    last_4_weeks['date'] = last_4_weeks['date'].dt.strftime('%Y-%m-%d')
+
+    # Weekly demand is already calculated
+    daily_demand = predicted_demand / 7  # Average per day
+
+    return {
+        "product_id": product_id,
+        "category": category,
+        "current_stock": current_stock,
+        "predicted_demand": round(predicted_demand, 2),
+        "low_estimate": low_estimate,
+        "high_estimate": high_estimate,
+        "recommended_order": int(recommended_order),
+        "shortage": round(shortage, 2),
+        "status": status,
+        "priority": STATUS_PRIORITY[status],
+        "confidence": f"{100 - mean_error:.1f}%",
+        "price": price,
+        "potential_revenue": round(predicted_demand * price, 2),
+        "lost_revenue_risk": round(shortage * price, 2),
+        "last_4_weeks": last_4_weeks.round(2).to_dict("records"),
+        "demand_breakdown": {
+            "weekly": {
+                "low": low_estimate,
+                "average": round(predicted_demand, 2),
+                "high": high_estimate,
+                "period": "Next 7 days",
+                "explanation": "Expected sales for the next week"
+            },
+            "daily_average": {
+                "low": round(low_estimate / 7, 2),
+                "average": round(daily_demand, 2),
+                "high": round(high_estimate / 7, 2),
+                "period": "Per day",
+                "explanation": "Average daily sales rate"
+            },
+            "monthly": {
+                "low": round(low_estimate * 4.33, 2),  # 30 days / 7 days
+                "average": round(predicted_demand * 4.33, 2),
+                "high": round(high_estimate * 4.33, 2),
+                "period": "Next 30 days",
+                "explanation": "Expected sales for the next month"
+            },
+            "quarterly": {
+                "low": round(low_estimate * 13, 2),  # ~3 months
+                "average": round(predicted_demand * 13, 2),
+                "high": round(high_estimate * 13, 2),
+                "period": "Next 90 days (3 months)",
+                "explanation": "Expected sales for the next quarter"
+            }
+        }
+    }
+
+
+def score_store(store_df: pd.DataFrame, target_date) -> list:
+    """
+    Bulk predictions for every product of a store, scored in one pass
+
+    The store is encoded and featurized once, the error windows of all
+    products go through the model in one batch and the target-date rows
+    in another (the per-product results are unchanged).
+
+    Returns:
+        Prediction dicts sorted by priority (product order within a priority)
+    """
+    store_id = str(store_df['store_id'].iloc[0]) if len(store_df) else None
+    errors = ErrorAggregator(log, "bulk_predict product", store_id=store_id)
+
+    with span("filter"):
+        known = _known_series(store_df)
+        for product_id in store_df.loc[~known, 'product_id'].unique():
+            errors.add(product_id, "unseen store/product label")
+        store_df = store_df[known]
+
+    if store_df.empty:
+        errors.flush()
+        return []
+
+    products = store_df['product_id'].unique()
+    codes = encoders['product_id'].transform(np.asarray(products, dtype=str))
+    log.debug("Scoring store", extra={'store_id': store_id, 'products': len(products)})
+
+    # Create features (full lookback), score only the error window
+    with span("encode"):
+        encoded = encode_categoricals(store_df.copy(), encoders)
+    with span("featurize"):
+        window = recent_window(create_features(encoded), rows=ERROR_WINDOW)
+    window['predicted'] = np.expm1(predict_log_demand(window[FEATURES]))
+
+    with span("postprocess"):
+        window['actual'] = window['units_sold_7d'].astype(np.float64)
+        window['error_pct'] = abs(window['predicted'] - window['actual']) / window['actual'] * 100
+        windows = dict(tuple(window.groupby('product_id', sort=False)))
+
+    # Latest values (before encoding) → one prediction row per product
+    with span("filter"):
+        latest = store_df.sort_values('date').groupby('product_id', observed=True).tail(1)
+        latest = latest.set_index(latest['product_id'].astype(str)).loc[np.asarray(products, dtype=str)]
+        categories = store_df.groupby('product_id', observed=True, sort=False)['category'].first()
+
+        prediction_rows = latest[[
+            'store_id', 'product_id', 'category', 'region', 'weather_condition', 'seasonality',
+            'inventory_level', 'price', 'discount', 'competitor_pricing', 'holiday_promotion'
+        ]].reset_index(drop=True)
+        prediction_rows.insert(0, 'date', target_date)
+    prediction_rows = prepare_single_row(prediction_rows)
+    demand = np.expm1(predict_log_demand(prediction_rows[FEATURES]))
+    band = predict_band(prediction_rows[FEATURES])
+
+    with span("postprocess"):
+        predictions = []
+        for i, (product_id, code) in enumerate(zip(products, codes)):
+            # One failing product is skipped and summarized, not fatal
+            try:
+                recent = windows[code]
+                predictions.append(bulk_entry(
+                    product_id,
+                    categories[product_id],
+                    latest.iloc[i],
+                    float(demand[i]),
+                    recent['error_pct'].tail(ERROR_WINDOW).mean(),
+                    recent,
+                    tuple(values[i] for values in band) if band is not None else None
+                ))
+            except Exception as e:
+                errors.add(product_id, e)
+
+        # Sort by priority (critical first)
+        predictions.sort(key=lambda x: x['priority'])
+
+    errors.flush()
+    return predictions
+
+
+def store_predictions(store_id: str, prediction_date: str):
+    """
+    Scored predictions of a store, reused until the history file or the
+    model changes (the BULK_CACHE_STORES most recent requests are kept)
+
+    Returns:
+        (predictions, snapshot id) or (None, None) when the store has no data
+    """
+    key = (store_id, prediction_date, history_cache.version)
+    current = model
+    with _bulk_lock:
+        cached = _bulk_cache.get(key)
+        if cached is not None and cached[0] is current:
+            _bulk_cache.move_to_end(key)
+
+    if cached is None or cached[0] is not current:
+        # This store's rows (filtered in SQL for the Postgres source);
+        # scored outside the lock so other stores are not held up
+        with span("load"):
+            store_df = history_cache.load(store_id=store_id).copy()
+        if store_df.empty:
+            return None, None
+        log.debug("Store history loaded", extra={'store_id': store_id, 'records': len(store_df)})
+
+        cached = (current, score_store(store_df, pd.to_datetime(prediction_date)))
+        with _bulk_lock:
+            _bulk_cache[key] = cached
+            _bulk_cache.move_to_end(key)
+            while len(_bulk_cache) > BULK_CACHE_STORES:
+                _bulk_cache.popitem(last=False)
+
+    snapshot = f"{key[2]}:{id(cached[0])}"
+    return cached[1], snapshot
+
+
+def _as_set(value):
+    if value is None:
+        return None
+    values = value if isinstance(value, list) else str(value).split(",")
+    return {str(v).strip() for v in values if str(v).strip()}
+
+
+def page_predictions(predictions: list, data: dict, snapshot: str):
+    """
+    Filter, sort and slice bulk predictions
+
+    Body parameters (all optional):
+        status: "CRITICAL" / "CRITICAL,LOW" / ["CRITICAL", "LOW"]
+        category: one or more categories (same forms)
+        min_lost_revenue_risk: lowest lost_revenue_risk kept
+        sort: one of BULK_SORT_FIELDS (default priority)
+        order: asc | desc (default asc for priority/product_id, desc otherwise)
+        limit: page size (default BULK_PAGE_LIMIT, at most BULK_PAGE_MAX_LIMIT)
+        cursor: next_cursor of the previous page
+
+    Returns:
+        (page of predictions, page info)
+
+    Raises:
+        ValueError for invalid parameters or a cursor from another query or
+        an older snapshot of the data/model
+    """
+    statuses = _as_set(data.get("status"))
+    if statuses is not None:
+        statuses = {s.upper() for s in statuses}
+        unknown = statuses - set(STATUS_PRIORITY)
+        if unknown:
+            raise ValueError(f"Unknown status {sorted(unknown)}, use {list(STATUS_PRIORITY)}")
+
+    categories = _as_set(data.get("category"))
+    min_risk = data.get("min_lost_revenue_risk")
+    min_risk = float(min_risk) if min_risk is not None else None
+
+    sort = data.get("sort") or "priority"
+    if sort not in BULK_SORT_FIELDS:
+        raise ValueError(f"Unknown sort field '{sort}', use one of {list(BULK_SORT_FIELDS)}")
+    order = (data.get("order") or ("asc" if sort in ('priority', 'product_id') else "desc")).lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+
+    limit = int(data["limit"]) if data.get("limit") is not None else BULK_PAGE_LIMIT
+    if not 1 <= limit <= BULK_PAGE_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {BULK_PAGE_MAX_LIMIT}")
+
+    # A cursor is only valid for the same query over the same scored snapshot
+    query = hashlib.sha1(json.dumps([
+        data.get("store_id"), data.get("prediction_date"), sorted(statuses or []),
+        sorted(categories or []), min_risk, sort, order, snapshot
+    ]).encode()).hexdigest()[:16]
+
+    offset = 0
+    if data.get("cursor"):
+        try:
+            token = json.loads(base64.urlsafe_b64decode(str(data["cursor"]).encode()))
+            offset, token_query = int(token["offset"]), token["query"]
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if offset < 0:
+            raise ValueError("Invalid cursor")
+        if token_query != query:
+            raise ValueError("Cursor does not match this query or the data has changed; start from the first page")
+
+    matching = [
+        p for p in predictions
+        if (statuses is None or p['status'] in statuses)
+        and (categories is None or p['category'] in categories)
+        and (min_risk is None or p['lost_revenue_risk'] >= min_risk)
+    ]
+    if sort != 'priority' or order != 'asc':
+        matching.sort(key=lambda p: p[sort], reverse=(order == "desc"))
+
+    page = matching[offset:offset + limit]
+    next_offset = offset + len(page)
+    next_cursor = None
+    if next_offset < len(matching):
+        next_cursor = base64.urlsafe_b64encode(
+            json.dumps({"offset": next_offset, "query": query}).encode()
+        ).decode()
+
+    return page, {
+        "limit": limit,
+        "offset": offset,
+        "returned": len(page),
+        "total_matching": len(matching),
+        "sort": sort,
+        "order": order,
+        "next_cursor": next_cursor
+    }
+
+
 @app.post("/bulk_predict")
-def bulk_predict(data: dict):
+def bulk_predict(data: dict, request: Request, format: Optional[str] = None):
     """
     Get predictions for all products in a store for a specific date
     Input: { "store_id": "S001", "prediction_date": "2024-01-15" }
+    Optional: status, category, min_lost_revenue_risk, sort, order, limit,
+    cursor (see page_predictions) return one page of the matches plus a
+    "page" object; the summary always covers the whole store
+    ?format=columnar|msgpack|arrow (or the Accept header) sends the
+    predictions column-wise with the breakdown flattened
     """
+    fmt = negotiate(request, format)
+
     try:
         store_id = data.get("store_id")
         prediction_date = data.get("prediction_date")
@@ -441,177 +1016,18 @@ def bulk_predict(data: dict):
         if not store_id or not prediction_date:
             return {"error": "store_id and prediction_date are required"}
         
-        print(f"Processing bulk prediction for store: {store_id}, date: {prediction_date}")
-        
-        target_date = pd.to_datetime(prediction_date)
+        predictions, snapshot = store_predictions(store_id, prediction_date)
         
-        # Load data
-        df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-        df.columns = df.columns.str.lower().str.replace(" ", "_").str.replace("/", "_")
-        df['date'] = pd.to_datetime(df['date'])
-        
-        print(f"Loaded {len(df)} records from CSV")
-        
-        # Filter by store
-        store_df = df[df['store_id'] == store_id].copy()
-        
-        if store_df.empty:
+        if predictions is None:
             return {"error": f"No data found for store {store_id}"}
         
-        print(f"Found {len(store_df)} records for store {store_id}")
-        
-        # Get unique products
-        products = store_df['product_id'].unique()
-        print(f"Processing {len(products)} products")
-        
-        predictions = []
-        
-        for idx, product_id in enumerate(products):
-            try:
-                print(f"Processing product {idx+1}/{len(products)}: {product_id}")
-                
-                # Get product data
-                product_df = store_df[store_df['product_id'] == product_id].copy()
-                
-                # Get original category before encoding
-                original_category = product_df['category'].iloc[0]
-                
-                # Encode categoricals
-                for col, le in encoders.items():
-                    if col in product_df.columns:
-                        product_df[col] = le.transform(product_df[col].astype(str))
-                
-                # Create features
-                product_df = create_features(product_df)
-                
-                # Get predictions
-                product_df['predicted'] = np.expm1(model.predict(product_df[FEATURES]))
-                product_df['actual'] = product_df['units_sold_7d']
-                
-                # Calculate error
-                product_df['error_pct'] = abs(product_df['predicted'] - product_df['actual']) / product_df['actual'] * 100
-                mean_error = product_df['error_pct'].tail(30).mean()
-                
-                # Get latest values (before encoding)
-                latest_original = store_df[store_df['product_id'] == product_id].sort_values('date').tail(1).iloc[0]
-                
-                # Make prediction for target date
-                prediction_row = pd.DataFrame([{
-                    "date": target_date,
-                    "store_id": latest_original['store_id'],
-                    "product_id": latest_original['product_id'],
-                    "category": latest_original['category'],
-                    "region": latest_original['region'],
-                    "weather_condition": latest_original['weather_condition'],
-                    "seasonality": latest_original['seasonality'],
-                    "inventory_level": latest_original['inventory_level'],
-                    "price": latest_original['price'],
-                    "discount": latest_original['discount'],
-                    "competitor_pricing": latest_original['competitor_pricing'],
-                    "holiday_promotion": latest_original['holiday_promotion']
-                }])
-                
-                prediction_row = prepare_single_row(prediction_row)
-                predicted_demand = float(np.expm1(model.predict(prediction_row[FEATURES])[0]))
-                
-                # Calculate recommendations
-                current_stock = int(latest_original['inventory_level'])
-                low_estimate = round(predicted_demand * (1 - mean_error/100), 2)
-                high_estimate = round(predicted_demand * (1 + mean_error/100), 2)
-                
-                shortage = max(predicted_demand - current_stock, 0)
-                
-                # Determine status
-                if current_stock < low_estimate:
-                    status = "CRITICAL"
-                    priority = 1
-                    recommended_order = round(high_estimate - current_stock + (high_estimate * 0.2))
-                elif current_stock < predicted_demand:
-                    status = "LOW"
-                    priority = 2
-                    recommended_order = round(predicted_demand - current_stock + (predicted_demand * 0.15))
-                elif current_stock < high_estimate:
-                    status = "ADEQUATE"
-                    priority = 3
-                    recommended_order = round(max(high_estimate - current_stock, 0))
-                else:
-                    status = "EXCESS"
-                    priority = 4
-                    recommended_order = 0
-                
-                # Historical performance (last 4 weeks)
-                last_4_weeks = product_df.sort_values('date').tail(4)[['date', 'predicted', 'actual']].copy()
-                last_4_weeks['date'] = last_4_weeks['date'].dt.strftime('%Y-%m-%d')
-                
-                # Calculate projections
-                # Weekly demand is already calculated
-                daily_demand = predicted_demand / 7  # Average per day
-                
-                predictions.append({
-                    "product_id": product_id,
-                    "category": original_category,
-                    "current_stock": current_stock,
-                    "predicted_demand": round(predicted_demand, 2),
-                    "low_estimate": low_estimate,
-                    "high_estimate": high_estimate,
-                    "recommended_order": int(recommended_order),
-                    "shortage": round(shortage, 2),
-                    "status": status,
-                    "priority": priority,
-                    "confidence": f"{100 - mean_error:.1f}%",
-                    "price": float(latest_original['price']),
-                    "potential_revenue": round(predicted_demand * float(latest_original['price']), 2),
-                    "lost_revenue_risk": round(shortage * float(latest_original['price']), 2),
-                    "last_4_weeks": last_4_weeks.round(2).to_dict("records"),
-                    "demand_breakdown": {
-                        "weekly": {
-                            "low": low_estimate,
-                            "average": round(predicted_demand, 2),
-                            "high": high_estimate,
-                            "period": "Next 7 days",
-                            "explanation": "Expected sales for the next week"
-                        },
-                        "daily_average": {
-                            "low": round(low_estimate / 7, 2),
-                            "average": round(daily_demand, 2),
-                            "high": round(high_estimate / 7, 2),
-                            "period": "Per day",
-                            "explanation": "Average daily sales rate"
-                        },
-                        "monthly": {
-                            "low": round(low_estimate * 4.33, 2),  # 30 days / 7 days
-                            "average": round(predicted_demand * 4.33, 2),
-                            "high": round(high_estimate * 4.33, 2),
-                            "period": "Next 30 days",
-                            "explanation": "Expected sales for the next month"
-                        },
-                        "quarterly": {
-                            "low": round(low_estimate * 13, 2),  # ~3 months
-                            "average": round(predicted_demand * 13, 2),
-                            "high": round(high_estimate * 13, 2),
-                            "period": "Next 90 days (3 months)",
-                            "explanation": "Expected sales for the next quarter"
-                        }
-                    }
-                })
-                
-            except Exception as e:
-                print(f"Error processing product {product_id}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-        
-        print(f"Successfully processed {len(predictions)} products")
-        
-        # Sort by priority (critical first)
-        predictions.sort(key=lambda x: x['priority'])
-        
         # Calculate summary
-        total_products = len(predictions)
-        critical_count = sum(1 for p in predictions if p['status'] == 'CRITICAL')
-        low_count = sum(1 for p in predictions if p['status'] == 'LOW')
-        total_order_value = sum(p['recommended_order'] * p['price'] for p in predictions)
-        total_revenue_at_risk = sum(p['lost_revenue_risk'] for p in predictions)
+        with span("postprocess"):
+            total_products = len(predictions)
+            critical_count = sum(1 for p in predictions if p['status'] == 'CRITICAL')
+            low_count = sum(1 for p in predictions if p['status'] == 'LOW')
+            total_order_value = sum(p['recommended_order'] * p['price'] for p in predictions)
+            total_revenue_at_risk = sum(p['lost_revenue_risk'] for p in predictions)
         
         result = {
             "store_id": store_id,
@@ -629,13 +1045,21 @@ def bulk_predict(data: dict):
             "predictions": predictions
         }
         
-        print(f"Returning result with {total_products} products")
-        return result
+        if any(data.get(param) is not None for param in BULK_PAGE_PARAMS):
+            try:
+                with span("filter"):
+                    result["predictions"], result["page"] = page_predictions(predictions, data, snapshot)
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        log.debug("bulk_predict served", extra={
+            'store_id': store_id, 'prediction_date': prediction_date,
+            'products': total_products, 'returned': len(result['predictions'])
+        })
+        return document_response(result, fmt, "predictions", compact_predictions)
         
     except Exception as e:
-        print(f"Error in bulk_predict: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("bulk_predict failed", extra={'store_id': data.get("store_id")})
         return {"error": str(e)}
 
 
@@ -661,7 +1085,7 @@ async def upload_data(file: UploadFile = File(...)):
             return {"error": "File must be CSV or Excel format"}
         
         # Standardize column names
-        df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace("/", "_")
+        df.columns = normalize_columns(df.columns)
         
         # Validate required columns
         required_cols = ['date', 'store_id', 'product_id', 'category', 'region', 
@@ -680,18 +1104,44 @@ async def upload_data(file: UploadFile = File(...)):
         # Save to data directory with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         save_path = DATA_DIR / f"uploaded_{timestamp}.csv"
-        df.to_csv(save_path, index=False)
-        
-        # Also append to main data file
-        main_data_path = DATA_DIR / "retail_store_inventory.csv"
-        if main_data_path.exists():
-            existing_df = pd.read_csv(main_data_path)
-            existing_df.columns = existing_df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace("/", "_")
-            combined_df = pd.concat([existing_df, df], ignore_index=True)
-            combined_df = combined_df.drop_duplicates(subset=['date', 'store_id', 'product_id'], keep='last')
-            combined_df.to_csv(main_data_path, index=False)
+        df.to_csv(save_path, index=False, date_format='%Y-%m-%d')
+        
+        # Also append to main data file (Postgres source: the UploadedData table)
+        main_data_path = HISTORY_PATH
+        if HISTORY_SOURCE == 'postgres':
+            version = await history_cache.append(df)
         else:
-            df.to_csv(main_data_path, index=False)
+            if main_data_path.exists():
+                existing_df = pd.read_csv(main_data_path)
+                existing_df.columns = normalize_columns(existing_df.columns)
+                # Same dtype on both sides so duplicates match and one date format is written
+                existing_df['date'] = pd.to_datetime(existing_df['date'], errors='coerce')
+                combined_df = pd.concat([existing_df, df], ignore_index=True)
+                combined_df = combined_df.drop_duplicates(subset=['date', 'store_id', 'product_id'], keep='last')
+                # Re-uploaded days go back to their place: chunked readers
+                # (external-memory training, streaming evaluation) need
+                # each series' rows in date order
+                combined_df = combined_df.sort_values(['date', 'store_id', 'product_id'], kind='stable')
+                combined_df.to_csv(main_data_path, index=False, date_format='%Y-%m-%d')
+            else:
+                df.to_csv(main_data_path, index=False, date_format='%Y-%m-%d')
+            version = main_data_path.stat().st_mtime_ns
+        
+        # Keep the online feature store current
+        update_feature_store(df, version)
+        
+        # Fold the upload into the drift sketches (a failure here never fails the upload)
+        try:
+            drift_report = drift_monitor.update(df)
+        except Exception:
+            log.exception("Drift update failed", extra={'upload': file.filename})
+            drift_report = None
+        if drift_report is not None and drift_report['status'] == 'alert':
+            log.warning("Input drift against the training data", extra={
+                'drifted': ",".join(drift_report['since_reference']['drifted']),
+                'max_psi': drift_report['since_reference']['max_psi'],
+                'rate_key': ('drift', tuple(drift_report['since_reference']['drifted'])),
+            })
         
         return {
             "success": True,
@@ -706,106 +1156,139 @@ async def upload_data(file: UploadFile = File(...)):
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("upload_data failed", extra={'upload': file.filename})
         return {"error": str(e)}
 
 # =========================================================
 # 9️⃣ TRAIN MODEL PER STORE
 # =========================================================
+def serve_model(new_model, new_encoders=None, reference=None):
+    """
+    Serve a newly trained global model (and its encoders) from the next
+    request on; caches keyed on the model rebuild on first use
+
+    Args:
+        new_model: Global model to serve
+        new_encoders: Its label encoders, when they were refit
+        reference: DriftReference of its training rows; uploads are
+            compared against it only once the model itself is served
+    """
+    global model, encoders, quantile_model, band_columns
+
+    if new_encoders is not None and new_encoders is not encoders:
+        relabeled = any(
+            not np.array_equal(new_encoders[col].classes_, encoders[col].classes_)
+            for col in encoders if col in new_encoders
+        )
+        if relabeled and quantile_model is not None:
+            # Its splits are on the old label codes; quantile_model.pkl is
+            # refused on restart too (its encoder fingerprint no longer matches)
+            log.warning("Label encoding changed, quantile model disabled until retrained")
+            quantile_model, band_columns = None, None
+        encoders = new_encoders
+        # Indexed by encoded IDs
+        _feature_store["store"] = None
+
+    model = new_model
+
+    if reference is not None:
+        drift_monitor.set_reference(reference)
+
+
+def incremental_refresh(frame):
+    """
+    Warm-start the global model on the newest history
+
+    Args:
+        frame: Cleaned, featurized history (training.load_featurized)
+
+    Returns:
+        (accepted, report); when accepted, demand_model.pkl and the served
+        model are replaced
+    """
+    unseen = unseen_labels(frame, encoders)
+    if unseen:
+        return False, {'accepted': False, 'reason': f"unseen labels {unseen}"}
+
+    featurized, _ = encode_frame(frame, encoders)
+    updated, report = warm_start(featurized, model, FEATURES, TARGET)
+
+    if updated is not None:
+        serve_model(updated)
+        joblib.dump(updated, MODEL_DIR / "demand_model.pkl")
+        served_forest().save(MODEL_DIR / "demand_forest.npz")
+
+    return updated is not None, report
+
+
 @app.post("/train_model")
 def train_model(data: dict):
     """
     Train model for specific store or all stores
     Input: { "store_id": "S001" } or { "store_id": "all" }
+    Optional: "incremental": true (with "all") tries a warm-start refresh of
+    the global model first and falls back to a full retrain;
+    "external_memory": true trains the global model out of core from the
+    history file instead of a featurized in-memory copy
+
+    The cleaned, featurized history comes from the training engine's
+    content-addressed cache, so repeated calls on unchanged data go
+    straight to encoding and fit.
     """
     try:
-        from xgboost import XGBRegressor
-        from sklearn.preprocessing import LabelEncoder
         from sklearn.metrics import mean_absolute_error
         
         store_id = data.get("store_id", "all")
         
-        # Load data
-        df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-        df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace("/", "_")
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        # Out-of-core training streams the CSV file
+        if data.get("external_memory") and HISTORY_SOURCE != 'csv':
+            return {"error": "external_memory training needs INVENTORY_HISTORY_SOURCE=csv"}
         
-        # Clean data
-        df = df[df['units_sold'] >= 0]
-        df = df[df['price'] > 0]
-        df = df.dropna()
+        # Cleaned, featurized history (cached while the data is unchanged)
+        frame, cache_info = load_featurized(source=history_cache)
+        log.info("Featurized history", extra={'rows': len(frame), 'source': cache_info['source']})
+        
+        refresh = None
+        if store_id == "all" and data.get("incremental"):
+            accepted, refresh = incremental_refresh(frame)
+            if accepted:
+                log.info("Global model refreshed", extra={
+                    'trees_before': refresh['trees_before'], 'trees_after': refresh['trees_after'],
+                    'holdout_wape_change_pct': round(refresh['holdout_wape_change_pct'], 1)
+                })
+                return {
+                    "success": True,
+                    "mode": "incremental",
+                    "message": (
+                        f"Global model refreshed on recent data (holdout WAPE "
+                        f"{refresh['holdout_wape_change_pct']:+.1f}% relative, "
+                        f"tolerance +{refresh['tolerance_pct']:.1f}%)"
+                    ),
+                    "refresh": refresh
+                }
+            log.warning("Incremental refresh rejected, retraining fully", extra={'reason': refresh['reason']})
         
         results = []
         
         # Determine which stores to train
         if store_id == "all":
-            stores_to_train = df['store_id'].unique()
+            stores_to_train = frame['store_id'].unique()
         else:
             stores_to_train = [store_id]
         
         for current_store in stores_to_train:
-            print(f"\n🔄 Training model for store: {current_store}")
-            
-            # Filter data for this store
-            store_df = df[df['store_id'] == current_store].copy()
+            # This store's rows, encoded with encoders fit on them alone
+            store_df, store_encoders = encode_frame(frame, store_id=current_store)
             
             if len(store_df) < 100:
-                print(f"⚠️ Skipping {current_store}: Not enough data ({len(store_df)} records)")
+                log.warning("Skipping store: not enough data", extra={
+                    'store_id': current_store, 'records': len(store_df)
+                })
                 continue
             
-            # Encode categoricals
-            categorical_cols = ['store_id', 'product_id', 'category', 'region', 
-                              'weather_condition', 'seasonality']
-            
-            store_encoders = {}
-            for col in categorical_cols:
-                if col in store_df.columns:
-                    le = LabelEncoder()
-                    store_df[col] = le.fit_transform(store_df[col].astype(str))
-                    store_encoders[col] = le
-            
-            # Create features
-            store_df = create_features(store_df)
-            
-            # Features & Target
-            FEATURES = [
-                'store_id', 'product_id', 'category', 'region',
-                'inventory_level', 'price', 'discount',
-                'competitor_pricing', 'holiday_promotion',
-                'seasonality', 'is_weekend', 'week', 'month',
-                'lag_7', 'lag_14', 'lag_30', 'lag_60',
-                'rolling_mean_7', 'rolling_mean_30'
-            ]
-            
-            TARGET = 'log_units_sold_7d'
-            
-            # Time-safe split
-            split_date = store_df['date'].quantile(0.80)
-            
-            X_train = store_df[store_df['date'] <= split_date][FEATURES]
-            y_train = store_df[store_df['date'] <= split_date][TARGET]
-            
-            X_valid = store_df[store_df['date'] > split_date][FEATURES]
-            y_valid = store_df[store_df['date'] > split_date][TARGET]
-            
-            # Train model
-            store_model = XGBRegressor(
-                n_estimators=400,
-                max_depth=5,
-                learning_rate=0.05,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                min_child_weight=5,
-                gamma=0.2,
-                reg_alpha=0.5,
-                reg_lambda=1.5,
-                objective="reg:squarederror",
-                tree_method="hist",
-                random_state=42
-            )
-            
-            store_model.fit(X_train, y_train)
+            # Time-safe split & train
+            split_date, X_train, y_train, X_valid, y_valid = time_split(store_df)
+            store_model = fit_model(X_train, y_train, STORE_MODEL_PARAMS)
             
             # Evaluate
             preds = np.expm1(store_model.predict(X_valid))
@@ -820,80 +1303,72 @@ def train_model(data: dict):
             joblib.dump(store_model, MODEL_DIR / model_filename)
             joblib.dump(store_encoders, MODEL_DIR / encoder_filename)
             
-            print(f"✅ Model trained for {current_store}: MAE={mae:.2f}, Accuracy={accuracy:.1f}%")
+            log.info("Store model trained", extra={
+                'store_id': current_store, 'records': len(store_df),
+                'mae': round(float(mae), 2), 'accuracy': round(float(accuracy), 1)
+            })
             
             results.append({
                 "store_id": current_store,
                 "records": len(store_df),
-                "mae": round(mae, 2),
-                "accuracy": round(accuracy, 1),
+                "mae": round(float(mae), 2),
+                "accuracy": round(float(accuracy), 1),
                 "model_file": model_filename,
                 "encoder_file": encoder_filename
             })
         
         # Also train/update global model
         if store_id == "all":
-            print("\n🔄 Training global model...")
-            
-            # Use all data
-            global_df = df.copy()
-            
-            # Encode categoricals
-            global_encoders = {}
-            for col in categorical_cols:
-                if col in global_df.columns:
-                    le = LabelEncoder()
-                    global_df[col] = le.fit_transform(global_df[col].astype(str))
-                    global_encoders[col] = le
-            
-            # Create features
-            global_df = create_features(global_df)
-            
-            # Split
-            split_date = global_df['date'].quantile(0.80)
-            X_train = global_df[global_df['date'] <= split_date][FEATURES]
-            y_train = global_df[global_df['date'] <= split_date][TARGET]
-            X_valid = global_df[global_df['date'] > split_date][FEATURES]
-            y_valid = global_df[global_df['date'] > split_date][TARGET]
-            
-            # Train
-            global_model = XGBRegressor(
-                n_estimators=600,
-                max_depth=6,
-                learning_rate=0.05,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                min_child_weight=5,
-                gamma=0.2,
-                reg_alpha=0.5,
-                reg_lambda=1.5,
-                objective="reg:squarederror",
-                tree_method="hist",
-                random_state=42
-            )
-            
-            global_model.fit(X_train, y_train)
-            
-            # Evaluate
-            preds = np.expm1(global_model.predict(X_valid))
-            true = np.expm1(y_valid)
-            mae = mean_absolute_error(true, preds)
+            if data.get("external_memory"):
+                trained = train_external_memory(
+                    HISTORY_PATH, load_model_params()[0], FEATURES, TARGET
+                )
+                global_model, global_encoders = trained['model'], trained['encoders']
+                mae = trained['valid_metrics']['mae']
+                log.info("External-memory matrix built", extra={
+                    'scanned_rows': trained['scanned_rows'], 'matrix_rows': trained['matrix_rows'],
+                    'split_date': str(trained['split_date'])
+                })
+                reference = training_reference(
+                    lambda: (clean_history(chunk) for chunk in load_history(HISTORY_PATH, chunksize=TRAIN_CHUNK_ROWS)),
+                    trained['split_date']
+                )
+            else:
+                global_df, global_encoders = encode_frame(frame)
+                
+                split_date, X_train, y_train, X_valid, y_valid = time_split(global_df)
+                global_model = fit_model(X_train, y_train, load_model_params()[0])
+                
+                # Evaluate
+                preds = np.expm1(global_model.predict(X_valid))
+                true = np.expm1(y_valid)
+                mae = mean_absolute_error(true, preds)
+                reference = training_reference(lambda: [frame], split_date)
             
             # Save
             joblib.dump(global_model, MODEL_DIR / "demand_model.pkl")
             joblib.dump(global_encoders, MODEL_DIR / "encoders.pkl")
             
-            print(f"✅ Global model trained: MAE={mae:.2f}")
+            reference.save(MODEL_DIR / "drift_reference.pkl")
+            
+            # Served from the next request on, like an accepted incremental
+            # refresh; uploads are compared against its training period
+            serve_model(global_model, global_encoders, reference)
+            served_forest().save(MODEL_DIR / "demand_forest.npz")
+            
+            log.info("Global model trained", extra={
+                'mae': round(float(mae), 2), 'external_memory': bool(data.get("external_memory"))
+            })
         
         return {
             "success": True,
             "message": f"Training completed for {len(results)} store(s)",
-            "results": results
+            "results": results,
+            **({"mode": "full", "refresh": refresh} if refresh else {})
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("train_model failed", extra={'store_id': data.get("store_id")})
         return {"error": str(e)}
 
 # =========================================================
@@ -939,3 +1414,88 @@ def get_training_status():
         
     except Exception as e:
         return {"error": str(e)}
+
+# =========================================================
+# 1️⃣1️⃣ HIERARCHICAL AGGREGATES (SKU → CATEGORY → REGION → CHAIN)
+# =========================================================
+_hierarchy_cache = {"version": None, "model": None, "forecast": None}
+
+
+def get_hierarchy() -> HierarchicalForecast:
+    """
+    Batch-score every series once per data file version and model, and
+    cache the rollups (series with labels the encoders do not know are left out)
+    """
+    df = history_cache.get()
+    version = history_cache.version
+
+    if _hierarchy_cache["version"] != version or _hierarchy_cache["model"] is not model:
+        known = _known_series(df)
+        if not known.all():
+            log.warning("Aggregates skip unseen store/product labels", extra={'rows': int((~known).sum())})
+        sku_df = score_latest(df[known], model, encoders, FEATURES, quantile_model)
+        _hierarchy_cache["forecast"] = HierarchicalForecast(sku_df)
+        _hierarchy_cache["version"], _hierarchy_cache["model"] = version, model
+
+    return _hierarchy_cache["forecast"]
+
+
+@app.get("/aggregate")
+def aggregate(
+    level: str = "chain",
+    region: Optional[str] = None,
+    category: Optional[str] = None,
+    store_id: Optional[str] = None,
+    product_id: Optional[str] = None
+):
+    """
+    Weekly demand totals at a hierarchy level
+    e.g. /aggregate?level=region_category&region=North&category=Toys
+    """
+    forecast = get_hierarchy()
+
+    try:
+        nodes = forecast.rollup(
+            level,
+            region=region,
+            category=category,
+            store_id=store_id,
+            product_id=product_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "level": level,
+        "as_of": forecast.as_of.strftime('%Y-%m-%d') if forecast.as_of is not None else None,
+        "time_window": "Next 7 days",
+        "nodes": nodes.round(2).to_dict("records")
+    }
+
+
+# =========================================================
+# 1️⃣2️⃣ METRICS (Prometheus text format)
+# =========================================================
+@app.get("/metrics")
+def metrics():
+    """
+    Per-stage and per-request latency histograms of the API
+    (load, filter, encode, featurize, predict, postprocess, serialize)
+    """
+    return Response(exposition(), media_type=EXPOSITION_MEDIA_TYPE)
+
+# =========================================================
+# 1️⃣3️⃣ DRIFT & DATA QUALITY
+# =========================================================
+@app.get("/drift")
+def drift(scope: str = "all"):
+    """
+    Drift scores of the uploads against the training data, computed when
+    each upload arrived (PSI per feature, unseen labels, missing values,
+    zero-demand rate)
+    Optional: ?scope=last for the latest upload only
+    """
+    report = drift_monitor.report()
+    if scope == "last" and 'last_upload' in report:
+        return {key: value for key, value in report.items() if key != 'since_reference'}
+    return report
@@ -0,0 +1,441 @@
+"""
+Partitioned Batch Scoring
+Scores the history in store partitions on a worker pool, writes one reorder
+file per partition and merges them into reorder_recommendations.csv
+
+Each partition's input rows are fingerprinted in one streaming pass over
+the history; a partition is skipped when its fingerprint and the model
+version match the manifest from the previous run, so reruns only rescore
+what changed (and an interrupted run resumes where it stopped).
+
+Usage:
+    python batch_score.py --workers 4 --partition-size 2
+    python batch_score.py --window 30     # reorders from the last 30 rows per series
+    python batch_score.py --force          # rescore every partition
+    python batch_score.py --window --sync  # then push weekly forecasts to Postgres (sync.py)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import SERVICE_QUANTILE, SCORING_WINDOW_DAYS
+from data_loader import HISTORY_PATH, load_history, encode_categoricals
+from features import create_features, FEATURES
+from scoring import recent_window
+from inventory_math import (
+    calculate_inventory,
+    calculate_inventory_from_quantiles,
+    predict_quantiles,
+    quantile_columns,
+    load_quantile_model,
+)
+from metrics import MetricAccumulator, GroupedMetricAccumulator, print_metrics
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BASE_DIR / "models"
+DATA_DIR = BASE_DIR / "data"
+OUTPUT_DIR = DATA_DIR / "batch_scoring"
+MERGED_PATH = DATA_DIR / "reorder_recommendations.csv"
+FORECASTS_PATH = DATA_DIR / "weekly_forecasts.csv"
+
+MODEL_FILES = ["demand_model.pkl", "encoders.pkl", "quantile_model.pkl"]
+CHUNK_ROWS = 500_000
+
+REORDER_COLUMNS = [
+    'store_id',
+    'product_id',
+    'inventory_level',
+    'predicted_weekly_demand',
+    'reorder_point',
+    'order_quantity',
+    'stockout_risk'
+]
+
+# One row per series: the forecast for the 7 days after its last observed
+# day (the rows sync.py pushes to Postgres)
+FORECAST_COLUMNS = [
+    'store_id',
+    'product_id',
+    'category',
+    'region',
+    'week_start',
+    'inventory_level',
+    'price',
+    'predicted_weekly_demand',
+    'reorder_point',
+    'order_quantity',
+    'stockout_risk'
+]
+
+
+# =========================
+# Fingerprints
+# =========================
+def model_version(model_dir=MODEL_DIR):
+    """
+    Hash of the model artifacts, so any retrain invalidates every partition
+    """
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        path = Path(model_dir) / name
+        if path.exists():
+            digest.update(name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def store_fingerprints(path=HISTORY_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Content hash of each store's history rows, in one streaming pass
+
+    Returns:
+        Dictionary {store label: hex digest}
+    """
+    hashers = {}
+
+    for chunk in load_history(path, chunksize=chunk_rows):
+        row_hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        stores = chunk['store_id'].astype(str).to_numpy()
+
+        order = np.argsort(stores, kind='stable')
+        labels, starts = np.unique(stores[order], return_index=True)
+        for label, rows in zip(labels, np.split(order, starts[1:])):
+            hashers.setdefault(label, hashlib.sha256()).update(row_hashes[rows].tobytes())
+
+    return {label: hasher.hexdigest() for label, hasher in sorted(hashers.items())}
+
+
+def plan_partitions(fingerprints, partition_size):
+    """
+    Group the sorted stores into partitions of `partition_size` stores
+
+    Returns:
+        List of {'id', 'stores', 'input_hash'}
+    """
+    stores = sorted(fingerprints)
+    partitions = []
+
+    for i, start in enumerate(range(0, len(stores), partition_size)):
+        group = stores[start:start + partition_size]
+        digest = hashlib.sha256()
+        for store in group:
+            digest.update(f"{store}:{fingerprints[store]}".encode())
+
+        partitions.append({
+            'id': f"part_{i:04d}",
+            'stores': group,
+            'input_hash': digest.hexdigest()[:16],
+        })
+
+    return partitions
+
+
+# =========================
+# Scoring
+# =========================
+def score_frame(df, model, encoders, quantile_model=None, window=None):
+    """
+    Encode, featurize, predict and size inventory for a history frame
+    (the predict.py pipeline); with `window`, only the last `window` rows
+    of each series are predicted and sized
+
+    Returns:
+        Scored DataFrame with predictions and reorder columns
+    """
+    df = encode_categoricals(df, encoders)
+    df = recent_window(create_features(df), rows=window)
+    df['predicted_weekly_demand'] = np.expm1(model.predict(df[FEATURES]))
+
+    # Quantile inventory math needs the median and the service level
+    inventory_quantiles = quantile_columns(quantile_model, 0.5, SERVICE_QUANTILE)
+    if inventory_quantiles is not None:
+        for col, values in predict_quantiles(quantile_model, df[FEATURES]).items():
+            df[col] = values
+
+        median_col, service_col = inventory_quantiles
+        return calculate_inventory_from_quantiles(
+            df,
+            lead_time_weeks=1,
+            median_col=median_col,
+            service_col=service_col
+        )
+
+    return calculate_inventory(df, lead_time_weeks=1, service_level=1.65)
+
+
+def latest_forecasts(df, encoders):
+    """
+    Last scored row of every series with its labels decoded; week_start
+    is the Monday of the week its forecast period starts in, so reruns
+    within a week share the key
+    """
+    latest = df.groupby(['store_id', 'product_id'], sort=False).tail(1).copy()
+
+    for col in ('store_id', 'product_id', 'category', 'region'):
+        if col in encoders:
+            latest[col] = encoders[col].inverse_transform(latest[col].astype(int))
+
+    next_day = latest['date'] + pd.Timedelta(days=1)
+    latest['week_start'] = next_day.dt.to_period('W-SUN').dt.start_time.dt.strftime('%Y-%m-%d')
+
+    return latest[FORECAST_COLUMNS]
+
+
+def score_partition(partition, path, chunk_rows, output_dir, window=None):
+    """
+    Worker: load only this partition's stores, score them and write
+    reorder_<id>.csv, forecast_<id>.csv (latest week per series) plus
+    metrics_<id>.pkl (mergeable accumulators)
+
+    Memory is bounded by the partition's history, not the full file.
+    """
+    start = time.perf_counter()
+
+    model = joblib.load(MODEL_DIR / "demand_model.pkl")
+    encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+    quantile_model, _ = load_quantile_model(MODEL_DIR / "quantile_model.pkl", encoders)
+
+    stores = partition['stores']
+    df = pd.concat(
+        [chunk[chunk['store_id'].isin(stores)] for chunk in load_history(path, chunksize=chunk_rows)],
+        ignore_index=True
+    )
+
+    df = score_frame(df, model, encoders, quantile_model, window)
+
+    scored = df.dropna(subset=['units_sold_7d', 'predicted_weekly_demand'])
+    overall = MetricAccumulator().update(scored['units_sold_7d'], scored['predicted_weekly_demand'])
+    by_store = GroupedMetricAccumulator('store_id').update(
+        scored, actual_col='units_sold_7d', pred_col='predicted_weekly_demand'
+    )
+
+    reorder_table = df[df['stockout_risk'] == 1][REORDER_COLUMNS]
+
+    output_dir = Path(output_dir)
+    reorder_table.to_csv(output_dir / f"reorder_{partition['id']}.csv", index=False)
+    latest_forecasts(df, encoders).to_csv(output_dir / f"forecast_{partition['id']}.csv", index=False)
+    joblib.dump({'overall': overall, 'by_store': by_store}, output_dir / f"metrics_{partition['id']}.pkl")
+
+    return {
+        'rows': len(df),
+        'reorder_rows': len(reorder_table),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+# =========================
+# Manifest
+# =========================
+def load_manifest(output_dir):
+    path = Path(output_dir) / "manifest.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return {'partitions': {}}
+
+
+def save_manifest(manifest, output_dir):
+    # Write-then-rename so an interrupted run never leaves a torn manifest
+    path = Path(output_dir) / "manifest.json"
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, path)
+
+
+def is_current(entry, partition, version, window, output_dir):
+    return (
+        entry is not None
+        and entry.get('window') == window
+        and entry.get('stores') == partition['stores']
+        and entry.get('input_hash') == partition['input_hash']
+        and entry.get('model_version') == version
+        and (Path(output_dir) / f"reorder_{partition['id']}.csv").exists()
+        and (Path(output_dir) / f"forecast_{partition['id']}.csv").exists()
+        and (Path(output_dir) / f"metrics_{partition['id']}.pkl").exists()
+    )
+
+
+def concat_csv(paths, out_path):
+    """
+    Concatenate CSV files with the same header into out_path
+
+    Returns:
+        Data rows written
+    """
+    rows = 0
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(out_path, 'wb') as out:
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                for line in f:
+                    out.write(line)
+                    rows += 1
+
+    return rows
+
+
+def merge_outputs(partitions, output_dir, merged_path, forecasts_path=FORECASTS_PATH):
+    """
+    Concatenate the partition reorder and forecast files (in store order)
+    and merge the partition metric accumulators
+
+    Returns:
+        (reorder rows written, MetricAccumulator, GroupedMetricAccumulator)
+    """
+    output_dir = Path(output_dir)
+    overall = MetricAccumulator()
+    by_store = GroupedMetricAccumulator('store_id')
+
+    rows = concat_csv([output_dir / f"reorder_{p['id']}.csv" for p in partitions], merged_path)
+    concat_csv([output_dir / f"forecast_{p['id']}.csv" for p in partitions], forecasts_path)
+
+    for partition in partitions:
+        metrics = joblib.load(output_dir / f"metrics_{partition['id']}.pkl")
+        overall.merge(metrics['overall'])
+        by_store.merge(metrics['by_store'])
+
+    return rows, overall, by_store
+
+
+def run_batch(path=HISTORY_PATH, output_dir=OUTPUT_DIR, merged_path=MERGED_PATH,
+              partition_size=1, workers=1, chunk_rows=CHUNK_ROWS, force=False, window=None):
+    """
+    Score every stale partition and rebuild the merged reorder table
+
+    Returns:
+        The updated manifest
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    version = model_version()
+    print(f"\n🔑 Model version: {version}")
+
+    print(f"🔍 Fingerprinting {Path(path).name}...")
+    partitions = plan_partitions(store_fingerprints(path, chunk_rows), partition_size)
+
+    manifest = load_manifest(output_dir)
+    entries = manifest['partitions']
+
+    stale = [
+        p for p in partitions
+        if force or not is_current(entries.get(p['id']), p, version, window, output_dir)
+    ]
+    print(f"📦 {len(partitions)} partition(s): {len(stale)} to score, {len(partitions) - len(stale)} unchanged")
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(score_partition, p, path, chunk_rows, output_dir, window): p
+                for p in stale
+            }
+            for future in as_completed(futures):
+                partition = futures[future]
+                result = future.result()
+
+                entries[partition['id']] = {
+                    'stores': partition['stores'],
+                    'input_hash': partition['input_hash'],
+                    'model_version': version,
+                    'window': window,
+                    **result,
+                    'completed_at': datetime.now().isoformat(timespec='seconds'),
+                }
+                # Record each partition as soon as it lands (resumable)
+                save_manifest(manifest, output_dir)
+
+                print(f"   ✅ {partition['id']} ({', '.join(partition['stores'])}): "
+                      f"{result['rows']:,} rows, {result['reorder_rows']:,} reorders, {result['seconds']:.1f}s")
+
+    # Forget partitions that no longer exist (e.g. after re-partitioning)
+    current = {p['id'] for p in partitions}
+    for pid in [pid for pid in entries if pid not in current]:
+        del entries[pid]
+        for name in (f"reorder_{pid}.csv", f"forecast_{pid}.csv", f"metrics_{pid}.pkl"):
+            (output_dir / name).unlink(missing_ok=True)
+
+    manifest.update({
+        'history': str(path),
+        'model_version': version,
+        'partition_size': partition_size,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    })
+    save_manifest(manifest, output_dir)
+
+    rows, overall, by_store = merge_outputs(partitions, output_dir, merged_path)
+    manifest['merged_rows'] = rows
+    manifest['metrics'] = {'overall': overall, 'by_store': by_store}
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned, resumable batch scoring")
+    parser.add_argument("--partition-size", type=int, default=1, help="Stores per partition")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="CSV rows read per chunk")
+    parser.add_argument("--output-dir", default=str(OUTPUT_DIR), help="Partition outputs + manifest")
+    parser.add_argument("--merged", default=str(MERGED_PATH), help="Merged reorder table")
+    parser.add_argument("--force", action="store_true", help="Rescore every partition")
+    parser.add_argument("--window", type=int, nargs="?", const=SCORING_WINDOW_DAYS, default=None,
+                        help=f"Only predict the last N rows of each series (default {SCORING_WINDOW_DAYS})")
+    parser.add_argument("--sync", nargs="?", const="", default=None, metavar="URL",
+                        help="Push weekly_forecasts.csv to the Node sync API afterwards (default URL: sync.SYNC_URL)")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🏭 BATCH SCORING")
+    print("="*70)
+
+    quantile_model, quantile_warning = load_quantile_model(
+        MODEL_DIR / "quantile_model.pkl", joblib.load(MODEL_DIR / "encoders.pkl")
+    )
+    if quantile_warning:
+        print(f"⚠️  {quantile_warning}")
+    elif quantile_model is not None and quantile_columns(quantile_model, 0.5, SERVICE_QUANTILE) is None:
+        print(f"⚠️  Quantile model lacks P50/P{int(round(SERVICE_QUANTILE * 100))}: "
+              f"using the point forecast for inventory math")
+
+    start = time.perf_counter()
+    manifest = run_batch(
+        HISTORY_PATH, args.output_dir, args.merged,
+        args.partition_size, args.workers, args.chunk_rows, args.force, args.window
+    )
+
+    metrics = manifest.pop('metrics')
+    print_metrics(metrics['overall'].result(exclude_zeros=True), "BATCH PREDICTIONS PERFORMANCE")
+
+    encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+    store_metrics = metrics['by_store'].result(exclude_zeros=True)
+    store_metrics['store_id'] = encoders['store_id'].inverse_transform(store_metrics['store_id'].astype(int))
+
+    print(f"\n📍 WAPE ACCURACY BY STORE:")
+    for row in store_metrics.itertuples(index=False):
+        print(f"   Store {row.store_id}: {row.wape_accuracy:.2f}% ({row.total_records:,} records)")
+
+    print(f"\n✅ {manifest['merged_rows']:,} reorder rows → {args.merged}")
+    print(f"✅ Weekly forecasts → {FORECASTS_PATH}")
+
+    if args.sync is not None:
+        from sync import SYNC_URL, sync_forecasts, print_sync_report
+        print_sync_report(sync_forecasts(FORECASTS_PATH, args.sync or SYNC_URL))
+
+    print(f"⏱️  Finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
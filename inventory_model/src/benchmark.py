@@ -0,0 +1,373 @@
+"""
+Pipeline Benchmark Suite
+Times each pipeline stage and API endpoint on synthetic chain-scale data,
+recording wall time and peak RSS as machine-readable JSON
+
+Usage:
+    python benchmark.py --scales 10k,1m
+    python benchmark.py --scales 50m --stages load,encode,features,predict
+    python benchmark.py --scales 20x100x365 --compare ../benchmarks/results/<previous>.json
+
+Each scale runs in a fresh process so peak RSS is not polluted by earlier runs.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import SCALES, write_history
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = BASE_DIR / "benchmarks"
+BENCH_DATA_DIR = BENCH_DIR / "data"
+RESULTS_DIR = BENCH_DIR / "results"
+
+PIPELINE_STAGES = ['load', 'encode', 'features', 'train', 'predict', 'inventory', 'metrics', 'grouped_metrics']
+ENDPOINT_STAGE = 'endpoints'
+ALL_STAGES = PIPELINE_STAGES + [ENDPOINT_STAGE]
+
+REGRESSION_THRESHOLD = 1.20   # new/old time ratio flagged as a regression
+MB = 1024 * 1024
+
+
+def _rss_bytes():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    # Without psutil: lifetime peak (ru_maxrss is KB on Linux)
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageTimer:
+    """
+    Times a block and samples process RSS in a background thread
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = _rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._t0 = time.perf_counter()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, _rss_bytes())
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._t0
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, _rss_bytes())
+        return False
+
+
+def parse_scale(name):
+    """
+    '1m' → SCALES['1m'];  '20x100x365' → (20, 100, 365)
+    """
+    if name in SCALES:
+        return SCALES[name]
+
+    parts = name.lower().split('x')
+    if len(parts) != 3:
+        raise ValueError(f"Unknown scale '{name}'. Use {', '.join(SCALES)} or STORESxPRODUCTSxDAYS")
+
+    return tuple(int(p) for p in parts)
+
+
+def ensure_data(scale):
+    """
+    Generate (once) the synthetic CSV for a scale
+    """
+    stores, products, days = parse_scale(scale)
+    path = BENCH_DATA_DIR / f"synthetic_{stores}x{products}x{days}.csv"
+
+    if not path.exists():
+        print(f"\n🔧 Generating {stores * products * days:,} rows for scale {scale}...")
+        start = time.perf_counter()
+        write_history(path, stores, products, days)
+        print(f"   Done in {time.perf_counter() - start:.1f}s → {path.name}")
+
+    return path
+
+
+def run_scale(scale, data_path, stages, train_estimators, endpoint_repeats):
+    """
+    Run the pipeline once on one scale (inside a worker process)
+
+    Stages not selected still run when later stages need their output,
+    but are not recorded; an unselected 'train' is replaced by a small
+    untimed model fitted on a sample.
+
+    Returns:
+        List of result records
+    """
+    from xgboost import XGBRegressor
+
+    from data_loader import load_history, fit_encoders
+    from features import create_features, FEATURES, TARGET
+    from inventory_math import calculate_inventory
+    from metrics import calculate_all_metrics, calculate_grouped_metrics
+
+    records = []
+    rows = 0
+
+    def timed(stage, fn):
+        with StageTimer() as timer:
+            result = fn()
+
+        if stage in stages:
+            records.append({
+                'scale': scale,
+                'rows': rows,
+                'stage': stage,
+                'seconds': round(timer.seconds, 6),
+                'peak_rss_mb': round(timer.peak_rss / MB, 1),
+                'rss_delta_mb': round((timer.peak_rss - timer.start_rss) / MB, 1),
+            })
+            print(f"   {scale:<10} {stage:<34} {timer.seconds:>10.3f}s {timer.peak_rss / MB:>9.1f} MB")
+
+        return result
+
+    df = timed('load', lambda: load_history(data_path))
+    rows = len(df)
+    for record in records:
+        record['rows'] = rows
+
+    encoders = timed('encode', lambda: fit_encoders(df))
+    df = timed('features', lambda: create_features(df))
+
+    params = dict(
+        max_depth=6, learning_rate=0.05, subsample=0.8, colsample_bytree=0.8,
+        min_child_weight=5, gamma=0.2, reg_alpha=0.5, reg_lambda=1.5,
+        objective="reg:squarederror", tree_method="hist", random_state=42
+    )
+
+    if 'train' in stages:
+        model = XGBRegressor(n_estimators=train_estimators, **params)
+        timed('train', lambda: model.fit(df[FEATURES], df[TARGET]))
+    else:
+        sample = df.sample(min(len(df), 100_000), random_state=42)
+        model = XGBRegressor(n_estimators=20, **params)
+        model.fit(sample[FEATURES], sample[TARGET])
+
+    def predict():
+        df['predicted_weekly_demand'] = np.expm1(model.predict(df[FEATURES]))
+
+    timed('predict', predict)
+    timed('inventory', lambda: calculate_inventory(df, lead_time_weeks=1, service_level=1.65))
+    timed('metrics', lambda: calculate_all_metrics(
+        df['units_sold_7d'], df['predicted_weekly_demand'], exclude_zeros=True
+    ))
+    timed('grouped_metrics', lambda: calculate_grouped_metrics(
+        df, ['store_id', 'category'], actual_col='units_sold_7d',
+        pred_col='predicted_weekly_demand', exclude_zeros=True
+    ))
+
+    if ENDPOINT_STAGE in stages:
+        records.extend(run_endpoints(scale, rows, model, encoders, endpoint_repeats))
+
+    return records
+
+
+def endpoint_requests(encoders):
+    """
+    One representative request per endpoint, using labels present in the data
+    """
+    label = {col: str(le.classes_[0]) for col, le in encoders.items()}
+    store_id, product_id = label['store_id'], label['product_id']
+
+    row = {
+        "store_id": store_id,
+        "product_id": product_id,
+        "category": label['category'],
+        "region": label['region'],
+        "weather_condition": label['weather_condition'],
+        "seasonality": label['seasonality'],
+        "inventory_level": 200,
+        "price": 50.0,
+        "discount": 10.0,
+        "competitor_pricing": 52.0,
+        "holiday_promotion": 0,
+    }
+
+    return [
+        ("POST", "/predict", {**row, "date": "2024-01-15"}),
+        ("POST", "/predict_with_context", {**row, "prediction_for_date": "2024-01-15"}),
+        ("GET", f"/history/{store_id}/{product_id}", None),
+        ("POST", "/forecast", {"store_id": store_id, "product_id": product_id, "months": 3}),
+        ("POST", "/bulk_predict", {"store_id": store_id, "prediction_date": "2024-01-15"}),
+        ("GET", "/aggregate?level=region", None),
+    ]
+
+
+def run_endpoints(scale, rows, model, encoders, repeats):
+    """
+    Time each endpoint in-process: first (cold) call plus warm repeats
+    """
+    from fastapi.testclient import TestClient
+    import api
+
+    # Serve the benchmark model (trained on the synthetic labels); the
+    # flattened forest of small requests follows api.model
+    api.model = model
+    api.encoders = encoders
+    api.quantile_model = None
+
+    client = TestClient(api.app)
+    api.history_cache.get()
+
+    records = []
+    for method, url, body in endpoint_requests(encoders):
+        stage = f"endpoint {method} {url.split('?')[0]}"
+        timings = []
+
+        with StageTimer() as timer:
+            for _ in range(repeats + 1):
+                start = time.perf_counter()
+                response = client.request(method, url, json=body)
+                timings.append(time.perf_counter() - start)
+
+        warm = timings[1:] or timings
+        records.append({
+            'scale': scale,
+            'rows': rows,
+            'stage': stage,
+            'seconds': round(statistics.median(warm), 6),
+            'cold_seconds': round(timings[0], 6),
+            'max_seconds': round(max(warm), 6),
+            'repeats': len(warm),
+            'status': response.status_code,
+            'response_bytes': len(response.content),
+            'peak_rss_mb': round(timer.peak_rss / MB, 1),
+            'rss_delta_mb': round((timer.peak_rss - timer.start_rss) / MB, 1),
+        })
+        print(f"   {scale:<10} {stage:<34} {statistics.median(warm):>10.3f}s {timer.peak_rss / MB:>9.1f} MB")
+
+    return records
+
+
+def environment_info():
+    import pandas as pd
+    import xgboost
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=BASE_DIR, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def compare_results(current, previous_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Print new/old time ratios per (scale, stage); return the regressions
+    """
+    previous = json.loads(Path(previous_path).read_text())
+    baseline = {(r['scale'], r['stage']): r for r in previous['results']}
+
+    print(f"\n{'='*70}")
+    print(f"📊 COMPARISON vs {Path(previous_path).name}")
+    print(f"{'='*70}")
+    print(f"   {'Scale':<10} {'Stage':<34} {'Old':>9} {'New':>9} {'Ratio':>7}")
+
+    regressions = []
+    for record in current:
+        old = baseline.get((record['scale'], record['stage']))
+        if old is None or not old['seconds']:
+            continue
+
+        ratio = record['seconds'] / old['seconds']
+        flag = "  ❌" if ratio > threshold else ""
+        print(f"   {record['scale']:<10} {record['stage']:<34} {old['seconds']:>8.3f}s {record['seconds']:>8.3f}s {ratio:>6.2f}x{flag}")
+
+        if ratio > threshold:
+            regressions.append({**record, 'previous_seconds': old['seconds'], 'ratio': ratio})
+
+    print(f"\n   {len(regressions)} regression(s) above {threshold:.2f}x")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data and model pipeline")
+    parser.add_argument("--scales", default="10k,1m",
+                        help=f"Comma list of {', '.join(SCALES)} or STORESxPRODUCTSxDAYS")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES),
+                        help=f"Comma list of {', '.join(ALL_STAGES)}")
+    parser.add_argument("--train-estimators", type=int, default=100)
+    parser.add_argument("--endpoint-repeats", type=int, default=5)
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in ALL_STAGES]
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(unknown)}")
+
+    print(f"\n{'='*70}")
+    print(f"⏱️  PIPELINE BENCHMARK")
+    print(f"{'='*70}")
+
+    results = []
+    for scale in scales:
+        data_path = ensure_data(scale)
+
+        # The API reads its history path at import time in the worker
+        os.environ["INVENTORY_HISTORY_PATH"] = str(data_path)
+
+        print(f"\n   {'Scale':<10} {'Stage':<34} {'Time':>11} {'Peak RSS':>12}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.extend(pool.submit(
+                run_scale, scale, data_path, stages,
+                args.train_estimators, args.endpoint_repeats
+            ).result())
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({'meta': environment_info(), 'results': results}, indent=2))
+    print(f"\n💾 Results saved to: {output}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,3 +7,103 @@ Z_SCORE = 1.96          # 97.5% service level
 SUPPLIER_RISK = 1.2    # buffer for supplier delay
 
 RANDOM_STATE = 42
+
+# Quantile model (P10/P90 = interval bounds, P50 = median, P90 = service level)
+QUANTILE_ALPHAS = [0.1, 0.5, 0.9]
+SERVICE_QUANTILE = 0.9
+
+# Recent-window scoring: trailing rows per series the booster is run on
+# when only recent predictions feed the reorder table
+SCORING_WINDOW_DAYS = 30
+
+# XGBoost demand model (train.py --search writes tuned values to
+# models/best_params.json, which then takes precedence)
+MODEL_PARAMS = {
+    'n_estimators': 600,
+    'max_depth': 6,
+    'learning_rate': 0.05,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 5,
+    'gamma': 0.2,
+    'reg_alpha': 0.5,
+    'reg_lambda': 1.5,
+    'objective': "reg:squarederror",
+    'tree_method': "hist",
+    'random_state': RANDOM_STATE,
+}
+
+# Per-store models (/train_model) are smaller
+STORE_MODEL_PARAMS = {**MODEL_PARAMS, 'n_estimators': 400, 'max_depth': 5}
+
+# Hyperparameter search (rolling-origin CV)
+SEARCH_SPACE = {
+    'max_depth': [4, 5, 6, 8],
+    'learning_rate': [0.03, 0.05, 0.1],
+    'min_child_weight': [1, 5, 10],
+    'subsample': [0.7, 0.8, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+    'gamma': [0, 0.2, 1.0],
+    'reg_lambda': [0.5, 1.5, 5.0],
+}
+CV_FOLDS = 3
+CV_HORIZON_DAYS = 28
+MAX_BOOST_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+
+# Warm-start refresh (train.py --incremental, /train_model {"incremental": true})
+INCREMENTAL_WINDOW_DAYS = 90      # recent history the extra trees are fit on
+INCREMENTAL_HOLDOUT_DAYS = 7      # newest days held out for the guardrail
+INCREMENTAL_ROUNDS = 50           # trees added per refresh
+INCREMENTAL_WAPE_TOLERANCE = 0.02 # allowed relative holdout WAPE increase (2%)
+INCREMENTAL_MAX_TREES = 1500      # beyond this, retrain from scratch
+
+# Out-of-core training (train.py --external-memory)
+TRAIN_CHUNK_ROWS = 500_000        # CSV rows featurized per DataIter batch
+TRAIN_SPLIT_QUANTILE = 0.80       # time-safe split: dates up to this quantile train
+
+# Sampled experimental fits (train.py --sample): training-row fractions
+SAMPLE_RATES = (0.05, 0.10, 0.25, 0.50)
+
+# Serving: requests up to this many rows use the flattened forest
+# (forest.py); larger batches go through XGBoost, which is faster there
+FLAT_FOREST_MAX_ROWS = 64
+
+# /bulk_predict: scored stores kept in memory, and page sizes when a
+# request filters or paginates
+BULK_CACHE_STORES = 8
+BULK_PAGE_LIMIT = 50
+BULK_PAGE_MAX_LIMIT = 1000
+
+# Postgres sync (sync.py): forecast/reorder rows per request to the Node
+# server, each batch upserted in one transaction
+SYNC_BATCH_ROWS = 5000
+
+# Postgres history source (db_loader.py, INVENTORY_HISTORY_SOURCE=postgres):
+# pooled connections per API process, rows per server-side cursor fetch,
+# and how often the cached table's version is re-checked
+HISTORY_DB_POOL_MIN = 1
+HISTORY_DB_POOL_MAX = 8
+HISTORY_DB_FETCH_ROWS = 50_000
+HISTORY_DB_POLL_SECONDS = 5
+
+# Request profiling (profiling.py): stack sampling interval of ?profile=1
+# requests (CPython switches threads every 5 ms, so shorter intervals
+# mostly add samples of waiting threads)
+PROFILE_SAMPLE_SECONDS = 0.002
+
+# API logging (logs.py): repeated error summaries per key and window,
+# and sample item IDs listed per error type
+LOG_RATE_SECONDS = 10
+LOG_SAMPLE_KEYS = 5
+
+# Drift monitor (drift.py): quantile bins per numeric feature and the
+# fraction of training rows they are computed on; PSI thresholds (the
+# usual 0.1 moderate / 0.25 significant shift), the zero-demand rate
+# change that warns, and rows below which scores are flagged low_sample
+DRIFT_BINS = 10
+DRIFT_SAMPLE_FRAC = 0.05
+DRIFT_PSI_WARN = 0.10
+DRIFT_PSI_ALERT = 0.25
+DRIFT_ZERO_RATE_DELTA = 0.05
+DRIFT_MIN_ROWS = 500
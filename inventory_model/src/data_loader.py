@@ -0,0 +1,321 @@
+"""
+History Data Loader
+Typed, compact loading of the retail inventory history:
+categoricals for ID/label columns, int32/int8 counts, float32 metrics
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+HISTORY_PATH = Path(os.environ.get(
+    "INVENTORY_HISTORY_PATH", DATA_DIR / "retail_store_inventory.csv"
+))
+
+CATEGORICAL_COLUMNS = [
+    'store_id', 'product_id', 'category',
+    'region', 'weather_condition', 'seasonality'
+]
+
+# Loading schema (normalized column names)
+HISTORY_SCHEMA = {
+    'store_id': 'category',
+    'product_id': 'category',
+    'category': 'category',
+    'region': 'category',
+    'weather_condition': 'category',
+    'seasonality': 'category',
+    'inventory_level': 'int32',
+    'units_sold': 'int32',
+    'units_ordered': 'int32',
+    'demand_forecast': 'float32',
+    'price': 'float32',
+    'discount': 'float32',
+    'holiday_promotion': 'int8',
+    'competitor_pricing': 'float32',
+}
+
+
+def normalize_columns(columns):
+    """
+    'Store ID' → 'store_id', 'Holiday/Promotion' → 'holiday_promotion'
+    """
+    return (
+        pd.Index(columns).str.strip().str.lower()
+          .str.replace(" ", "_").str.replace("/", "_")
+    )
+
+
+def load_history(path=HISTORY_PATH, **read_csv_kwargs):
+    """
+    Load the history CSV with the compact schema
+
+    Integer columns are read as float32 first so rows with missing values
+    survive loading (train.py drops them afterwards); they are narrowed to
+    their integer dtype when complete.
+
+    Args:
+        path: CSV file
+        **read_csv_kwargs: Passed through to pd.read_csv (e.g. chunksize)
+
+    Returns:
+        DataFrame with normalized column names and a parsed 'date' column
+        (or an iterator of them when chunksize is given)
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    names = dict(zip(header, normalize_columns(header)))
+
+    dtype = {}
+    for raw, name in names.items():
+        kind = HISTORY_SCHEMA.get(name)
+        if kind is None:
+            continue
+        dtype[raw] = 'float32' if kind.startswith('int') else kind
+
+    reader = pd.read_csv(path, dtype=dtype, **read_csv_kwargs)
+
+    if read_csv_kwargs.get('chunksize'):
+        return (_finalize(chunk, names) for chunk in reader)
+
+    return _finalize(reader, names)
+
+
+def _finalize(df, names):
+    df = df.rename(columns=names)
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+
+    for col, kind in HISTORY_SCHEMA.items():
+        if kind.startswith('int') and col in df.columns and df[col].notna().all():
+            df[col] = df[col].astype(kind)
+
+    return df
+
+
+# Bump whenever clean_history keeps different rows: invalidates cached
+# featurized training frames (training.py)
+CLEAN_VERSION = 1
+
+
+def clean_history(df):
+    """
+    Drop negative sales, non-positive prices and incomplete rows
+    """
+    df = df[df['units_sold'] >= 0]
+    df = df[df['price'] > 0]
+    return df.dropna()
+
+
+def distinct_values(column, path=HISTORY_PATH):
+    """
+    Sorted distinct labels of one column, reading only that column
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    raw = dict(zip(normalize_columns(header), header))[column]
+    values = pd.read_csv(path, usecols=[raw], dtype={raw: 'category'})[raw]
+    return sorted(values.cat.categories.astype(str))
+
+
+def code_dtype(n_classes):
+    """
+    Smallest signed integer dtype that holds the encoded labels
+    """
+    if n_classes <= np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+def encode_categoricals(df, encoders):
+    """
+    Encode label columns in place with fitted LabelEncoders
+
+    Categorical columns are encoded per distinct label (not per row), and the
+    codes are stored as int16/int32. Unknown labels raise ValueError exactly
+    like LabelEncoder.transform.
+    """
+    for col, le in encoders.items():
+        if col not in df.columns:
+            continue
+
+        values = df[col]
+
+        if isinstance(values.dtype, pd.CategoricalDtype) and not values.isna().any():
+            codes = values.cat.codes.to_numpy()
+            used = np.unique(codes)
+            lookup = np.full(len(values.cat.categories), -1, dtype=np.int64)
+            lookup[used] = le.transform(values.cat.categories[used].astype(str))
+            encoded = lookup[codes]
+        else:
+            encoded = le.transform(values.astype(str))
+
+        df[col] = encoded.astype(code_dtype(len(le.classes_)))
+
+    return df
+
+
+def column_labels(values):
+    """
+    Distinct labels of one column as strings (NaN included as 'nan')
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        labels = list(values.cat.categories[np.unique(codes[codes >= 0])].astype(str))
+        if (codes < 0).any():
+            labels.append(str(np.nan))
+        return labels
+    return list(pd.unique(values.astype(str)))
+
+
+def unseen_labels(df, encoders):
+    """
+    Labels in df that the fitted encoders have never seen
+
+    Returns:
+        Dictionary {column: sorted unseen labels} (empty when all are known)
+    """
+    unseen = {}
+    for col, le in encoders.items():
+        if col not in df.columns:
+            continue
+        missing = sorted(set(column_labels(df[col])) - set(le.classes_))
+        if missing:
+            unseen[col] = missing
+
+    return unseen
+
+
+def fit_encoders(df, columns=CATEGORICAL_COLUMNS):
+    """
+    Fit one LabelEncoder per label column and encode df in place
+
+    Returns:
+        Dictionary {column: LabelEncoder}
+    """
+    encoders = encoders_from_labels({
+        col: column_labels(df[col]) for col in columns if col in df.columns
+    })
+    encode_categoricals(df, encoders)
+    return encoders
+
+
+def encoders_from_labels(labels):
+    """
+    LabelEncoders from label collections gathered elsewhere (e.g. chunk by
+    chunk), identical to fitting on the rows themselves
+
+    Args:
+        labels: Dictionary {column: iterable of string labels}
+
+    Returns:
+        Dictionary {column: LabelEncoder}
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    encoders = {}
+    for col, values in labels.items():
+        le = LabelEncoder()
+        le.fit(list(values))
+        encoders[col] = le
+
+    return encoders
+
+
+def memory_report(df, label="DataFrame"):
+    """
+    Print and return the deep memory usage of a frame, per column
+
+    Returns:
+        Dictionary with total MB, bytes per row and per-column MB
+    """
+    usage = df.memory_usage(deep=True, index=True)
+    total_mb = usage.sum() / (1024 * 1024)
+
+    report = {
+        'rows': len(df),
+        'total_mb': total_mb,
+        'bytes_per_row': usage.sum() / len(df) if len(df) else 0,
+        'columns': {
+            col: {'dtype': str(df[col].dtype), 'mb': usage[col] / (1024 * 1024)}
+            for col in df.columns
+        }
+    }
+
+    print(f"\n💾 MEMORY: {label}")
+    print(f"   Rows: {report['rows']:,}")
+    print(f"   Total: {total_mb:.2f} MB ({report['bytes_per_row']:.1f} bytes/row)")
+    for col, info in sorted(report['columns'].items(), key=lambda kv: -kv[1]['mb']):
+        print(f"   {col:<22} {info['dtype']:<12} {info['mb']:>8.2f} MB")
+
+    return report
+
+
+class HistoryCache:
+    """
+    Keeps one typed copy of the history in memory, reloading when the file changes
+
+    db_loader.PostgresHistory has the same interface for the UploadedData table.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = Path(path)
+        self.version = None
+        self.df = None
+
+    def get(self):
+        version = self.path.stat().st_mtime_ns
+        if version != self.version:
+            self.df = load_history(self.path)
+            self.version = version
+        return self.df
+
+    def load(self, store_id=None, product_id=None, start=None, end=None):
+        """
+        History rows matching the filters (a slice of the cached copy)
+
+        Args:
+            store_id, product_id: One label or a list of labels (None = all)
+            start, end: Inclusive date bounds (None = open)
+        """
+        df = self.get()
+        mask = pd.Series(True, index=df.index)
+
+        for col, value in (('store_id', store_id), ('product_id', product_id)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+                mask &= df[col].isin([str(v) for v in value])
+            else:
+                mask &= df[col] == value
+        if start is not None:
+            mask &= df['date'] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df['date'] <= pd.Timestamp(end)
+
+        return df[mask]
+
+    def manifest(self):
+        """
+        Content identity of the history file (training.data_manifest)
+        """
+        from training import data_manifest
+        return data_manifest(self.path)
+
+
+if __name__ == "__main__":
+    from features import create_features
+    import joblib
+
+    raw = pd.read_csv(HISTORY_PATH)
+    raw.columns = normalize_columns(raw.columns)
+    raw['date'] = pd.to_datetime(raw['date'], errors='coerce')
+    memory_report(raw, "untyped read_csv")
+
+    df = load_history()
+    memory_report(df, "typed history")
+
+    encoders = joblib.load(BASE_DIR / "models" / "encoders.pkl")
+    df = create_features(encode_categoricals(df, encoders))
+    memory_report(df, "encoded + featurized")
@@ -0,0 +1,357 @@
+"""
+Postgres History Loader
+The UploadedData table (server/prisma/schema.prisma) as a drop-in for the
+history CSV, so API instances can scale out without sharing a filesystem.
+
+PostgresHistory has the HistoryCache interface the API reads through
+(get() / version / load(...) / manifest()) and returns the same frame as
+load_history: normalized column names, categoricals for labels,
+int32/int8 counts, float32 metrics and a datetime64 'date'.
+
+- One asyncpg pool per process, owned by a background event loop, so
+  sync endpoints (thread pool) and async ones share the connections
+- Rows stream through a server-side cursor in HISTORY_DB_FETCH_ROWS
+  batches straight into typed NumPy columns (labels as int32 codes), never
+  as a list of row objects
+- store / product / date filters are pushed into the SQL WHERE clause,
+  served by the (storeId, productId, date, id) index
+- A (date, store, product) uploaded twice keeps the newest row, like the
+  drop_duplicates(keep='last') of the CSV append
+
+Select it with INVENTORY_HISTORY_SOURCE=postgres; the connection string is
+INVENTORY_DATABASE_URL (or DATABASE_URL, shared with the Node server).
+asyncpg is optional: the default CSV source does not need it.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+import pandas as pd
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from config import HISTORY_DB_POOL_MIN, HISTORY_DB_POOL_MAX, HISTORY_DB_FETCH_ROWS, HISTORY_DB_POLL_SECONDS
+from data_loader import HISTORY_PATH, HISTORY_SCHEMA, HistoryCache
+
+HISTORY_SOURCE = os.environ.get("INVENTORY_HISTORY_SOURCE", "csv").lower()
+DATABASE_URL = os.environ.get("INVENTORY_DATABASE_URL", os.environ.get("DATABASE_URL"))
+
+# (history column, UploadedData column), in the CSV's column order
+UPLOADED_COLUMNS = [
+    ('date', 'date'),
+    ('store_id', 'storeId'),
+    ('product_id', 'productId'),
+    ('category', 'category'),
+    ('region', 'region'),
+    ('inventory_level', 'inventoryLevel'),
+    ('units_sold', 'unitsSold'),
+    ('units_ordered', 'unitsOrdered'),
+    ('demand_forecast', 'demandForecast'),
+    ('price', 'price'),
+    ('discount', 'discount'),
+    ('weather_condition', 'weatherCondition'),
+    ('holiday_promotion', 'holidayPromotion'),
+    ('competitor_pricing', 'competitorPricing'),
+    ('seasonality', 'seasonality'),
+]
+
+SELECT_COLUMNS = ", ".join(f'"{column}"' for _, column in UPLOADED_COLUMNS)
+
+
+# =========================
+# Connection string
+# =========================
+def asyncpg_dsn(url):
+    """
+    Split a Prisma-style URL into an asyncpg DSN and server settings
+
+    Prisma's '?schema=name' is not a libpq parameter; it becomes the
+    search_path.
+
+    Returns:
+        (dsn, server_settings)
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    settings = {}
+
+    schema = query.pop('schema', None)
+    if schema:
+        settings['search_path'] = schema
+
+    return urlunsplit(parts._replace(query=urlencode(query))), settings
+
+
+# =========================
+# SQL
+# =========================
+def _labels(value):
+    return [str(v) for v in (value if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)) else [value])]
+
+
+def history_query(store_id=None, product_id=None, start=None, end=None):
+    """
+    SELECT of the deduplicated history with the filters as parameters
+
+    Args:
+        store_id, product_id: One label or a list of labels (None = all)
+        start, end: Inclusive date bounds (None = open)
+
+    Returns:
+        (sql, args)
+    """
+    clauses, args = [], []
+
+    def param(value):
+        args.append(value)
+        return f"${len(args)}"
+
+    if store_id is not None:
+        clauses.append(f'"storeId" = ANY({param(_labels(store_id))}::text[])')
+    if product_id is not None:
+        clauses.append(f'"productId" = ANY({param(_labels(product_id))}::text[])')
+    if start is not None:
+        clauses.append(f'"date" >= {param(pd.Timestamp(start).to_pydatetime())}')
+    if end is not None:
+        clauses.append(f'"date" <= {param(pd.Timestamp(end).to_pydatetime())}')
+
+    where = f' WHERE {" AND ".join(clauses)}' if clauses else ""
+    sql = (
+        f'SELECT DISTINCT ON ("date", "storeId", "productId") {SELECT_COLUMNS} '
+        f'FROM "UploadedData"{where} '
+        f'ORDER BY "date", "storeId", "productId", "id" DESC'
+    )
+    return sql, args
+
+
+VERSION_QUERY = 'SELECT count(*) AS "rows", coalesce(max("id"), 0) AS "last_id" FROM "UploadedData"'
+
+
+# =========================
+# Typed columns
+# =========================
+class _ColumnBuffer:
+    """
+    Fetched batches of one column: NumPy arrays of the final dtype, labels
+    as int32 codes into a growing label table
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.kind = 'datetime64[us]' if name == 'date' else HISTORY_SCHEMA[name]
+        self.parts = []
+        self.codes = {} if self.kind == 'category' else None
+
+    def append(self, values):
+        if self.codes is None:
+            self.parts.append(np.array(values, dtype=self.kind))
+            return
+
+        # Factorize the batch, then map its few distinct labels to global codes
+        local, uniques = pd.factorize(np.array(values, dtype=object))
+        lookup = np.array([self.codes.setdefault(label, len(self.codes)) for label in uniques], dtype=np.int32)
+        self.parts.append(lookup[local])
+
+    def finish(self):
+        if self.codes is None:
+            return np.concatenate(self.parts) if self.parts else np.array([], dtype=self.kind)
+
+        codes = np.concatenate(self.parts) if self.parts else np.array([], dtype=np.int32)
+
+        # Sorted categories, like read_csv(dtype='category')
+        labels = np.array(list(self.codes), dtype=object)
+        order = np.argsort(labels, kind='stable')
+        remap = np.empty(len(labels), dtype=np.int32)
+        remap[order] = np.arange(len(labels), dtype=np.int32)
+        return pd.Categorical.from_codes(remap[codes], categories=pd.Index(labels[order].tolist()))
+
+
+def records_frame(buffers):
+    return pd.DataFrame({buffer.name: buffer.finish() for buffer in buffers})
+
+
+# =========================
+# Source
+# =========================
+class PostgresHistory:
+    """
+    History served from the UploadedData table through a pooled asyncpg
+    connection, with the HistoryCache interface
+
+    get() keeps one copy of the full table in memory and polls its version
+    (row count and last id; uploads only insert) at most every
+    poll_seconds. load(...) runs a filtered query without touching it.
+    """
+
+    def __init__(self, url=DATABASE_URL, min_size=HISTORY_DB_POOL_MIN, max_size=HISTORY_DB_POOL_MAX,
+                 fetch_rows=HISTORY_DB_FETCH_ROWS, poll_seconds=HISTORY_DB_POLL_SECONDS):
+        if asyncpg is None:
+            raise RuntimeError("The Postgres history source needs the asyncpg package")
+        if not url:
+            raise RuntimeError("Set INVENTORY_DATABASE_URL (or DATABASE_URL) for the Postgres history source")
+
+        self.dsn, self.server_settings = asyncpg_dsn(url)
+        self.min_size, self.max_size = min_size, max_size
+        self.fetch_rows = fetch_rows
+        self.poll_seconds = poll_seconds
+
+        self.version = None
+        self.df = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+        self._pool = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="history-db", daemon=True).start()
+
+    # -------------------------
+    # Event loop plumbing
+    # -------------------------
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _submit(self, coro):
+        # Await from another event loop (async endpoints)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def _get_pool(self):
+        # Runs on the source's loop only, so the check and the set are not interleaved
+        if self._pool is None:
+            self._pool = asyncio.ensure_future(asyncpg.create_pool(
+                self.dsn, min_size=self.min_size, max_size=self.max_size,
+                server_settings=self.server_settings
+            ))
+        try:
+            return await self._pool
+        except Exception:
+            self._pool = None
+            raise
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    @staticmethod
+    def _version_string(row):
+        return f"{row['rows']}-{row['last_id']}"
+
+    async def _version(self):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return self._version_string(await conn.fetchrow(VERSION_QUERY))
+
+    async def _fetch(self, with_version=False, **filters):
+        sql, args = history_query(**filters)
+        buffers = [_ColumnBuffer(name) for name, _ in UPLOADED_COLUMNS]
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            # One snapshot for the version and the rows
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                version = self._version_string(await conn.fetchrow(VERSION_QUERY)) if with_version else None
+
+                cursor = await conn.cursor(sql, *args)
+                while True:
+                    rows = await cursor.fetch(self.fetch_rows)
+                    if not rows:
+                        break
+                    for buffer, values in zip(buffers, zip(*rows)):
+                        buffer.append(values)
+
+        return records_frame(buffers), version
+
+    async def _insert(self, df):
+        frame = df.reindex(columns=[name for name, _ in UPLOADED_COLUMNS]).dropna()
+
+        columns = []
+        for name, _ in UPLOADED_COLUMNS:
+            kind = HISTORY_SCHEMA.get(name)
+            values = frame[name]
+            if name == 'date':
+                columns.append(values.dt.to_pydatetime().tolist())
+            elif kind == 'category':
+                columns.append(values.astype(str).tolist())
+            elif kind.startswith('int'):
+                columns.append(values.astype(np.int64).tolist())
+            else:
+                columns.append(values.astype(np.float64).tolist())
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    'UploadedData',
+                    records=zip(*columns),
+                    columns=[column for _, column in UPLOADED_COLUMNS],
+                )
+            return self._version_string(await conn.fetchrow(VERSION_QUERY))
+
+    # -------------------------
+    # HistoryCache interface
+    # -------------------------
+    def get(self):
+        """
+        The full, deduplicated table, refetched when its version changes
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.df is None or now - self._checked >= self.poll_seconds:
+                self._checked = now
+                if self.df is None or self._run(self._version()) != self.version:
+                    self.df, self.version = self._run(self._fetch(with_version=True))
+            return self.df
+
+    def load(self, store_id=None, product_id=None, start=None, end=None):
+        """
+        History rows matching the filters, read with the filters in SQL
+
+        Args:
+            store_id, product_id: One label or a list of labels (None = all)
+            start, end: Inclusive date bounds (None = open)
+        """
+        return self._run(self._fetch(store_id=store_id, product_id=product_id, start=start, end=end))[0]
+
+    def manifest(self):
+        """
+        Content identity of the table (for the rollup and feature caches)
+        """
+        self.get()
+        parts = urlsplit(self.dsn)
+        source = f"postgres://{parts.hostname}:{parts.port}{parts.path}/UploadedData"
+        return {
+            'path': source,
+            'bytes': int(self.version.split('-')[0]),
+            'sha256': hashlib.sha256(f"{source}|{self.version}".encode()).hexdigest(),
+        }
+
+    async def append(self, df):
+        """
+        Insert uploaded rows (normalized column names) with COPY
+
+        Rows missing a column the table requires are skipped, as
+        clean_history would drop them. The next get() re-reads the table.
+
+        Returns:
+            The table's version right after the insert
+        """
+        version = await self._submit(self._insert(df))
+        self._checked = float('-inf')
+        return version
+
+
+def history_source(kind=HISTORY_SOURCE):
+    """
+    The API's history source: the CSV file (default) or Postgres
+    """
+    if kind == 'postgres':
+        return PostgresHistory()
+    if kind == 'csv':
+        return HistoryCache(HISTORY_PATH)
+    raise ValueError(f"Unknown INVENTORY_HISTORY_SOURCE '{kind}', use 'csv' or 'postgres'")
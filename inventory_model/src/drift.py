@@ -0,0 +1,557 @@
+"""
+Drift Monitor
+Streaming sketches of uploaded data compared against the training
+distribution, updated on every /upload_data in O(upload rows)
+
+- Reference: at training time, histograms of the training rows
+  (date <= split date) are saved with the model (models/drift_reference.pkl).
+  Numeric bins are the reference's deciles, so every later update is a
+  searchsorted + bincount with fixed edges
+- Monitored: the FEATURES computable from an uploaded row on its own
+  (prices, inventory, promotion, calendar), label frequencies of the
+  categorical FEATURES, and units_sold with its zero-demand rate (the
+  lag_* / rolling_mean_* features are windows of units_sold, so a shift
+  there shows in its histogram)
+- Scores: PSI per feature (< DRIFT_PSI_WARN stable, >= DRIFT_PSI_ALERT
+  significant), mean shift, missing and out-of-reference-range rates,
+  label cardinality and unseen labels, zero-demand rate change. The
+  calendar features are scored but do not set the status: one upload
+  spans a few days, never the training year
+- The current sketch accumulates every upload since the reference; the
+  last upload is scored on its own as well. Scores are recomputed on
+  update (O(bins)), so reading them is a dictionary lookup
+
+Usage (reference for an already trained model, without retraining):
+    python drift.py
+"""
+
+import argparse
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import (
+    TRAIN_SPLIT_QUANTILE,
+    DRIFT_BINS,
+    DRIFT_SAMPLE_FRAC,
+    DRIFT_PSI_WARN,
+    DRIFT_PSI_ALERT,
+    DRIFT_ZERO_RATE_DELTA,
+    DRIFT_MIN_ROWS,
+    RANDOM_STATE,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BASE_DIR / "models"
+DATA_DIR = BASE_DIR / "data"
+REFERENCE_PATH = MODEL_DIR / "drift_reference.pkl"
+STATE_PATH = DATA_DIR / "drift_state.pkl"
+
+NUMERIC_COLUMNS = [
+    'inventory_level', 'price', 'discount', 'competitor_pricing', 'holiday_promotion',
+    'week', 'month', 'is_weekend', 'units_sold'
+]
+CATEGORICAL_COLUMNS = ['store_id', 'product_id', 'category', 'region', 'seasonality']
+
+# Reported, not part of the status (see the module docstring)
+CALENDAR_COLUMNS = ('week', 'month', 'is_weekend')
+
+PSI_EPSILON = 1e-4
+UNSEEN_SAMPLE = 10   # unseen labels listed per column
+
+
+def monitored_values(df):
+    """
+    {column: array} of the monitored columns of raw (unencoded) rows;
+    calendar features are derived from 'date' like create_features does
+    """
+    values = {}
+    dates = pd.to_datetime(df['date'], errors='coerce') if 'date' in df.columns else None
+
+    for col in NUMERIC_COLUMNS:
+        if col == 'week' and dates is not None:
+            values[col] = dates.dt.isocalendar().week.to_numpy(dtype=np.float64, na_value=np.nan)
+        elif col == 'month' and dates is not None:
+            values[col] = dates.dt.month.to_numpy(dtype=np.float64, na_value=np.nan)
+        elif col == 'is_weekend' and dates is not None:
+            values[col] = np.where(dates.isna(), np.nan, dates.dt.weekday.isin([5, 6]).astype(np.float64))
+        elif col in df.columns:
+            values[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values[col] = np.full(len(df), np.nan)
+
+    for col in CATEGORICAL_COLUMNS:
+        values[col] = df[col] if col in df.columns else pd.Series([None] * len(df), dtype=object)
+
+    return values
+
+
+# =========================
+# Sketches
+# =========================
+class NumericSketch:
+    """
+    Fixed-edge histogram plus count, sum, sum of squares, min, max and
+    missing count of one column
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.n = 0
+        self.missing = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.low = np.inf
+        self.high = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        present = values[~np.isnan(values)]
+
+        self.missing += len(values) - len(present)
+        if not len(present):
+            return
+
+        self.counts += np.bincount(
+            np.searchsorted(self.edges, present, side='right'), minlength=len(self.counts)
+        )
+        self.n += len(present)
+        self.total += float(present.sum())
+        self.total_sq += float(np.square(present).sum())
+        self.low = min(self.low, float(present.min()))
+        self.high = max(self.high, float(present.max()))
+
+    def mean(self):
+        return self.total / self.n if self.n else None
+
+    def std(self):
+        if not self.n:
+            return None
+        return float(np.sqrt(max(self.total_sq / self.n - (self.total / self.n) ** 2, 0.0)))
+
+
+class CategoricalSketch:
+    """
+    Label frequencies and missing count of one column
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.n = 0
+        self.missing = 0
+
+    def update(self, values):
+        values = pd.Series(values)
+        present = values.dropna()
+        self.missing += len(values) - len(present)
+        for label, count in present.astype(str).value_counts(sort=False).items():
+            self.counts[label] = self.counts.get(label, 0) + int(count)
+        self.n += len(present)
+
+
+class DriftSketch:
+    """
+    Sketches of every monitored column, with shared numeric edges
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.numeric = {col: NumericSketch(edges[col]) for col in NUMERIC_COLUMNS}
+        self.categorical = {col: CategoricalSketch() for col in CATEGORICAL_COLUMNS}
+        self.rows = 0
+        self.zero_demand = 0
+        self.first_date = None
+        self.last_date = None
+
+    def empty_like(self):
+        return DriftSketch(self.edges)
+
+    def update(self, df):
+        """
+        Add raw history rows (normalized column names) in O(len(df))
+        """
+        if not len(df):
+            return self
+
+        values = monitored_values(df)
+        for col, sketch in self.numeric.items():
+            sketch.update(values[col])
+        for col, sketch in self.categorical.items():
+            sketch.update(values[col])
+
+        self.rows += len(df)
+        self.zero_demand += int(np.sum(values['units_sold'] == 0))
+
+        if 'date' in df.columns:
+            dates = pd.to_datetime(df['date'], errors='coerce').dropna()
+            if len(dates):
+                first, last = dates.min(), dates.max()
+                self.first_date = first if self.first_date is None else min(self.first_date, first)
+                self.last_date = last if self.last_date is None else max(self.last_date, last)
+
+        return self
+
+    def zero_rate(self):
+        observed = self.numeric['units_sold'].n
+        return self.zero_demand / observed if observed else None
+
+
+def reference_edges(sample, bins=DRIFT_BINS):
+    """
+    Interior decile (bins-quantile) cut points of each numeric column
+    """
+    values = monitored_values(sample)
+    edges = {}
+    for col in NUMERIC_COLUMNS:
+        present = values[col][~np.isnan(values[col])]
+        if len(present):
+            cuts = np.quantile(present, np.linspace(0, 1, bins + 1)[1:-1])
+            edges[col] = np.unique(cuts)
+        else:
+            edges[col] = np.array([], dtype=np.float64)
+    return edges
+
+
+def training_reference(chunks, split_date=None, bins=DRIFT_BINS, sample_frac=DRIFT_SAMPLE_FRAC):
+    """
+    Reference sketch of the training rows
+
+    Args:
+        chunks: Function() → iterable of cleaned history frames; called
+            twice (bin edges from a sample, then the counts), so the
+            history never has to fit in memory
+        split_date: Last training date (None = every row)
+        bins: Histogram bins per numeric column (quantiles)
+        sample_frac: Fraction of each chunk the edges are computed on
+
+    Returns:
+        DriftReference
+    """
+    def training_rows(frame):
+        return frame if split_date is None else frame[frame['date'] <= split_date]
+
+    sample = pd.concat([
+        training_rows(chunk).sample(frac=sample_frac, random_state=RANDOM_STATE)
+        for chunk in chunks()
+    ], ignore_index=True)
+
+    sketch = DriftSketch(reference_edges(sample, bins))
+    for chunk in chunks():
+        sketch.update(training_rows(chunk))
+
+    return DriftReference(sketch, split_date)
+
+
+class DriftReference:
+    """
+    Training-time sketch saved next to the model
+    """
+
+    def __init__(self, sketch, split_date=None, created_at=None):
+        self.sketch = sketch
+        self.split_date = split_date
+        self.created_at = created_at or datetime.now().isoformat(timespec='seconds')
+
+    @property
+    def id(self):
+        return f"{self.created_at}/{self.sketch.rows}"
+
+    def save(self, path=REFERENCE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        joblib.dump(self, tmp)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path=REFERENCE_PATH):
+        return joblib.load(path)
+
+
+# =========================
+# Scores
+# =========================
+def psi(reference_counts, current_counts, epsilon=PSI_EPSILON):
+    """
+    Population stability index of two histograms over the same bins
+    """
+    ref = np.asarray(reference_counts, dtype=np.float64)
+    cur = np.asarray(current_counts, dtype=np.float64)
+    if not ref.sum() or not cur.sum():
+        return None
+
+    ref = np.clip(ref / ref.sum(), epsilon, None)
+    cur = np.clip(cur / cur.sum(), epsilon, None)
+    return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+
+def psi_status(value):
+    if value is None:
+        return 'no_data'
+    if value >= DRIFT_PSI_ALERT:
+        return 'alert'
+    if value >= DRIFT_PSI_WARN:
+        return 'warn'
+    return 'ok'
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _round(value, digits=4):
+    return None if value is None else round(float(value), digits)
+
+
+def drift_scores(reference, current):
+    """
+    Drift and data-quality scores of a current sketch against the reference
+
+    Returns:
+        Dictionary with 'status', 'max_psi', 'drifted', 'rows', per-column
+        'numeric' / 'categorical' scores and 'zero_demand' (the calendar
+        columns are scored but left out of status, max_psi and drifted)
+    """
+    numeric = {}
+    for col, ref in reference.numeric.items():
+        cur = current.numeric[col]
+        value = psi(ref.counts, cur.counts)
+        observed = cur.n + cur.missing
+        out_of_range = bool(ref.n and cur.n and (cur.low < ref.low or cur.high > ref.high))
+        numeric[col] = {
+            'psi': _round(value),
+            'status': psi_status(value),
+            'reference_mean': _round(ref.mean()),
+            'mean': _round(cur.mean()),
+            'reference_std': _round(ref.std()),
+            'std': _round(cur.std()),
+            'min': _round(cur.low if cur.n else None),
+            'max': _round(cur.high if cur.n else None),
+            'outside_reference_range': out_of_range,
+            'missing_rate': _rate(cur.missing, observed),
+        }
+
+    categorical = {}
+    for col, ref in reference.categorical.items():
+        cur = current.categorical[col]
+        labels = sorted(set(ref.counts) | set(cur.counts))
+        value = psi(
+            [ref.counts.get(label, 0) for label in labels],
+            [cur.counts.get(label, 0) for label in labels],
+        )
+        unseen = sorted(set(cur.counts) - set(ref.counts))
+        categorical[col] = {
+            'psi': _round(value),
+            'status': psi_status(value),
+            'reference_cardinality': len(ref.counts),
+            'cardinality': len(cur.counts),
+            'unseen_labels': len(unseen),
+            'unseen_sample': unseen[:UNSEEN_SAMPLE],
+            'unseen_rate': _rate(sum(cur.counts[label] for label in unseen), cur.n),
+            'missing_rate': _rate(cur.missing, cur.n + cur.missing),
+        }
+
+    ref_zero, cur_zero = reference.zero_rate(), current.zero_rate()
+    zero_delta = None if ref_zero is None or cur_zero is None else cur_zero - ref_zero
+    zero_demand = {
+        'reference_rate': _round(ref_zero),
+        'rate': _round(cur_zero),
+        'delta': _round(zero_delta),
+        'status': 'no_data' if zero_delta is None else (
+            'warn' if abs(zero_delta) >= DRIFT_ZERO_RATE_DELTA else 'ok'
+        ),
+    }
+
+    scores = {**numeric, **categorical}
+    psis = [s['psi'] for col, s in scores.items() if s['psi'] is not None and col not in CALENDAR_COLUMNS]
+    gated = {col: s for col, s in scores.items() if col not in CALENDAR_COLUMNS}
+    drifted = sorted(col for col, s in gated.items() if s['status'] in ('warn', 'alert'))
+
+    if current.rows == 0:
+        status = 'no_data'
+    elif any(s['status'] == 'alert' for s in gated.values()):
+        status = 'alert'
+    elif drifted or zero_demand['status'] == 'warn' or any(s['unseen_labels'] for s in categorical.values()):
+        status = 'warn'
+    else:
+        status = 'ok'
+
+    return {
+        'status': status,
+        'low_sample': current.rows < DRIFT_MIN_ROWS,
+        'rows': current.rows,
+        'date_range': {
+            'start': current.first_date.strftime('%Y-%m-%d') if current.first_date is not None else None,
+            'end': current.last_date.strftime('%Y-%m-%d') if current.last_date is not None else None,
+        },
+        'max_psi': _round(max(psis)) if psis else None,
+        'drifted': drifted,
+        'zero_demand': zero_demand,
+        'numeric': numeric,
+        'categorical': categorical,
+    }
+
+
+# =========================
+# Monitor
+# =========================
+class DriftMonitor:
+    """
+    Current sketches and their precomputed scores
+
+    The state (sketches since the reference, scores) is persisted after
+    each update and discarded when the reference changes.
+    """
+
+    def __init__(self, reference=None, state_path=STATE_PATH):
+        self.reference = reference
+        self.state_path = Path(state_path)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.uploads = 0
+        self.updated_at = None
+        self.cumulative = self.reference.sketch.empty_like() if self.reference else None
+        self._report = self._build_report(None)
+
+    @classmethod
+    def load(cls, reference_path=REFERENCE_PATH, state_path=STATE_PATH):
+        """
+        Monitor with the saved reference (inactive without one) and the
+        saved state when it belongs to that reference
+        """
+        reference_path = Path(reference_path)
+        reference = DriftReference.load(reference_path) if reference_path.exists() else None
+        monitor = cls(reference, state_path)
+
+        state_path = Path(state_path)
+        if reference is not None and state_path.exists():
+            state = joblib.load(state_path)
+            if state.get('reference_id') == reference.id:
+                monitor.uploads = state['uploads']
+                monitor.updated_at = state['updated_at']
+                monitor.cumulative = state['cumulative']
+                monitor._report = state['report']
+
+        return monitor
+
+    def set_reference(self, reference):
+        """
+        Start over against a new reference (after a full retrain)
+        """
+        with self._lock:
+            self.reference = reference
+            self._reset()
+            self._save()
+
+    def update(self, df):
+        """
+        Add one upload (raw rows, normalized column names) and rescore
+
+        Returns:
+            The report (None when there is no reference)
+        """
+        if self.reference is None:
+            return None
+
+        upload = self.reference.sketch.empty_like().update(df)
+        with self._lock:
+            self.cumulative.update(df)
+            self.uploads += 1
+            self.updated_at = datetime.now().isoformat(timespec='seconds')
+            self._report = self._build_report(upload)
+            self._save()
+            return self._report
+
+    def report(self):
+        """
+        The latest scores (computed at update time)
+        """
+        return self._report
+
+    def _build_report(self, upload):
+        if self.reference is None:
+            return {
+                'status': 'no_reference',
+                'message': "No drift reference: train a model or run python drift.py"
+            }
+
+        reference = self.reference
+        since_reference = drift_scores(reference.sketch, self.cumulative) if self.uploads else None
+        return {
+            'status': since_reference['status'] if since_reference else 'no_data',
+            'reference': {
+                'created_at': reference.created_at,
+                'rows': reference.sketch.rows,
+                'split_date': (
+                    pd.Timestamp(reference.split_date).strftime('%Y-%m-%d')
+                    if reference.split_date is not None else None
+                ),
+            },
+            'uploads': self.uploads,
+            'updated_at': self.updated_at,
+            'since_reference': since_reference,
+            'last_upload': drift_scores(reference.sketch, upload) if upload is not None else None,
+        }
+
+    def _save(self):
+        if self.reference is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix('.tmp')
+        joblib.dump({
+            'reference_id': self.reference.id,
+            'uploads': self.uploads,
+            'updated_at': self.updated_at,
+            'cumulative': self.cumulative,
+            'report': self._report,
+        }, tmp)
+        os.replace(tmp, self.state_path)
+
+
+def print_drift_reference(reference):
+    sketch = reference.sketch
+    print(f"\n{'='*70}")
+    print(f"📐 DRIFT REFERENCE")
+    print(f"{'='*70}")
+    print(f"\n   Rows: {sketch.rows:,} (up to {pd.Timestamp(reference.split_date):%Y-%m-%d})")
+    print(f"   Zero-demand rate: {sketch.zero_rate():.2%}")
+    for col, numeric in sketch.numeric.items():
+        print(f"   {col:<20} mean {numeric.mean():>10.2f}  std {numeric.std():>9.2f}  {len(numeric.counts)} bins")
+    for col, categorical in sketch.categorical.items():
+        print(f"   {col:<20} {len(categorical.counts)} labels")
+
+
+def main():
+    from data_loader import HISTORY_PATH, load_history, clean_history
+    from config import TRAIN_CHUNK_ROWS
+
+    parser = argparse.ArgumentParser(description="Build the drift reference from the training period")
+    parser.add_argument("--chunk-rows", type=int, default=TRAIN_CHUNK_ROWS, help="CSV rows per chunk")
+    parser.add_argument("--output", default=str(REFERENCE_PATH), help="Reference file")
+    args = parser.parse_args()
+
+    def chunks():
+        return (clean_history(chunk) for chunk in load_history(HISTORY_PATH, chunksize=args.chunk_rows))
+
+    # Same split rule as training.time_split, from the dates alone
+    dates = pd.concat([chunk['date'] for chunk in chunks()])
+    split_date = dates.quantile(TRAIN_SPLIT_QUANTILE)
+
+    reference = training_reference(chunks, split_date)
+    print_drift_reference(reference)
+    print(f"\n💾 Saved to: {reference.save(args.output)}")
+
+
+if __name__ == "__main__":
+    # Run through the importable module so the saved classes unpickle as drift.*, not __main__.*
+    import drift
+    drift.main()
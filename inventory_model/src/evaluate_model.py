@@ -1,16 +1,30 @@
 """
 Model Evaluation Script
 Comprehensive accuracy testing and visualization
+
+Usage:
+    python evaluate_model.py                                # whole history in memory
+    python evaluate_model.py --streaming --workers 4        # bounded memory, store partitions
+
+The streaming mode reads the history in chunks, featurizes them with a
+carried lookback and folds every chunk into mergeable metric accumulators;
+each worker handles one group of stores. It reports the same metrics as
+the in-memory mode (error percentiles/median need all errors at once and
+are only shown in memory).
 """
 
-import pandas as pd
+import argparse
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import joblib
 from pathlib import Path
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import matplotlib.pyplot as plt
 
-from features import create_features
+from features import create_features, iter_featurized_chunks, FEATURES
+from data_loader import HISTORY_PATH, load_history, clean_history, encode_categoricals, distinct_values
+from metrics import MetricAccumulator, GroupedMetricAccumulator
 
 # =========================
 # Setup
@@ -19,315 +33,440 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MODEL_DIR = BASE_DIR / "models"
 DATA_DIR = BASE_DIR / "data"
 
-print("\n" + "="*70)
-print("🔍 COMPREHENSIVE MODEL EVALUATION")
-print("="*70)
+TOLERANCES = (0.10, 0.20, 0.30)
+STREAM_CHUNK_ROWS = 500_000
+PREDICTION_COLUMNS = ['date', 'store_id', 'product_id', 'actual', 'predicted', 'error', 'abs_error', 'pct_error']
 
-# =========================
-# Load model & data
-# =========================
-print("\n📂 Loading model and data...")
-model = joblib.load(MODEL_DIR / "demand_model.pkl")
-encoders = joblib.load(MODEL_DIR / "encoders.pkl")
 
-try:
-    saved_metrics = joblib.load(MODEL_DIR / "model_metrics.pkl")
-    has_saved_metrics = True
-except:
-    has_saved_metrics = False
-    print("⚠️  No saved training metrics found")
+def score(df, model):
+    """
+    Predict a featurized frame and add actual/error columns
+    """
+    df['predicted'] = np.expm1(model.predict(df[FEATURES]))
+    df['actual'] = df['units_sold_7d'].astype(np.float64)
 
-df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace("/", "_")
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    # Remove NaN
+    df = df.dropna(subset=['predicted', 'actual'])
 
-# Clean data
-df = df[df['units_sold'] >= 0]
-df = df[df['price'] > 0]
-df = df.dropna()
+    df['year_month'] = df['date'].dt.to_period('M')
+    df['error'] = df['predicted'] - df['actual']
+    df['abs_error'] = np.abs(df['error'])
+    df['pct_error'] = (df['error'] / df['actual']) * 100
+    return df
 
-print(f"✅ Loaded {len(df)} records")
 
 # =========================
-# Encode & Feature Engineering
+# Accumulation
 # =========================
-print("🔧 Processing features...")
-for col, le in encoders.items():
-    df[col] = le.transform(df[col].astype(str))
+class EvaluationAccumulator:
+    """
+    Everything the report needs, updated chunk by chunk and mergeable
+    across partitions
+    """
+
+    def __init__(self):
+        self.overall = MetricAccumulator()
+        self.by_store = GroupedMetricAccumulator('store_id')
+        self.by_category = GroupedMetricAccumulator('category')
+        self.by_month = GroupedMetricAccumulator('year_month')
+        self.within = np.zeros(len(TOLERANCES), dtype=np.int64)
+        self.extremes = {
+            'actual': [np.inf, -np.inf],
+            'predicted': [np.inf, -np.inf],
+            'error': [np.inf, -np.inf],
+        }
+
+    def update(self, df):
+        self.overall.update(df['actual'], df['predicted'])
+        for acc in (self.by_store, self.by_category, self.by_month):
+            acc.update(df)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative = (df['abs_error'] / df['actual']).to_numpy()
+        self.within += [int((relative <= t).sum()) for t in TOLERANCES]
+
+        for col, bounds in self.extremes.items():
+            if len(df):
+                bounds[0] = min(bounds[0], float(df[col].min()))
+                bounds[1] = max(bounds[1], float(df[col].max()))
+        return self
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        self.by_store.merge(other.by_store)
+        self.by_category.merge(other.by_category)
+        self.by_month.merge(other.by_month)
+        self.within += other.within
+
+        for col, bounds in self.extremes.items():
+            bounds[0] = min(bounds[0], other.extremes[col][0])
+            bounds[1] = max(bounds[1], other.extremes[col][1])
+        return self
+
+
+def evaluate_partition(stores, path, chunk_rows, output_path):
+    """
+    Worker: stream the history rows of `stores` through featurization,
+    prediction and the accumulators, appending predictions to output_path
+
+    Returns:
+        (EvaluationAccumulator, rows evaluated)
+    """
+    model = joblib.load(MODEL_DIR / "demand_model.pkl")
+    encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+
+    chunks = (
+        encode_categoricals(clean_history(chunk[chunk['store_id'].isin(stores)]), encoders)
+        for chunk in load_history(path, chunksize=chunk_rows)
+    )
+
+    acc = EvaluationAccumulator()
+    rows = 0
+    for featurized in iter_featurized_chunks(chunks):
+        scored = score(featurized, model)
+        acc.update(scored)
+        scored[PREDICTION_COLUMNS].to_csv(output_path, mode='a', header=(rows == 0), index=False)
+        rows += len(scored)
+
+    return acc, rows
+
+
+def evaluate_streaming(path, workers, chunk_rows, output_path):
+    """
+    Evaluate in bounded memory: one partition per store group, merged
+    """
+    stores = distinct_values('store_id', path)
+    groups = [list(g) for g in np.array_split(stores, min(workers, len(stores))) if len(g)]
+    part_paths = [output_path.with_suffix(f".part{i}.csv") for i in range(len(groups))]
+    for part in part_paths:
+        part.unlink(missing_ok=True)
+
+    print(f"   Streaming {len(stores)} stores in {len(groups)} partition(s), {chunk_rows:,} rows per chunk")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            evaluate_partition, groups, [path] * len(groups),
+            [chunk_rows] * len(groups), part_paths
+        ))
+
+    acc = EvaluationAccumulator()
+    rows = 0
+    for partition_acc, partition_rows in results:
+        acc.merge(partition_acc)
+        rows += partition_rows
+
+    # Merge the per-partition prediction files
+    with open(output_path, 'wb') as out:
+        first = True
+        for part in part_paths:
+            if not part.exists():
+                continue
+            with open(part, 'rb') as f:
+                if not first:
+                    f.readline()
+                shutil.copyfileobj(f, out)
+            first = False
+            part.unlink()
+
+    return acc, rows
 
-df = create_features(df)
 
 # =========================
-# Make Predictions
+# Report
 # =========================
-FEATURES = [
-    'store_id','product_id','category','region',
-    'inventory_level','price','discount',
-    'competitor_pricing','holiday_promotion',
-    'seasonality','is_weekend','week','month',
-    'lag_7','lag_14','lag_30','lag_60',
-    'rolling_mean_7','rolling_mean_30'
-]
+def status_icon(accuracy):
+    return "🌟" if accuracy >= 90 else "✅" if accuracy >= 80 else "⚠️" if accuracy >= 70 else "❌"
+
+
+def print_report(acc, encoders, saved_metrics, errors=None):
+    """
+    Print the evaluation report
+
+    Args:
+        acc: EvaluationAccumulator over all scored rows
+        encoders: Fitted LabelEncoders (to decode store/category labels)
+        saved_metrics: Training metrics dict or None
+        errors: Scored frame (in-memory mode) for median/percentiles
+
+    Returns:
+        Dictionary of evaluation results
+    """
+    overall = acc.overall.result(exclude_zeros=True)
+    mae = overall['mae']
+    rmse = overall['rmse']
+    r2 = overall['r2']
+    mape = overall['mape']
+    accuracy = overall['mape_accuracy']
+    n = overall['total_records']
+
+    # =========================
+    # Overall Metrics
+    # =========================
+    print("\n" + "="*70)
+    print("📊 OVERALL MODEL PERFORMANCE")
+    print("="*70)
 
-df['predicted'] = np.expm1(model.predict(df[FEATURES]))
-df['actual'] = df['units_sold_7d']
+    print(f"\n📈 METRICS:")
+    print(f"   Total Records: {n:,}")
+    print(f"   MAE (Mean Absolute Error): {mae:.2f} units")
+    print(f"   RMSE (Root Mean Squared Error): {rmse:.2f} units")
+    print(f"   R² Score: {r2:.4f}")
+    print(f"   MAPE (Mean Absolute % Error): {mape:.2f}%")
+    print(f"   ✅ ACCURACY: {accuracy:.2f}%")
+
+    actual_min, actual_max = acc.extremes['actual']
+    predicted_min, predicted_max = acc.extremes['predicted']
+    print(f"\n📊 PREDICTION STATISTICS:")
+    print(f"   Actual - Min: {actual_min:.2f}, Max: {actual_max:.2f}, Mean: {overall['mean_actual']:.2f}")
+    print(f"   Predicted - Min: {predicted_min:.2f}, Max: {predicted_max:.2f}, Mean: {overall['mean_predicted']:.2f}")
+
+    # =========================
+    # Training vs Current Performance
+    # =========================
+    if saved_metrics is not None:
+        print("\n" + "="*70)
+        print("📈 TRAINING vs CURRENT PERFORMANCE")
+        print("="*70)
+
+        print(f"\n🎓 TRAINING METRICS (from model training):")
+        print(f"   Training Accuracy: {saved_metrics['train_mape_accuracy']:.2f}%")
+        print(f"   Validation Accuracy: {saved_metrics['valid_mape_accuracy']:.2f}%")
+        print(f"   Validation MAE: {saved_metrics['valid_mae']:.2f} units")
+        print(f"   Validation R²: {saved_metrics['valid_r2']:.4f}")
+
+        print(f"\n📉 CURRENT METRICS (on full dataset):")
+        print(f"   Current Accuracy: {accuracy:.2f}%")
+        print(f"   Current MAE: {mae:.2f} units")
+        print(f"   Current R²: {r2:.4f}")
+
+        accuracy_diff = accuracy - saved_metrics['valid_mape_accuracy']
+        if abs(accuracy_diff) < 5:
+            print(f"\n✅ Model performance is CONSISTENT ({accuracy_diff:+.2f}% difference)")
+        elif accuracy_diff > 0:
+            print(f"\n🌟 Model performance IMPROVED ({accuracy_diff:+.2f}% better)")
+        else:
+            print(f"\n⚠️  Model performance DEGRADED ({accuracy_diff:.2f}% worse)")
+
+    # =========================
+    # Per-Store Analysis
+    # =========================
+    print("\n" + "="*70)
+    print("📍 ACCURACY BY STORE")
+    print("="*70)
 
-# Remove NaN
-df = df.dropna(subset=['predicted', 'actual'])
+    store_metrics = acc.by_store.result()
+    store_metrics['store_id'] = encoders['store_id'].inverse_transform(store_metrics['store_id'])
 
-print(f"✅ Generated {len(df)} predictions")
+    store_results = []
+    for row in store_metrics.itertuples(index=False):
+        store_results.append({
+            'store_id': row.store_id,
+            'records': row.total_records,
+            'accuracy': row.mape_accuracy,
+            'mae': row.mae,
+            'r2': row.r2
+        })
 
-# =========================
-# Overall Metrics
-# =========================
-print("\n" + "="*70)
-print("📊 OVERALL MODEL PERFORMANCE")
-print("="*70)
-
-actual = df['actual'].values
-predicted = df['predicted'].values
-
-mae = mean_absolute_error(actual, predicted)
-rmse = np.sqrt(mean_squared_error(actual, predicted))
-r2 = r2_score(actual, predicted)
-mape = np.mean(np.abs((actual - predicted) / actual)) * 100
-accuracy = (1 - mape/100) * 100
-
-print(f"\n📈 METRICS:")
-print(f"   Total Records: {len(actual):,}")
-print(f"   MAE (Mean Absolute Error): {mae:.2f} units")
-print(f"   RMSE (Root Mean Squared Error): {rmse:.2f} units")
-print(f"   R² Score: {r2:.4f}")
-print(f"   MAPE (Mean Absolute % Error): {mape:.2f}%")
-print(f"   ✅ ACCURACY: {accuracy:.2f}%")
-
-print(f"\n📊 PREDICTION STATISTICS:")
-print(f"   Actual - Min: {actual.min():.2f}, Max: {actual.max():.2f}, Mean: {actual.mean():.2f}")
-print(f"   Predicted - Min: {predicted.min():.2f}, Max: {predicted.max():.2f}, Mean: {predicted.mean():.2f}")
+        print(f"\n{status_icon(row.mape_accuracy)} Store {row.store_id}:")
+        print(f"   Records: {row.total_records:,}")
+        print(f"   Accuracy: {row.mape_accuracy:.2f}%")
+        print(f"   MAE: {row.mae:.2f} units")
+        print(f"   R² Score: {row.r2:.4f}")
 
-# =========================
-# Training vs Current Performance
-# =========================
-if has_saved_metrics:
+    # =========================
+    # Per-Category Analysis
+    # =========================
     print("\n" + "="*70)
-    print("📈 TRAINING vs CURRENT PERFORMANCE")
+    print("📦 ACCURACY BY CATEGORY")
     print("="*70)
-    
-    print(f"\n🎓 TRAINING METRICS (from model training):")
-    print(f"   Training Accuracy: {saved_metrics['train_accuracy']:.2f}%")
-    print(f"   Validation Accuracy: {saved_metrics['valid_accuracy']:.2f}%")
-    print(f"   Validation MAE: {saved_metrics['valid_mae']:.2f} units")
-    print(f"   Validation R²: {saved_metrics['valid_r2']:.4f}")
-    
-    print(f"\n📉 CURRENT METRICS (on full dataset):")
-    print(f"   Current Accuracy: {accuracy:.2f}%")
-    print(f"   Current MAE: {mae:.2f} units")
-    print(f"   Current R²: {r2:.4f}")
-    
-    accuracy_diff = accuracy - saved_metrics['valid_accuracy']
-    if abs(accuracy_diff) < 5:
-        print(f"\n✅ Model performance is CONSISTENT ({accuracy_diff:+.2f}% difference)")
-    elif accuracy_diff > 0:
-        print(f"\n🌟 Model performance IMPROVED ({accuracy_diff:+.2f}% better)")
-    else:
-        print(f"\n⚠️  Model performance DEGRADED ({accuracy_diff:.2f}% worse)")
 
-# =========================
-# Per-Store Analysis
-# =========================
-print("\n" + "="*70)
-print("📍 ACCURACY BY STORE")
-print("="*70)
-
-store_results = []
-for store_id in sorted(df['store_id'].unique()):
-    store_df = df[df['store_id'] == store_id]
-    
-    if len(store_df) > 0:
-        store_actual = store_df['actual'].values
-        store_predicted = store_df['predicted'].values
-        
-        store_mae = mean_absolute_error(store_actual, store_predicted)
-        store_mape = np.mean(np.abs((store_actual - store_predicted) / store_actual)) * 100
-        store_accuracy = (1 - store_mape/100) * 100
-        store_r2 = r2_score(store_actual, store_predicted)
-        
-        store_results.append({
-            'store_id': store_id,
-            'records': len(store_df),
-            'accuracy': store_accuracy,
-            'mae': store_mae,
-            'r2': store_r2
-        })
-        
-        status = "🌟" if store_accuracy >= 90 else "✅" if store_accuracy >= 80 else "⚠️" if store_accuracy >= 70 else "❌"
-        print(f"\n{status} Store {store_id}:")
-        print(f"   Records: {len(store_df):,}")
-        print(f"   Accuracy: {store_accuracy:.2f}%")
-        print(f"   MAE: {store_mae:.2f} units")
-        print(f"   R² Score: {store_r2:.4f}")
+    category_metrics = acc.by_category.result()
+    category_metrics['category'] = encoders['category'].inverse_transform(category_metrics['category'])
 
-# =========================
-# Per-Category Analysis
-# =========================
-print("\n" + "="*70)
-print("📦 ACCURACY BY CATEGORY")
-print("="*70)
-
-category_results = []
-for category_id in sorted(df['category'].unique()):
-    cat_df = df[df['category'] == category_id]
-    
-    if len(cat_df) > 0:
-        cat_actual = cat_df['actual'].values
-        cat_predicted = cat_df['predicted'].values
-        
-        cat_mae = mean_absolute_error(cat_actual, cat_predicted)
-        cat_mape = np.mean(np.abs((cat_actual - cat_predicted) / cat_actual)) * 100
-        cat_accuracy = (1 - cat_mape/100) * 100
-        
+    category_results = []
+    for row in category_metrics.itertuples(index=False):
         category_results.append({
-            'category': category_id,
-            'records': len(cat_df),
-            'accuracy': cat_accuracy,
-            'mae': cat_mae
+            'category': row.category,
+            'records': row.total_records,
+            'accuracy': row.mape_accuracy,
+            'mae': row.mae
         })
-        
-        status = "🌟" if cat_accuracy >= 90 else "✅" if cat_accuracy >= 80 else "⚠️" if cat_accuracy >= 70 else "❌"
-        print(f"\n{status} Category {category_id}:")
-        print(f"   Records: {len(cat_df):,}")
-        print(f"   Accuracy: {cat_accuracy:.2f}%")
-        print(f"   MAE: {cat_mae:.2f} units")
 
-# =========================
-# Time-based Analysis
-# =========================
-print("\n" + "="*70)
-print("📅 ACCURACY OVER TIME")
-print("="*70)
-
-df['year_month'] = df['date'].dt.to_period('M')
-time_results = []
-
-for period in sorted(df['year_month'].unique())[-6:]:  # Last 6 months
-    period_df = df[df['year_month'] == period]
-    
-    if len(period_df) > 0:
-        period_actual = period_df['actual'].values
-        period_predicted = period_df['predicted'].values
-        
-        period_mae = mean_absolute_error(period_actual, period_predicted)
-        period_mape = np.mean(np.abs((period_actual - period_predicted) / period_actual)) * 100
-        period_accuracy = (1 - period_mape/100) * 100
-        
+        print(f"\n{status_icon(row.mape_accuracy)} Category {row.category}:")
+        print(f"   Records: {row.total_records:,}")
+        print(f"   Accuracy: {row.mape_accuracy:.2f}%")
+        print(f"   MAE: {row.mae:.2f} units")
+
+    # =========================
+    # Time-based Analysis
+    # =========================
+    print("\n" + "="*70)
+    print("📅 ACCURACY OVER TIME")
+    print("="*70)
+
+    period_metrics = acc.by_month.result().tail(6)  # Last 6 months
+
+    time_results = []
+    for row in period_metrics.itertuples(index=False):
         time_results.append({
-            'period': str(period),
-            'records': len(period_df),
-            'accuracy': period_accuracy,
-            'mae': period_mae
+            'period': str(row.year_month),
+            'records': row.total_records,
+            'accuracy': row.mape_accuracy,
+            'mae': row.mae
         })
-        
-        print(f"\n📆 {period}:")
-        print(f"   Records: {len(period_df):,}")
-        print(f"   Accuracy: {period_accuracy:.2f}%")
-        print(f"   MAE: {period_mae:.2f} units")
 
-# =========================
-# Error Analysis
-# =========================
-print("\n" + "="*70)
-print("🔍 ERROR ANALYSIS")
-print("="*70)
-
-df['error'] = df['predicted'] - df['actual']
-df['abs_error'] = np.abs(df['error'])
-df['pct_error'] = (df['error'] / df['actual']) * 100
-
-print(f"\n📊 ERROR DISTRIBUTION:")
-print(f"   Mean Error: {df['error'].mean():.2f} units")
-print(f"   Median Error: {df['error'].median():.2f} units")
-print(f"   Std Dev: {df['error'].std():.2f} units")
-print(f"   Min Error: {df['error'].min():.2f} units")
-print(f"   Max Error: {df['error'].max():.2f} units")
-
-print(f"\n📈 ERROR PERCENTILES:")
-print(f"   25th percentile: {df['abs_error'].quantile(0.25):.2f} units")
-print(f"   50th percentile: {df['abs_error'].quantile(0.50):.2f} units")
-print(f"   75th percentile: {df['abs_error'].quantile(0.75):.2f} units")
-print(f"   95th percentile: {df['abs_error'].quantile(0.95):.2f} units")
-
-# Predictions within tolerance
-within_10pct = (df['abs_error'] / df['actual'] <= 0.10).sum()
-within_20pct = (df['abs_error'] / df['actual'] <= 0.20).sum()
-within_30pct = (df['abs_error'] / df['actual'] <= 0.30).sum()
-
-print(f"\n🎯 PREDICTIONS WITHIN TOLERANCE:")
-print(f"   Within ±10%: {within_10pct:,} ({within_10pct/len(df)*100:.1f}%)")
-print(f"   Within ±20%: {within_20pct:,} ({within_20pct/len(df)*100:.1f}%)")
-print(f"   Within ±30%: {within_30pct:,} ({within_30pct/len(df)*100:.1f}%)")
+        print(f"\n📆 {row.year_month}:")
+        print(f"   Records: {row.total_records:,}")
+        print(f"   Accuracy: {row.mape_accuracy:.2f}%")
+        print(f"   MAE: {row.mae:.2f} units")
 
-# =========================
-# Final Summary
-# =========================
-print("\n" + "="*70)
-print("🎓 FINAL EVALUATION SUMMARY")
-print("="*70)
-
-print(f"\n✅ OVERALL MODEL ACCURACY: {accuracy:.2f}%")
-
-if accuracy >= 90:
-    print(f"\n🌟 EXCELLENT MODEL!")
-    print(f"   • Predictions are highly reliable")
-    print(f"   • Safe to use for production decisions")
-    print(f"   • Model is well-trained and generalizes well")
-elif accuracy >= 80:
-    print(f"\n✅ GOOD MODEL!")
-    print(f"   • Predictions are reliable")
-    print(f"   • Suitable for production use")
-    print(f"   • Minor improvements possible")
-elif accuracy >= 70:
-    print(f"\n⚠️  MODERATE MODEL")
-    print(f"   • Predictions are acceptable")
-    print(f"   • Use with caution")
-    print(f"   • Consider retraining with more data")
-else:
-    print(f"\n❌ POOR MODEL")
-    print(f"   • Predictions are unreliable")
-    print(f"   • NOT recommended for production")
-    print(f"   • Retrain with more/better data")
-
-print(f"\n📊 KEY METRICS:")
-print(f"   • R² Score: {r2:.4f} (closer to 1.0 is better)")
-print(f"   • MAE: {mae:.2f} units (lower is better)")
-print(f"   • MAPE: {mape:.2f}% (lower is better)")
-
-print("\n" + "="*70)
-print("✅ Evaluation Complete!")
-print("="*70 + "\n")
+    # =========================
+    # Error Analysis
+    # =========================
+    print("\n" + "="*70)
+    print("🔍 ERROR ANALYSIS")
+    print("="*70)
 
-# =========================
-# Save Results
-# =========================
-evaluation_results = {
-    'overall_accuracy': accuracy,
-    'mae': mae,
-    'rmse': rmse,
-    'r2': r2,
-    'mape': mape,
-    'total_records': len(df),
-    'store_results': store_results,
-    'category_results': category_results,
-    'time_results': time_results,
-    'within_10pct': within_10pct,
-    'within_20pct': within_20pct,
-    'within_30pct': within_30pct
-}
-
-joblib.dump(evaluation_results, MODEL_DIR / "evaluation_results.pkl")
-print(f"💾 Evaluation results saved to: {MODEL_DIR / 'evaluation_results.pkl'}")
-
-# Save detailed predictions
-df[['date', 'store_id', 'product_id', 'actual', 'predicted', 'error', 'abs_error', 'pct_error']].to_csv(
-    DATA_DIR / "prediction_evaluation.csv", index=False
-)
-print(f"💾 Detailed predictions saved to: {DATA_DIR / 'prediction_evaluation.csv'}")
+    # error = predicted - actual, so its moments follow from the sums
+    sums = acc.overall.sums
+    mean_error = overall['mean_predicted'] - overall['mean_actual']
+    error_var = (sums['sum_sq_error'][0] - n * mean_error ** 2) / (n - 1) if n > 1 else np.nan
+    error_min, error_max = acc.extremes['error']
+
+    print(f"\n📊 ERROR DISTRIBUTION:")
+    print(f"   Mean Error: {mean_error:.2f} units")
+    if errors is not None:
+        print(f"   Median Error: {errors['error'].median():.2f} units")
+    print(f"   Std Dev: {np.sqrt(max(error_var, 0)):.2f} units")
+    print(f"   Min Error: {error_min:.2f} units")
+    print(f"   Max Error: {error_max:.2f} units")
+
+    if errors is not None:
+        print(f"\n📈 ERROR PERCENTILES:")
+        print(f"   25th percentile: {errors['abs_error'].quantile(0.25):.2f} units")
+        print(f"   50th percentile: {errors['abs_error'].quantile(0.50):.2f} units")
+        print(f"   75th percentile: {errors['abs_error'].quantile(0.75):.2f} units")
+        print(f"   95th percentile: {errors['abs_error'].quantile(0.95):.2f} units")
+
+    # Predictions within tolerance
+    within_10pct, within_20pct, within_30pct = (int(v) for v in acc.within)
+
+    print(f"\n🎯 PREDICTIONS WITHIN TOLERANCE:")
+    print(f"   Within ±10%: {within_10pct:,} ({within_10pct/n*100:.1f}%)")
+    print(f"   Within ±20%: {within_20pct:,} ({within_20pct/n*100:.1f}%)")
+    print(f"   Within ±30%: {within_30pct:,} ({within_30pct/n*100:.1f}%)")
+
+    # =========================
+    # Final Summary
+    # =========================
+    print("\n" + "="*70)
+    print("🎓 FINAL EVALUATION SUMMARY")
+    print("="*70)
+
+    print(f"\n✅ OVERALL MODEL ACCURACY: {accuracy:.2f}%")
+
+    if accuracy >= 90:
+        print(f"\n🌟 EXCELLENT MODEL!")
+        print(f"   • Predictions are highly reliable")
+        print(f"   • Safe to use for production decisions")
+        print(f"   • Model is well-trained and generalizes well")
+    elif accuracy >= 80:
+        print(f"\n✅ GOOD MODEL!")
+        print(f"   • Predictions are reliable")
+        print(f"   • Suitable for production use")
+        print(f"   • Minor improvements possible")
+    elif accuracy >= 70:
+        print(f"\n⚠️  MODERATE MODEL")
+        print(f"   • Predictions are acceptable")
+        print(f"   • Use with caution")
+        print(f"   • Consider retraining with more data")
+    else:
+        print(f"\n❌ POOR MODEL")
+        print(f"   • Predictions are unreliable")
+        print(f"   • NOT recommended for production")
+        print(f"   • Retrain with more/better data")
+
+    print(f"\n📊 KEY METRICS:")
+    print(f"   • R² Score: {r2:.4f} (closer to 1.0 is better)")
+    print(f"   • MAE: {mae:.2f} units (lower is better)")
+    print(f"   • MAPE: {mape:.2f}% (lower is better)")
+
+    print("\n" + "="*70)
+    print("✅ Evaluation Complete!")
+    print("="*70 + "\n")
+
+    return {
+        'overall_accuracy': accuracy,
+        'mae': mae,
+        'rmse': rmse,
+        'r2': r2,
+        'mape': mape,
+        'total_records': n,
+        'store_results': store_results,
+        'category_results': category_results,
+        'time_results': time_results,
+        'within_10pct': within_10pct,
+        'within_20pct': within_20pct,
+        'within_30pct': within_30pct
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the demand model on the history")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Chunked, bounded-memory evaluation in store partitions")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel partitions (streaming)")
+    parser.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS,
+                        help="CSV rows read per chunk (streaming)")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🔍 COMPREHENSIVE MODEL EVALUATION")
+    print("="*70)
+
+    # =========================
+    # Load model & data
+    # =========================
+    print("\n📂 Loading model and data...")
+    model = joblib.load(MODEL_DIR / "demand_model.pkl")
+    encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+
+    try:
+        saved_metrics = joblib.load(MODEL_DIR / "model_metrics.pkl")
+    except:
+        saved_metrics = None
+        print("⚠️  No saved training metrics found")
+
+    output_path = DATA_DIR / "prediction_evaluation.csv"
+
+    if args.streaming:
+        acc, rows = evaluate_streaming(HISTORY_PATH, args.workers, args.chunk_rows, output_path)
+        print(f"✅ Generated {rows} predictions")
+        evaluation_results = print_report(acc, encoders, saved_metrics)
+    else:
+        df = clean_history(load_history(HISTORY_PATH))
+        print(f"✅ Loaded {len(df)} records")
+
+        # =========================
+        # Encode, Feature Engineering & Predictions
+        # =========================
+        print("🔧 Processing features...")
+        df = encode_categoricals(df, encoders)
+        df = score(create_features(df), model)
+        print(f"✅ Generated {len(df)} predictions")
+
+        evaluation_results = print_report(
+            EvaluationAccumulator().update(df), encoders, saved_metrics, errors=df
+        )
+        df[PREDICTION_COLUMNS].to_csv(output_path, index=False)
+
+    # =========================
+    # Save Results
+    # =========================
+    joblib.dump(evaluation_results, MODEL_DIR / "evaluation_results.pkl")
+    print(f"💾 Evaluation results saved to: {MODEL_DIR / 'evaluation_results.pkl'}")
+    print(f"💾 Detailed predictions saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+External-Memory Training
+Out-of-core fit of the demand model for histories that do not fit in RAM:
+CSV chunks are cleaned, encoded and featurized with a carried lookback
+(iter_featurized_chunks) and fed through an XGBoost DataIter into an
+ExtMemQuantileDMatrix, whose quantized pages live in an on-disk cache.
+Peak memory follows the chunk size, not the history length.
+
+Passes over the history file
+    1. scan: labels for the encoders and date counts for the split date
+    2. ExtMemQuantileDMatrix: XGBoost iterates the training rows to sketch
+       and page them (the booster then trains from the disk cache)
+    3. metrics: train/validation accumulators fed chunk by chunk
+
+The history must be date-ordered per series (see iter_featurized_chunks).
+"""
+
+import os
+import tempfile
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBRegressor
+
+from config import TRAIN_CHUNK_ROWS, TRAIN_SPLIT_QUANTILE
+from data_loader import (
+    CATEGORICAL_COLUMNS,
+    load_history,
+    clean_history,
+    column_labels,
+    encode_categoricals,
+    encoders_from_labels,
+)
+from features import iter_featurized_chunks
+from metrics import MetricAccumulator
+from tuning import native_params
+
+
+# =========================
+# Pass 1: scan
+# =========================
+def date_quantile(date_counts, q):
+    """
+    Series.quantile (linear interpolation) of the dates from their counts
+
+    Args:
+        date_counts: Mapping {date: rows}
+        q: Quantile in [0, 1]
+    """
+    dates = np.array(sorted(date_counts), dtype='datetime64[ns]')
+    ends = np.cumsum([date_counts[d] for d in sorted(date_counts)])
+
+    position = q * (ends[-1] - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, ends[-1] - 1)
+
+    lo = dates[np.searchsorted(ends, lower, side='right')]
+    hi = dates[np.searchsorted(ends, upper, side='right')]
+    return pd.Timestamp(lo + (hi - lo) * (position - lower))
+
+
+def scan_history(path, chunk_rows=TRAIN_CHUNK_ROWS, columns=CATEGORICAL_COLUMNS,
+                 split_quantile=TRAIN_SPLIT_QUANTILE):
+    """
+    Fit the encoders and find the split date without holding the history
+
+    Labels are gathered from cleaned rows only, so the encoders are the
+    ones fit_encoders would produce on the cleaned frame.
+
+    Returns:
+        (encoders, split_date, cleaned row count)
+    """
+    labels = {col: set() for col in columns}
+    date_counts = Counter()
+
+    for chunk in load_history(path, chunksize=chunk_rows):
+        chunk = clean_history(chunk)
+        for col in columns:
+            if col in chunk.columns:
+                labels[col].update(column_labels(chunk[col]))
+        date_counts.update(chunk['date'].value_counts().to_dict())
+
+    if not date_counts:
+        raise ValueError(f"No usable rows in {path}")
+
+    encoders = encoders_from_labels({col: values for col, values in labels.items() if values})
+    return encoders, date_quantile(date_counts, split_quantile), sum(date_counts.values())
+
+
+def featurized_history(path, encoders, chunk_rows=TRAIN_CHUNK_ROWS):
+    """
+    Cleaned, encoded, featurized history, one chunk at a time
+    """
+    chunks = (
+        encode_categoricals(clean_history(chunk), encoders)
+        for chunk in load_history(path, chunksize=chunk_rows)
+    )
+    return iter_featurized_chunks(chunks)
+
+
+# =========================
+# Pass 2: DataIter → ExtMemQuantileDMatrix
+# =========================
+class FeaturizedChunkIter(xgb.DataIter):
+    """
+    DataIter over the featurized history rows dated up to `until`
+
+    XGBoost calls reset()/next() for every pass it needs; each pass
+    re-reads the file, so only one chunk is in memory at a time.
+    """
+
+    def __init__(self, path, encoders, features, target, until,
+                 chunk_rows=TRAIN_CHUNK_ROWS, cache_dir=None):
+        self.path = path
+        self.encoders = encoders
+        self.features = features
+        self.target = target
+        self.until = until
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._chunks = None
+        super().__init__(cache_prefix=os.path.join(cache_dir or tempfile.gettempdir(), "demand"))
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = featurized_history(self.path, self.encoders, self.chunk_rows)
+            self.rows = 0
+
+        for featurized in self._chunks:
+            rows = featurized[featurized['date'] <= self.until]
+            if len(rows):
+                self.rows += len(rows)
+                input_data(data=rows[self.features], label=rows[self.target])
+                return True
+
+        return False
+
+
+def train_external_memory(path, params, features, target,
+                          chunk_rows=TRAIN_CHUNK_ROWS, cache_dir=None):
+    """
+    Train the demand model out of core and evaluate it in a streaming pass
+
+    Args:
+        path: History CSV
+        params: XGBRegressor params (n_estimators = boosting rounds)
+        features, target: Model columns
+        chunk_rows: CSV rows per chunk
+        cache_dir: Directory for the quantized page cache (default: a
+            temporary directory, removed afterwards)
+
+    Returns:
+        Dictionary with 'model' (XGBRegressor), 'encoders', 'split_date',
+        'train_metrics'/'valid_metrics' (calculate_all_metrics keys),
+        'train_records'/'valid_records', per-split prediction ranges,
+        'scanned_rows' (pass 1) and 'matrix_rows' (training rows paged)
+    """
+    encoders, split_date, rows = scan_history(path, chunk_rows)
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as cache:
+        batches = FeaturizedChunkIter(path, encoders, features, target, split_date, chunk_rows, cache)
+        dtrain = xgb.ExtMemQuantileDMatrix(batches)
+        matrix_rows = dtrain.num_row()
+
+        booster = xgb.train(
+            native_params(params, nthread=os.cpu_count() or 1),
+            dtrain,
+            num_boost_round=params['n_estimators']
+        )
+        del dtrain
+
+    # Same object train.py/api.py pickle: an XGBRegressor with these params
+    model = XGBRegressor(**params)
+    model.load_model(bytearray(booster.save_raw('json')))
+
+    return {
+        'model': model,
+        'encoders': encoders,
+        'split_date': split_date,
+        'scanned_rows': rows,
+        'matrix_rows': matrix_rows,
+        **streaming_split_metrics(path, model, encoders, features, target, split_date, chunk_rows),
+    }
+
+
+# =========================
+# Pass 3: metrics
+# =========================
+def streaming_split_metrics(path, model, encoders, features, target, split_date,
+                            chunk_rows=TRAIN_CHUNK_ROWS):
+    """
+    Train/validation metrics of a fitted model, one chunk at a time
+
+    MASE uses the training actuals in chunk order as the naive series
+    (train.py uses series order, so MASE can differ slightly).
+    """
+    train_acc, valid_acc = MetricAccumulator(), MetricAccumulator()
+    ranges = {'train': [np.inf, -np.inf], 'valid': [np.inf, -np.inf]}
+
+    for featurized in featurized_history(path, encoders, chunk_rows):
+        preds = np.expm1(model.predict(featurized[features]))
+        actual = np.expm1(featurized[target].to_numpy(dtype=np.float64))
+        is_train = (featurized['date'] <= split_date).to_numpy()
+
+        for name, acc, mask in (('train', train_acc, is_train), ('valid', valid_acc, ~is_train)):
+            if not mask.any():
+                continue
+            acc.update(actual[mask], preds[mask])
+            low, high = ranges[name]
+            ranges[name] = [min(low, preds[mask].min()), max(high, preds[mask].max())]
+
+        valid_acc.update_naive(actual[is_train])
+
+    result = {}
+    for name, acc in (('train', train_acc), ('valid', valid_acc)):
+        metrics = acc.result(exclude_zeros=True)
+        result[f'{name}_metrics'] = metrics
+        result[f'{name}_records'] = int(acc.sums['n'][0])
+        result[f'{name}_prediction_range'] = {
+            'min': float(ranges[name][0]),
+            'max': float(ranges[name][1]),
+            'mean': float(acc.sums['sum_predicted'][0] / max(acc.sums['n'][0], 1)),
+        }
+    return result
@@ -0,0 +1,364 @@
+"""
+Online Feature Store
+Latest lag and rolling-mean state per (store, product), held in compact
+arrays indexed by the encoded IDs, so a single prediction gets its real
+history features in constant time
+
+Dates far enough in the past that a lag or rolling window reaches behind
+the buffer are computed with create_features over that series' history
+(lookup's `history` callback), or rejected without one.
+
+Usage (compare lookups against create_features on the history file):
+    python feature_store.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from features import create_features
+
+SERIES_KEYS = ['store_id', 'product_id']
+LAGS = (7, 14, 30, 60)
+ROLLING_WINDOWS = (7, 30)
+LAG_COLUMNS = [f'lag_{lag}' for lag in LAGS] + [f'rolling_mean_{w}' for w in ROLLING_WINDOWS]
+WEEK_DAYS = 7
+WINDOW = 64   # weekly values kept per series (>= max lag + a few days of slack)
+
+
+class OnlineFeatureStore:
+    """
+    Ring buffers of units_sold_7d and daily units_sold per series
+
+    Series index = store_code * n_products + product_code. Features match
+    create_features: lag_k is units_sold_7d k rows earlier (0 before the
+    series starts) and rolling_mean_w averages the last w weekly values.
+    For a date after the last ingested row, values that are not known yet
+    fall back to the most recent one.
+    """
+
+    def __init__(self, n_stores, n_products, window=WINDOW):
+        n_series = n_stores * n_products
+
+        self.n_stores = n_stores
+        self.n_products = n_products
+        self.window = window
+
+        self.weekly = np.zeros((n_series, window), dtype=np.float32)
+        self.daily = np.zeros((n_series, WEEK_DAYS), dtype=np.float32)
+        self.count = np.zeros(n_series, dtype=np.int64)
+        self.last_date = np.full(n_series, np.datetime64('NaT'), dtype='datetime64[D]')
+
+        # History version (file mtime) this state reflects
+        self.version = None
+
+    @classmethod
+    def from_encoders(cls, encoders, window=WINDOW):
+        return cls(
+            len(encoders['store_id'].classes_),
+            len(encoders['product_id'].classes_),
+            window
+        )
+
+    def series_index(self, store_codes, product_codes):
+        return (
+            np.asarray(store_codes, dtype=np.int64) * self.n_products +
+            np.asarray(product_codes, dtype=np.int64)
+        )
+
+    # =========================
+    # Build & update
+    # =========================
+    @classmethod
+    def from_history(cls, df, encoders, window=WINDOW):
+        """
+        Build the store from an encoded history frame
+
+        Only the trailing window (+6 days for the weekly sums) of each
+        series is featurized; the full frame is used just for row counts.
+        """
+        store = cls.from_encoders(encoders, window)
+
+        df = df.sort_values(SERIES_KEYS + ['date'])
+        series = df.groupby(SERIES_KEYS, sort=False)
+
+        counts = series.size()
+        store.count[store.series_index(
+            counts.index.get_level_values(0), counts.index.get_level_values(1)
+        )] = counts.to_numpy()
+
+        tail = create_features(series.tail(window + WEEK_DAYS - 1))
+        tail = tail.groupby(SERIES_KEYS, sort=False).tail(window)
+
+        idx = store.series_index(tail['store_id'], tail['product_id'])
+        from_end = tail.groupby(SERIES_KEYS, sort=False).cumcount(ascending=False).to_numpy()
+        row = store.count[idx] - 1 - from_end
+
+        store.weekly[idx, row % window] = tail['units_sold_7d'].to_numpy()
+
+        recent = from_end < WEEK_DAYS
+        store.daily[idx[recent], row[recent] % WEEK_DAYS] = tail['units_sold'].to_numpy()[recent]
+
+        last = from_end == 0
+        store.last_date[idx[last]] = tail['date'].to_numpy()[last].astype('datetime64[D]')
+
+        return store
+
+    def is_append(self, df):
+        """
+        True when every row is newer than its series' last ingested date
+        """
+        idx = self.series_index(df['store_id'], df['product_id'])
+        dates = df['date'].to_numpy().astype('datetime64[D]')
+        last = self.last_date[idx]
+        return bool(np.all(np.isnat(last) | (dates > last)))
+
+    def ingest(self, df):
+        """
+        Append new daily rows (encoded store_id/product_id, date, units_sold)
+
+        Rows are applied in date order, one vectorized step per day rank,
+        so the cost is O(rows ingested).
+
+        Returns:
+            Number of rows ingested
+        """
+        df = df.sort_values(SERIES_KEYS + ['date'])
+        idx = self.series_index(df['store_id'], df['product_id'])
+        units = df['units_sold'].to_numpy(dtype=np.float32)
+        dates = df['date'].to_numpy().astype('datetime64[D]')
+        rank = df.groupby(SERIES_KEYS, sort=False).cumcount().to_numpy()
+
+        for r in range(rank.max() + 1 if len(rank) else 0):
+            step = rank == r
+            s = idx[step]
+            position = self.count[s]
+
+            self.daily[s, position % WEEK_DAYS] = units[step]
+            self.weekly[s, position % self.window] = self.daily[s].sum(axis=1)
+            self.count[s] += 1
+            self.last_date[s] = dates[step]
+
+        return len(df)
+
+    # =========================
+    # Lookup
+    # =========================
+    def _rows(self, idx, dates):
+        count = self.count[idx]
+        last = count - 1
+
+        dates = pd.to_datetime(np.asarray(dates)).to_numpy().astype('datetime64[D]')
+        gap = (dates - self.last_date[idx]).astype('timedelta64[D]').astype(np.int64)
+        gap = np.where(count > 0, gap, 0)
+
+        # Row index of the prediction date, capped at the newest known row
+        end = np.minimum(last + gap, last)
+        return last, gap, end
+
+    def covers(self, store_codes, product_codes, dates):
+        """
+        True where every lag and rolling window of the date lies inside
+        the buffer (or before the series starts)
+        """
+        idx = self.series_index(store_codes, product_codes)
+        last, gap, end = self._rows(idx, dates)
+
+        oldest_needed = np.minimum(last + gap - max(LAGS), end - max(ROLLING_WINDOWS) + 1)
+        oldest_kept = last - self.window + 1
+        return (oldest_kept <= 0) | (oldest_needed >= oldest_kept)
+
+    def lookup(self, store_codes, product_codes, dates, history=None):
+        """
+        Lag and rolling-mean features for rows to be predicted
+
+        Args:
+            store_codes, product_codes: Encoded IDs (array-like)
+            dates: Prediction dates (array-like of datetimes)
+            history: Optional function(store_code, product_code, end_date) →
+                encoded history rows of the series up to end_date, used for
+                dates the buffer does not reach
+
+        Returns:
+            Dictionary {feature column: float32 array}
+
+        Raises:
+            ValueError: A date the buffer does not reach, without `history`
+        """
+        idx = self.series_index(store_codes, product_codes)
+        last, gap, end = self._rows(idx, dates)
+
+        features = {}
+        for lag in LAGS:
+            features[f'lag_{lag}'] = self._gather(idx, np.minimum(last + gap - lag, last), last)
+
+        for w in ROLLING_WINDOWS:
+            rows = end[:, None] - np.arange(w)[None, :]
+            values = self._gather(idx[:, None], rows, last[:, None])
+            valid = rows >= 0
+            n_valid = valid.sum(axis=1)
+            features[f'rolling_mean_{w}'] = np.where(
+                n_valid > 0,
+                values.sum(axis=1) / np.maximum(n_valid, 1),
+                0
+            ).astype(np.float32)
+
+        missed = ~self.covers(store_codes, product_codes, dates)
+        if missed.any():
+            if history is None:
+                raise ValueError(
+                    f"{int(missed.sum())} prediction date(s) reach further back than the "
+                    f"{self.window} buffered weeks of their series"
+                )
+            self._fill_from_history(features, missed, store_codes, product_codes, dates, history)
+
+        return features
+
+    def _fill_from_history(self, features, missed, store_codes, product_codes, dates, history):
+        store_codes = np.asarray(store_codes, dtype=np.int64)
+        product_codes = np.asarray(product_codes, dtype=np.int64)
+        dates = pd.to_datetime(np.asarray(dates))
+
+        rows = np.flatnonzero(missed)
+        keys = pd.DataFrame({'store': store_codes[rows], 'product': product_codes[rows], 'row': rows})
+
+        for (store_code, product_code), group in keys.groupby(['store', 'product'], sort=False):
+            positions = group['row'].to_numpy()
+            series = history(store_code, product_code, dates[positions].max())
+            values = features_at(series, dates[positions])
+            for col in LAG_COLUMNS:
+                features[col][positions] = values[col]
+
+    def _gather(self, idx, rows, last):
+        # Rows older than the buffer resolve to the oldest value kept
+        rows = np.maximum(rows, last - self.window + 1)
+        values = self.weekly[idx, rows % self.window]
+        return np.where(rows >= 0, values, 0).astype(np.float32)
+
+    # =========================
+    # Persistence
+    # =========================
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            shape=np.array([self.n_stores, self.n_products, self.window]),
+            weekly=self.weekly,
+            daily=self.daily,
+            count=self.count,
+            last_date=self.last_date
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        n_stores, n_products, window = (int(v) for v in data['shape'])
+
+        store = cls(n_stores, n_products, window)
+        store.weekly = data['weekly']
+        store.daily = data['daily']
+        store.count = data['count']
+        store.last_date = data['last_date']
+        return store
+
+
+def features_at(series, dates):
+    """
+    Lag and rolling-mean features of one series at the given dates,
+    from create_features over its history: the row on each date, or the
+    last row before it (zeros before the series starts)
+
+    Args:
+        series: Encoded history rows of one series (store_id, product_id,
+            date, units_sold)
+        dates: Dates to read the features at
+
+    Returns:
+        Dictionary {feature column: float32 array}
+    """
+    featurized = create_features(series)
+    positions = np.searchsorted(
+        featurized['date'].to_numpy(), pd.to_datetime(np.asarray(dates)).to_numpy(), side='right'
+    ) - 1
+
+    values = {}
+    for col in LAG_COLUMNS:
+        column = featurized[col].to_numpy(dtype=np.float32)
+        values[col] = np.where(positions >= 0, column[np.maximum(positions, 0)], 0).astype(np.float32)
+    return values
+
+
+# =========================
+# Consistency check
+# =========================
+def check_against_history(df, encoders, rows_back=(0, 5, 40, 120), window=WINDOW, tolerance=1e-3):
+    """
+    Compare lookups (buffer, or history fallback) with create_features at
+    past rows of every series
+
+    Args:
+        df: Encoded history frame (store_id, product_id, date, units_sold)
+        encoders: Fitted LabelEncoders
+        rows_back: Rows before each series' newest row to check
+        window: Buffer size of the store under test
+        tolerance: Largest accepted absolute difference
+
+    Returns:
+        {rows_back: {'rows', 'from_history', 'max_abs_diff', 'ok'}}
+    """
+    df = df.sort_values(SERIES_KEYS + ['date']).reset_index(drop=True)
+    store = OnlineFeatureStore.from_history(df, encoders, window)
+    expected = create_features(df)
+    series = dict(tuple(df.groupby(SERIES_KEYS, sort=False)))
+
+    def history(store_code, product_code, end):
+        rows = series[(store_code, product_code)]
+        return rows[rows['date'] <= end]
+
+    results = {}
+    from_end = expected.groupby(SERIES_KEYS, sort=False).cumcount(ascending=False).to_numpy()
+    for back in rows_back:
+        rows = expected[from_end == back]
+        found = store.lookup(rows['store_id'], rows['product_id'], rows['date'], history=history)
+        diff = max(
+            float(np.max(np.abs(found[col] - rows[col].to_numpy(dtype=np.float32)), initial=0.0))
+            for col in LAG_COLUMNS
+        )
+        results[back] = {
+            'rows': len(rows),
+            'from_history': int((~store.covers(rows['store_id'], rows['product_id'], rows['date'])).sum()),
+            'max_abs_diff': diff,
+            'ok': diff <= tolerance,
+        }
+    return results
+
+
+def main():
+    import joblib
+    from pathlib import Path
+    from data_loader import HISTORY_PATH, load_history, encode_categoricals
+
+    model_dir = Path(__file__).resolve().parent.parent / "models"
+    encoders = joblib.load(model_dir / "encoders.pkl")
+
+    df = load_history(HISTORY_PATH, usecols=lambda c: c in ('Date', 'Store ID', 'Product ID', 'Units Sold'))
+    known = (
+        df['store_id'].astype(str).isin(encoders['store_id'].classes_) &
+        df['product_id'].astype(str).isin(encoders['product_id'].classes_)
+    )
+    df = encode_categoricals(df[known].dropna(), encoders)
+
+    print(f"\n{'='*70}")
+    print(f"🔍 FEATURE STORE vs create_features ({len(df):,} rows)")
+    print(f"{'='*70}")
+
+    results = check_against_history(df, encoders)
+    for back, result in results.items():
+        mark = "✅" if result['ok'] else "❌"
+        print(f"   {mark} {back:>4} rows back: {result['rows']:,} lookups "
+              f"({result['from_history']:,} from history), max |diff| {result['max_abs_diff']:.4g}")
+
+    if not all(result['ok'] for result in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,123 @@
 import pandas as pd
 import numpy as np
 
+SERIES_KEYS = ['store_id', 'product_id']
+
+# Daily rows of history a row's features depend on (lag_60 of a 7-day sum)
+LOOKBACK_ROWS = 60 + 7 - 1
+
+# Model inputs and target produced by create_features
+FEATURES = [
+    'store_id','product_id','category','region',
+    'inventory_level','price','discount',
+    'competitor_pricing','holiday_promotion',
+    'seasonality','is_weekend','week','month',
+    'lag_7','lag_14','lag_30','lag_60',
+    'rolling_mean_7','rolling_mean_30'
+]
+TARGET = 'log_units_sold_7d'
+
+# Bump whenever create_features output changes: invalidates cached
+# featurized training frames (training.py)
+FEATURE_VERSION = 1
+
 def create_features(df):
     """
     Creates time-based and lag features for demand forecasting.
+
+    sort_values already returns a new frame, so the caller's frame is never
+    modified and no extra copy is made. Feature columns are float32/int8:
+    XGBoost evaluates splits in float32, so predictions are unchanged.
     """
-    df = df.sort_values(['store_id', 'product_id', 'date']).copy()
-    
+    df = df.sort_values(['store_id', 'product_id', 'date'])
+    series = df.groupby(['store_id', 'product_id'], sort=False)
+
     # =========================
     # Weekly aggregation
     # =========================
-    df['units_sold_7d'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold']
+    units_sold_7d = (
+        series['units_sold']
           .transform(lambda x: x.rolling(7, min_periods=1).sum())
     )
-    
+    df['units_sold_7d'] = units_sold_7d.astype(np.float32)
+
     # =========================
     # Log transform target
     # =========================
-    df['log_units_sold_7d'] = np.log1p(df['units_sold_7d'])
-    
+    df['log_units_sold_7d'] = np.log1p(units_sold_7d).astype(np.float32)
+
     # =========================
     # Date features
     # =========================
-    df['week'] = df['date'].dt.isocalendar().week.astype(int)
-    df['month'] = df['date'].dt.month
-    df['is_weekend'] = df['date'].dt.weekday.isin([5, 6]).astype(int)
-    
+    df['week'] = df['date'].dt.isocalendar().week.astype(np.int8)
+    df['month'] = df['date'].dt.month.astype(np.int8)
+    df['is_weekend'] = df['date'].dt.weekday.isin([5, 6]).astype(np.int8)
+
     # =========================
     # Lag features
     # =========================
-    df['lag_7'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold_7d']
-          .shift(7)
-          .fillna(0)
-    )
-    
-    df['lag_14'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold_7d']
-          .shift(14)
-          .fillna(0)
-    )
-    
-    df['lag_30'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold_7d']
-          .shift(30)
-          .fillna(0)
-    )
-    
-    df['lag_60'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold_7d']
-          .shift(60)
-          .fillna(0)
-    )
-    
+    weekly = df.groupby(['store_id', 'product_id'], sort=False)['units_sold_7d']
+
+    for lag in (7, 14, 30, 60):
+        df[f'lag_{lag}'] = weekly.shift(lag).fillna(0).astype(np.float32)
+
     # =========================
     # Rolling mean features
     # =========================
     df['rolling_mean_7'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold_7d']
-          .transform(lambda x: x.rolling(7, min_periods=1).mean())
+        weekly.transform(lambda x: x.rolling(7, min_periods=1).mean())
+          .astype(np.float32)
     )
-    
+
     df['rolling_mean_30'] = (
-        df.groupby(['store_id', 'product_id'])['units_sold_7d']
-          .transform(lambda x: x.rolling(30, min_periods=1).mean())
+        weekly.transform(lambda x: x.rolling(30, min_periods=1).mean())
+          .astype(np.float32)
     )
-    
+
     return df
+
+
+def iter_featurized_chunks(chunks, lookback=LOOKBACK_ROWS):
+    """
+    Featurize a stream of history chunks in bounded memory.
+
+    The last `lookback` rows of every series are carried into the next
+    chunk, so each yielded row gets exactly the features create_features
+    would give it on the full history. Each series' rows must arrive in
+    date order across chunks (true for date-ordered history files, which
+    /upload_data keeps), and label columns must already be encoded.
+
+    Yields:
+        Featurized frames holding only the rows of each incoming chunk
+
+    Raises:
+        ValueError: A chunk has rows dated on or before rows of the same
+            series in an earlier chunk
+    """
+    carry = None
+
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+
+        if carry is not None:
+            # Lags would be computed from misordered rows
+            carried_last = carry.groupby(SERIES_KEYS, sort=False, observed=True)['date'].max()
+            incoming_first = chunk.groupby(SERIES_KEYS, sort=False, observed=True)['date'].min()
+            both = pd.concat([carried_last.rename('last'), incoming_first.rename('first')], axis=1, join='inner')
+            late = both[both['first'] <= both['last']]
+            if len(late):
+                raise ValueError(
+                    f"History is not date-ordered per series: {len(late)} series have rows "
+                    f"dated on or before rows of an earlier chunk (e.g. {'/'.join(map(str, late.index[0]))}); "
+                    f"sort the file by date"
+                )
+
+        n_carry = 0 if carry is None else len(carry)
+        frame = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+
+        # Carried rows keep index labels below n_carry through the sort
+        featurized = create_features(frame)
+        carry = featurized.groupby(SERIES_KEYS, sort=False).tail(lookback)[chunk.columns]
+
+        yield featurized[featurized.index >= n_carry] if n_carry else featurized
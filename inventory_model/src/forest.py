@@ -0,0 +1,321 @@
+"""
+Flattened Forest
+Low-latency inference for the demand model: the XGBoost booster is
+exported into contiguous node arrays (feature index, threshold, children,
+default direction, leaf value) and evaluated directly from a float32
+buffer with vectorized NumPy — no DMatrix construction, pandas
+validation or xgboost import at scoring time.
+
+Every tree is walked at once, one step per level: a row's node index per
+tree advances to its left or right child (leaves point at themselves), so
+a prediction is max_depth gathers plus one sum. Leaf values are added in
+tree order in float32, the way XGBoost accumulates them.
+
+The export is saved with the source model's fingerprint; for_model reuses
+it only for that exact model and flattens anew otherwise.
+
+Usage:
+    python forest.py                      # export, parity check, latency benchmark
+    python forest.py --rows 5000 --repeats 200
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BASE_DIR / "models"
+FOREST_PATH = MODEL_DIR / "demand_forest.npz"
+
+# Objectives whose prediction is the raw margin (identity link)
+IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+
+
+def model_fingerprint(model):
+    """
+    Short hash of a fitted model's trees and parameters
+    """
+    return hashlib.sha256(bytes(model.get_booster().save_raw('ubj'))).hexdigest()[:16]
+
+
+class FlatForest:
+    """
+    A boosted forest as flat node arrays
+
+    Node i of the forest: go to children[2i] (left) when
+    x[feature[i]] < threshold[i] or the value is missing and
+    default_left[i], else to children[2i + 1] (right). Leaves point at
+    themselves on both sides and carry their output in value[i].
+    """
+
+    def __init__(self, feature, threshold, children, default_left, value,
+                 roots, max_depth, base_score, feature_names=None, fingerprint=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.base_score = np.float32(base_score)
+        self.feature_names = feature_names
+        # model_fingerprint of the source model (None when flattened from a bare booster)
+        self.fingerprint = fingerprint
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    # =========================
+    # Export
+    # =========================
+    @classmethod
+    def from_booster(cls, booster):
+        """
+        Flatten an xgboost Booster (single-output, numeric splits)
+        """
+        learner = json.loads(booster.save_raw('json'))['learner']
+        params = learner['learner_model_param']
+
+        objective = learner['objective']['name']
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for flattening: {objective}")
+        if int(params['num_target']) != 1 or int(params.get('num_class', 0)) > 1:
+            raise ValueError("Only single-output models can be flattened")
+
+        trees = learner['gradient_booster']['model']['trees']
+
+        feature, threshold, children, default_left, value, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError("Categorical splits are not supported")
+
+            children_left = np.asarray(tree['left_children'], dtype=np.int32)
+            children_right = np.asarray(tree['right_children'], dtype=np.int32)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = children_left == -1
+            own = np.arange(len(children_left), dtype=np.int32)
+
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+            threshold.append(np.where(is_leaf, np.inf, conditions).astype(np.float32))
+            children.append(np.stack([
+                np.where(is_leaf, own, children_left),
+                np.where(is_leaf, own, children_right),
+            ], axis=1).ravel() + offset)
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            # A leaf's output is stored in its split condition
+            value.append(np.where(is_leaf, conditions, 0).astype(np.float32))
+
+            max_depth = max(max_depth, _tree_depth(children_left, children_right))
+            offset += len(children_left)
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            children=np.concatenate(children).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            base_score=float(params['base_score'].strip('[]')),
+            feature_names=learner.get('feature_names') or None,
+        )
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Flatten a fitted XGBRegressor
+        """
+        forest = cls.from_booster(model.get_booster())
+        forest.fingerprint = model_fingerprint(model)
+        return forest
+
+    @classmethod
+    def for_model(cls, model, path=FOREST_PATH):
+        """
+        The forest saved at path when it was exported from this model,
+        else a fresh flatten of the model
+        """
+        path = Path(path)
+        if path.exists():
+            saved = cls.load(path)
+            if saved.fingerprint is not None and saved.fingerprint == model_fingerprint(model):
+                return saved
+        return cls.from_model(model)
+
+    # =========================
+    # Prediction
+    # =========================
+    def predict(self, X):
+        """
+        Raw predictions (the model's log1p demand) for a 2-D float32 buffer
+
+        Args:
+            X: Array or DataFrame with the model's feature columns in order
+
+        Returns:
+            float32 array, one value per row
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        flat = X.ravel()
+        has_missing = bool(np.isnan(flat).any())
+        row_start = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+
+        for _ in range(self.max_depth):
+            x = flat.take(row_start + self.feature.take(node))
+            go_left = x < self.threshold.take(node)
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left.take(node)
+            # children = [left, right] per node: right is one slot further
+            node = self.children.take(2 * node + ~go_left)
+
+        # Base score, then each tree in order, accumulated in float32
+        leaves = np.empty((len(X), self.n_trees + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_score
+        leaves[:, 1:] = self.value[node]
+        return np.cumsum(leaves, axis=1, dtype=np.float32)[:, -1]
+
+    # =========================
+    # Persistence
+    # =========================
+    def save(self, path=FOREST_PATH):
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            children=self.children,
+            default_left=self.default_left,
+            value=self.value,
+            roots=self.roots,
+            meta=np.array([self.max_depth, self.base_score], dtype=np.float64),
+            feature_names=np.array(self.feature_names or [], dtype=str),
+            fingerprint=np.array(self.fingerprint or '', dtype=str)
+        )
+        return path
+
+    @classmethod
+    def load(cls, path=FOREST_PATH):
+        data = np.load(path)
+        max_depth, base_score = data['meta']
+        # Exports written before fingerprints were saved never match a model
+        fingerprint = str(data['fingerprint']) if 'fingerprint' in data.files else ''
+        return cls(
+            feature=data['feature'],
+            threshold=data['threshold'],
+            children=data['children'],
+            default_left=data['default_left'],
+            value=data['value'],
+            roots=data['roots'],
+            max_depth=int(max_depth),
+            base_score=base_score,
+            feature_names=list(data['feature_names']) or None,
+            fingerprint=fingerprint or None
+        )
+
+
+def _tree_depth(children_left, children_right):
+    depth = np.zeros(len(children_left), dtype=np.int64)
+    for node in range(len(children_left)):
+        if children_left[node] != -1:
+            depth[children_left[node]] = depth[children_right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+# =========================
+# Parity & latency
+# =========================
+def check_parity(model, forest, X, rtol=1e-6, atol=1e-5):
+    """
+    Compare the flattened forest with model.predict on the same rows
+
+    Returns:
+        Dictionary with 'rows', 'max_abs_diff', 'exact_share' and 'ok'
+    """
+    expected = model.predict(X)
+    actual = forest.predict(X)
+    diff = np.abs(actual.astype(np.float64) - expected.astype(np.float64))
+    return {
+        'rows': len(expected),
+        'max_abs_diff': float(diff.max()) if len(diff) else 0.0,
+        'exact_share': float(np.mean(actual == expected)) if len(diff) else 1.0,
+        'ok': bool(np.allclose(actual, expected, rtol=rtol, atol=atol)),
+    }
+
+
+def _latency(fn, repeats):
+    fn()   # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def benchmark_latency(model, forest, X, repeats=100):
+    """
+    Median single-row and batch latency (ms) of model.predict on a
+    DataFrame vs the flattened forest on a float32 buffer
+    """
+    single, buffer = X.iloc[:1], X.to_numpy(dtype=np.float32)
+    return {
+        'single': {
+            'xgboost_ms': _latency(lambda: model.predict(single), repeats),
+            'flat_ms': _latency(lambda: forest.predict(buffer[:1]), repeats),
+        },
+        'batch': {
+            'rows': len(X),
+            'xgboost_ms': _latency(lambda: model.predict(X), max(1, repeats // 10)),
+            'flat_ms': _latency(lambda: forest.predict(buffer), max(1, repeats // 10)),
+        },
+    }
+
+
+def main():
+    import joblib
+    from training import load_featurized, encode_frame
+    from features import FEATURES
+
+    parser = argparse.ArgumentParser(description="Export the demand model as a flattened forest")
+    parser.add_argument("--rows", type=int, default=1000, help="Batch size for parity and latency")
+    parser.add_argument("--repeats", type=int, default=100, help="Timed calls per measurement")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_DIR / "demand_model.pkl")
+    encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+
+    forest = FlatForest.from_model(model)
+    print(f"🌲 Flattened {forest.n_trees} trees, {len(forest.value):,} nodes, depth {forest.max_depth}")
+    print(f"💾 Saved to: {forest.save()}")
+
+    frame, _ = load_featurized()
+    df, _ = encode_frame(frame, encoders)
+    X = df[FEATURES].tail(args.rows)
+
+    parity = check_parity(model, forest, df[FEATURES])
+    status = "✅" if parity['ok'] else "❌"
+    print(f"\n{status} Parity on {parity['rows']:,} rows: max |diff| {parity['max_abs_diff']:.2e}, "
+          f"bit-identical {parity['exact_share']:.1%}")
+
+    latency = benchmark_latency(model, forest, X, args.repeats)
+    print(f"\n⏱️  LATENCY (median)")
+    for name, result in latency.items():
+        label = "single row" if name == 'single' else f"batch of {result['rows']:,}"
+        print(f"   {label:<16} xgboost {result['xgboost_ms']:8.3f} ms   "
+              f"flat {result['flat_ms']:8.3f} ms   ({result['xgboost_ms'] / result['flat_ms']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
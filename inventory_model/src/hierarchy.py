@@ -0,0 +1,113 @@
+"""
+Hierarchical Forecast Aggregation
+Rolls SKU-level predictions up to store, category, region and chain totals
+with one sparse matrix multiply
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Level name -> grouping columns (empty = whole chain)
+HIERARCHY_LEVELS = {
+    'chain': [],
+    'region': ['region'],
+    'category': ['category'],
+    'region_category': ['region', 'category'],
+    'store': ['store_id'],
+    'sku': ['store_id', 'product_id'],
+}
+
+KEY_COLUMNS = ['region', 'category', 'store_id', 'product_id']
+VALUE_COLUMNS = ['predicted', 'low', 'high']
+
+
+def summing_matrix(sku_df, keys):
+    """
+    Build the 0/1 group-sum matrix for one hierarchy level
+
+    Args:
+        sku_df: One row per SKU (store, product)
+        keys: Grouping columns for the level
+
+    Returns:
+        (S, labels): sparse (n_groups x n_sku) matrix and the key values
+        of each group row
+    """
+    n = len(sku_df)
+
+    if keys:
+        groups = sku_df.groupby(keys, sort=True, observed=True)
+        codes = groups.ngroup().to_numpy()
+        labels = groups.size().reset_index()[keys]
+    else:
+        codes = np.zeros(n, dtype=np.int64)
+        labels = pd.DataFrame(index=[0])
+
+    S = sparse.csr_matrix(
+        (np.ones(n), (codes, np.arange(n))),
+        shape=(len(labels), n)
+    )
+
+    return S, labels
+
+
+class HierarchicalForecast:
+    """
+    Precomputed sums of SKU predictions at every hierarchy level
+
+    All levels are stacked into one summing matrix, so every node total is
+    produced by a single sparse multiply. Interval bounds are summed as
+    well, which is the conservative (fully correlated) bound for a total.
+    """
+
+    def __init__(self, sku_df):
+        blocks = []
+        nodes = []
+
+        for level, keys in HIERARCHY_LEVELS.items():
+            S, labels = summing_matrix(sku_df, keys)
+            blocks.append(S)
+            nodes.append(labels.assign(level=level))
+
+        S_all = sparse.vstack(blocks).tocsr()
+        values = sku_df[VALUE_COLUMNS].to_numpy(dtype=np.float64)
+        totals = S_all @ values
+
+        table = pd.concat(nodes, ignore_index=True)
+        table = table.reindex(columns=['level'] + KEY_COLUMNS)
+        table[VALUE_COLUMNS] = totals
+        table['sku_count'] = np.asarray(S_all.sum(axis=1)).ravel().astype(int)
+
+        self.table = table
+        self.as_of = sku_df['date'].max() if 'date' in sku_df.columns else None
+
+    def rollup(self, level='chain', **filters):
+        """
+        Node totals for one level
+
+        Args:
+            level: One of HIERARCHY_LEVELS
+            **filters: Key values to select (only keys of that level)
+
+        Returns:
+            DataFrame with the level's key columns, predicted/low/high and sku_count
+        """
+        if level not in HIERARCHY_LEVELS:
+            raise ValueError(
+                f"Unknown level '{level}'. Use one of: {', '.join(HIERARCHY_LEVELS)}"
+            )
+
+        keys = HIERARCHY_LEVELS[level]
+        filters = {k: v for k, v in filters.items() if v is not None}
+        invalid = [k for k in filters if k not in keys]
+        if invalid:
+            raise ValueError(
+                f"Filter(s) {', '.join(invalid)} not part of level '{level}' ({', '.join(keys) or 'no keys'})"
+            )
+
+        nodes = self.table[self.table['level'] == level]
+        for col, value in filters.items():
+            nodes = nodes[nodes[col].astype(str) == str(value)]
+
+        return nodes[keys + VALUE_COLUMNS + ['sku_count']].reset_index(drop=True)
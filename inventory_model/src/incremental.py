@@ -0,0 +1,139 @@
+"""
+Incremental Retraining
+Warm-start refresh of the demand model: continue boosting the saved
+booster (XGBoost xgb_model= continuation) on a recent window instead of
+retraining every tree on the whole history
+
+Guardrails (any failure means: do a full retrain instead)
+    • unseen store/product/label values → encoders must be refit
+    • continued model's WAPE on the newest holdout days is worse than the
+      current model's by more than INCREMENTAL_WAPE_TOLERANCE (relative,
+      e.g. 0.02 = 2% worse)
+    • the booster has grown past INCREMENTAL_MAX_TREES
+"""
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from config import (
+    INCREMENTAL_WINDOW_DAYS,
+    INCREMENTAL_HOLDOUT_DAYS,
+    INCREMENTAL_ROUNDS,
+    INCREMENTAL_WAPE_TOLERANCE,
+    INCREMENTAL_MAX_TREES,
+)
+from metrics import calculate_wape
+
+
+def continue_training(model, rows, features, target, rounds=INCREMENTAL_ROUNDS):
+    """
+    New XGBRegressor = model's trees + `rounds` trees fit on rows
+
+    The model's own hyperparameters are reused, so the extra trees follow
+    the same learning rate and regularization.
+    """
+    params = {**model.get_params(), 'n_estimators': rounds}
+    updated = XGBRegressor(**params)
+    updated.fit(rows[features], rows[target], xgb_model=model.get_booster())
+    return updated
+
+
+def relative_change(baseline, candidate):
+    """
+    (candidate - baseline) / baseline; any error against a perfect
+    baseline counts as infinitely worse
+    """
+    if baseline == 0:
+        return 0.0 if candidate == 0 else np.inf
+    return (candidate - baseline) / baseline
+
+
+def warm_start(df, model, features, target,
+               window_days=INCREMENTAL_WINDOW_DAYS,
+               holdout_days=INCREMENTAL_HOLDOUT_DAYS,
+               rounds=INCREMENTAL_ROUNDS,
+               tolerance=INCREMENTAL_WAPE_TOLERANCE,
+               max_trees=INCREMENTAL_MAX_TREES):
+    """
+    Try a warm-start refresh on the newest data
+
+    The continuation is first fit without the last holdout_days and
+    compared with the current model on them; if it holds up, it is refit
+    on the whole window (holdout included) and returned.
+
+    Args:
+        df: Encoded, featurized history (same encoders as model)
+        model: Current XGBRegressor (log1p target)
+        features, target: Model columns
+        window_days, holdout_days, rounds, tolerance, max_trees: See config
+
+    Returns:
+        (updated model or None when a full retrain is needed, report dict)
+    """
+    last_date = df['date'].max()
+    window = df[df['date'] > last_date - pd.Timedelta(days=window_days)]
+    cutoff = last_date - pd.Timedelta(days=holdout_days)
+    fit_rows = window[window['date'] <= cutoff]
+    holdout = window[window['date'] > cutoff]
+
+    trees = model.get_booster().num_boosted_rounds()
+    report = {
+        'window_start': str((last_date - pd.Timedelta(days=window_days - 1)).date()),
+        'last_date': str(last_date.date()),
+        'window_rows': len(window),
+        'holdout_rows': len(holdout),
+        'trees_before': trees,
+        'accepted': False,
+    }
+
+    if trees + rounds > max_trees:
+        report['reason'] = f"booster would exceed {max_trees} trees"
+        return None, report
+
+    if len(fit_rows) == 0 or len(holdout) == 0:
+        report['reason'] = "not enough recent rows for the holdout check"
+        return None, report
+
+    actual = np.expm1(holdout[target])
+    baseline_wape = calculate_wape(actual, np.expm1(model.predict(holdout[features])))
+
+    candidate = continue_training(model, fit_rows, features, target, rounds)
+    candidate_wape = calculate_wape(actual, np.expm1(candidate.predict(holdout[features])))
+
+    report['baseline_holdout_wape'] = float(baseline_wape)
+    report['candidate_holdout_wape'] = float(candidate_wape)
+    report['holdout_wape_change_pct'] = float(relative_change(baseline_wape, candidate_wape) * 100)
+    report['tolerance_pct'] = float(tolerance * 100)
+
+    if candidate_wape > baseline_wape * (1 + tolerance):
+        report['reason'] = (
+            f"holdout WAPE degraded {baseline_wape:.2f}% → {candidate_wape:.2f}% "
+            f"({report['holdout_wape_change_pct']:+.1f}% relative, tolerance +{report['tolerance_pct']:.1f}%)"
+        )
+        return None, report
+
+    updated = continue_training(model, window, features, target, rounds)
+
+    report['accepted'] = True
+    report['trees_after'] = updated.get_booster().num_boosted_rounds()
+    return updated, report
+
+
+def print_warm_start(report):
+    print(f"\n{'='*70}")
+    print(f"♻️  INCREMENTAL REFRESH")
+    print(f"{'='*70}")
+    print(f"\n   Window: {report['window_start']} → {report['last_date']} ({report['window_rows']:,} rows)")
+    print(f"   Holdout: last {report['holdout_rows']:,} rows")
+
+    if 'baseline_holdout_wape' in report:
+        print(f"   Holdout WAPE: current {report['baseline_holdout_wape']:.2f}% → "
+              f"continued {report['candidate_holdout_wape']:.2f}% "
+              f"({report['holdout_wape_change_pct']:+.1f}% relative, "
+              f"tolerance +{report['tolerance_pct']:.1f}%)")
+
+    if report['accepted']:
+        print(f"\n   ✅ Accepted: {report['trees_before']} → {report['trees_after']} trees")
+    else:
+        print(f"\n   ⚠️  Rejected ({report['reason']}), falling back to a full retrain")
@@ -1,3 +1,6 @@
+import hashlib
+
+import joblib
 import numpy as np
 
 def calculate_inventory(df,
@@ -45,6 +48,142 @@ def calculate_inventory(df,
         df['safety_stock']
     )
 
+    return _apply_reorder_rules(df)
+
+
+def quantile_column(alpha):
+    """
+    Column name used for a demand quantile, e.g. 0.9 → 'demand_p90'
+    """
+    return f"demand_p{int(round(alpha * 100))}"
+
+
+def quantile_columns(model, *alphas):
+    """
+    Column names of the given alphas when the multi-quantile model
+    predicts all of them, else None (callers fall back to the point
+    forecast math)
+
+    Args:
+        model: Quantile model, or None
+        *alphas: Required quantiles, e.g. 0.5, SERVICE_QUANTILE
+
+    Returns:
+        Tuple of quantile_column names in the order of alphas, or None
+    """
+    if model is None:
+        return None
+
+    trained = {quantile_column(alpha) for alpha in np.atleast_1d(model.get_params()['quantile_alpha'])}
+    columns = tuple(quantile_column(alpha) for alpha in alphas)
+    return columns if set(columns) <= trained else None
+
+
+def encoder_fingerprint(encoders):
+    """
+    Hash of the label classes of every encoder; a quantile model's splits
+    are only valid for the encoding it was trained with
+    """
+    digest = hashlib.sha1()
+    for col in sorted(encoders):
+        digest.update(col.encode())
+        digest.update("\x1f".join(map(str, encoders[col].classes_)).encode())
+    return digest.hexdigest()
+
+
+def save_quantile_model(model, encoders, path):
+    """
+    Save a quantile model together with the fingerprint of its encoders
+    """
+    joblib.dump({'model': model, 'encoders': encoder_fingerprint(encoders)}, path)
+
+
+def load_quantile_model(path, encoders):
+    """
+    Load the quantile model saved by save_quantile_model, refusing it when
+    it was trained with a different label encoding than `encoders`
+
+    Args:
+        path: quantile_model.pkl
+        encoders: Label encoders of the served point model
+
+    Returns:
+        (model or None, warning message or None)
+    """
+    if not path.exists():
+        return None, None
+
+    saved = joblib.load(path)
+    if not isinstance(saved, dict) or saved.get('encoders') != encoder_fingerprint(encoders):
+        return None, (
+            f"{path.name} was trained with a different label encoding than encoders.pkl, "
+            f"ignored until retrained (train.py --quantiles)"
+        )
+    return saved['model'], None
+
+
+def predict_quantiles(model, X):
+    """
+    Score a multi-quantile model once and return one column per alpha.
+
+    The model is trained on log1p(weekly demand); quantiles are preserved
+    by monotonic transforms, so expm1 of a log-quantile is the demand
+    quantile itself.
+
+    Args:
+        model: XGBRegressor trained with objective="reg:quantileerror"
+        X: Feature matrix (same FEATURES as the point model)
+
+    Returns:
+        Dictionary {column_name: np.ndarray}
+    """
+    alphas = np.sort(np.atleast_1d(model.get_params()['quantile_alpha']))
+    preds = np.expm1(model.predict(X))
+
+    if preds.ndim == 1:
+        preds = preds.reshape(-1, 1)
+
+    # Independent quantile heads can cross; keep them ordered
+    preds = np.maximum(np.sort(preds, axis=1), 0)
+
+    return {
+        quantile_column(alpha): preds[:, i]
+        for i, alpha in enumerate(alphas)
+    }
+
+
+def calculate_inventory_from_quantiles(df,
+                                       lead_time_weeks=1,
+                                       median_col='demand_p50',
+                                       service_col='demand_p90'):
+    """
+    Row-wise inventory decisions from predicted demand quantiles.
+
+    median_col: expected weekly demand (P50)
+    service_col: weekly demand at the target service level (e.g. P90)
+
+    Safety stock is the spread between the service quantile and the
+    median, scaled by sqrt(lead_time_weeks). No per-series groupby is
+    needed, so this works on any slice of rows.
+    """
+
+    df['avg_weekly_demand'] = df[median_col]
+
+    df['safety_stock'] = (
+        np.maximum(df[service_col] - df[median_col], 0) *
+        np.sqrt(lead_time_weeks)
+    )
+
+    df['reorder_point'] = (
+        (df['avg_weekly_demand'] * lead_time_weeks) +
+        df['safety_stock']
+    )
+
+    return _apply_reorder_rules(df)
+
+
+def _apply_reorder_rules(df):
+
     # -----------------------------
     # Order quantity
     # -----------------------------
@@ -0,0 +1,279 @@
+"""
+API Load Test
+Drives the FastAPI endpoints with a realistic request mix built from the
+store/product IDs in the dataset, and reports throughput plus latency
+percentiles and histograms per endpoint
+
+Usage:
+    python load_test.py --concurrency 16 --duration 30                 # in-process (ASGI)
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 32   # running uvicorn
+    python load_test.py --mix predict=0.5,history=0.5 --output ../benchmarks/results/load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from data_loader import HISTORY_PATH, load_history
+
+DEFAULT_MIX = {
+    'predict': 0.35,
+    'predict_with_context': 0.25,
+    'history': 0.20,
+    'forecast': 0.15,
+    'bulk_predict': 0.05,
+}
+
+# Histogram bucket upper bounds (ms)
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')]
+
+
+def series_catalog(path=HISTORY_PATH):
+    """
+    Latest row of every (store, product) series, as request templates
+    """
+    df = load_history(path)
+    latest = df.sort_values('date').groupby(['store_id', 'product_id'], observed=True).tail(1)
+
+    return [
+        {
+            'store_id': str(row.store_id),
+            'product_id': str(row.product_id),
+            'category': str(row.category),
+            'region': str(row.region),
+            'weather_condition': str(row.weather_condition),
+            'seasonality': str(row.seasonality),
+            'inventory_level': int(row.inventory_level),
+            'price': round(float(row.price), 2),
+            'discount': round(float(row.discount), 2),
+            'competitor_pricing': round(float(row.competitor_pricing), 2),
+            'holiday_promotion': int(row.holiday_promotion),
+            'next_date': (row.date + np.timedelta64(7, 'D')).strftime('%Y-%m-%d'),
+        }
+        for row in latest.itertuples(index=False)
+    ]
+
+
+def build_request(endpoint, series):
+    """
+    (method, url, json body) for one endpoint and one series
+    """
+    fields = {k: v for k, v in series.items() if k != 'next_date'}
+
+    if endpoint == 'predict':
+        return "POST", "/predict", {**fields, "date": series['next_date']}
+    if endpoint == 'predict_with_context':
+        return "POST", "/predict_with_context", {**fields, "prediction_for_date": series['next_date']}
+    if endpoint == 'history':
+        return "GET", f"/history/{series['store_id']}/{series['product_id']}", None
+    if endpoint == 'forecast':
+        return "POST", "/forecast", {"store_id": series['store_id'], "product_id": series['product_id'], "months": 3}
+    if endpoint == 'bulk_predict':
+        return "POST", "/bulk_predict", {"store_id": series['store_id'], "prediction_date": series['next_date']}
+
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+def parse_mix(text):
+    """
+    'predict=0.5,history=0.5' → {'predict': 0.5, 'history': 0.5}
+    """
+    if not text:
+        return dict(DEFAULT_MIX)
+
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight) if weight else 1.0
+
+    unknown = [name for name in mix if name not in DEFAULT_MIX]
+    if unknown:
+        raise ValueError(f"Unknown endpoint(s) in mix: {', '.join(unknown)}")
+
+    return mix
+
+
+class LatencyRecorder:
+    """
+    Per-endpoint latencies and error counts
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ms = np.asarray(values) * 1000
+            counts, _ = np.histogram(ms, bins=[0] + BUCKETS_MS)
+
+            report[endpoint] = {
+                'requests': len(ms),
+                'errors': self.errors.get(endpoint, 0),
+                'throughput_rps': len(ms) / elapsed if elapsed else 0,
+                'mean_ms': float(ms.mean()),
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p90_ms': float(np.percentile(ms, 90)),
+                'p99_ms': float(np.percentile(ms, 99)),
+                'max_ms': float(ms.max()),
+                'histogram': {
+                    ('+Inf' if np.isinf(edge) else f"{edge:g}"): int(count)
+                    for edge, count in zip(BUCKETS_MS, counts)
+                },
+            }
+        return report
+
+
+def _is_error_payload(response):
+    # Several endpoints report failures as 200 {"error": ...}
+    if not response.headers.get('content-type', '').startswith('application/json'):
+        return False
+    payload = response.json()
+    return isinstance(payload, dict) and 'error' in payload
+
+
+async def worker(client, catalog, mix, recorder, deadline, remaining, rng):
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+
+        endpoint = rng.choices(endpoints, weights)[0]
+        method, url, body = build_request(endpoint, rng.choice(catalog))
+
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, json=body)
+            latency = time.perf_counter() - start
+            ok = response.status_code < 400 and not _is_error_payload(response)
+        except httpx.HTTPError:
+            latency = time.perf_counter() - start
+            ok = False
+        recorder.record(endpoint, latency, ok)
+
+
+async def run_load(client, catalog, mix, concurrency, duration, total_requests, warmup, seed):
+    rng = random.Random(seed)
+
+    # Warm caches (history load, model) outside the measured window
+    for endpoint in mix:
+        for _ in range(warmup):
+            method, url, body = build_request(endpoint, rng.choice(catalog))
+            await client.request(method, url, json=body)
+
+    recorder = LatencyRecorder()
+    remaining = [total_requests] if total_requests else None
+    deadline = time.perf_counter() + (duration if duration else float('inf'))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        worker(client, catalog, mix, recorder, deadline, remaining, random.Random(seed + i))
+        for i in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    return recorder.summary(elapsed), elapsed
+
+
+def print_report(report, elapsed, concurrency):
+    total = sum(r['requests'] for r in report.values())
+
+    print(f"\n{'='*70}")
+    print(f"🚦 LOAD TEST RESULTS ({concurrency} concurrent, {elapsed:.1f}s)")
+    print(f"{'='*70}")
+    print(f"\n   Total: {total:,} requests, {total / elapsed:.1f} req/s")
+
+    print(f"\n   {'Endpoint':<22} {'Reqs':>7} {'Err':>5} {'RPS':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    print(f"   {'-'*82}")
+    for endpoint, r in report.items():
+        print(
+            f"   {endpoint:<22} {r['requests']:>7,} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>7.1f}ms {r['p90_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms"
+        )
+
+    for endpoint, r in report.items():
+        print(f"\n   📊 {endpoint} latency histogram")
+        peak = max(r['histogram'].values()) or 1
+        for edge, count in r['histogram'].items():
+            if count:
+                bar = "█" * max(1, int(40 * count / peak))
+                print(f"      ≤ {edge:>6} ms {count:>7,} {bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the demand forecasting API")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process ASGI)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run (0 = until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--mix", help="endpoint=weight list, e.g. predict=0.5,history=0.5")
+    parser.add_argument("--warmup", type=int, default=1, help="Warm-up requests per endpoint")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if not args.duration and not args.requests:
+        parser.error("Set --duration or --requests")
+
+    mix = parse_mix(args.mix)
+    catalog = series_catalog()
+    print(f"\n📂 {len(catalog):,} series in {HISTORY_PATH.name}; mix {mix}")
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        mode = f"http {args.url}"
+    else:
+        import api
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.app),
+            base_url="http://inprocess", timeout=args.timeout
+        )
+        mode = "in-process"
+
+    async def run():
+        async with client:
+            return await run_load(
+                client, catalog, mix, args.concurrency,
+                args.duration, args.requests, args.warmup, args.seed
+            )
+
+    report, elapsed = asyncio.run(run())
+    print_report(report, elapsed, args.concurrency)
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'mode': mode,
+                'concurrency': args.concurrency,
+                'elapsed_seconds': elapsed,
+                'mix': mix,
+                'series': len(catalog),
+            },
+            'endpoints': report,
+        }, indent=2))
+        print(f"\n💾 Report saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Structured Logging
+Leveled, queued logging for the API with per-request error aggregation
+
+- Records go through a QueueHandler: the calling thread only enqueues
+  the LogRecord; formatting, tracebacks and the stdout write happen on
+  one QueueListener thread, so workers never contend on stdout
+- Keyword fields (extra={...}) are kept as structured fields: rendered
+  as key=value in the text format, or one JSON object per line with
+  INVENTORY_LOG_FORMAT=json
+- ErrorAggregator collects the failures of a loop (e.g. one per product)
+  and logs one summary per request: counts per error type, a few sample
+  keys and a single traceback
+- Records with a 'rate_key' field are rate-limited to one per
+  LOG_RATE_SECONDS per key; the next one carries the suppressed count
+
+Level: INVENTORY_LOG_LEVEL (default INFO).
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from config import LOG_RATE_SECONDS, LOG_SAMPLE_KEYS
+
+LOG_LEVEL = os.environ.get("INVENTORY_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("INVENTORY_LOG_FORMAT", "text").lower()
+
+ROOT_LOGGER = "inventory"
+
+# LogRecord attributes that are not user fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName", "rate_key"}
+
+
+def record_fields(record):
+    """
+    The structured fields passed with extra={...}
+    """
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+# =========================
+# Formatters
+# =========================
+class TextFormatter(logging.Formatter):
+    """
+    '2024-01-08 12:00:00 INFO inventory.api: message key=value ...'
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if not fields:
+            return line
+
+        head, sep, tail = line.partition("\n")
+        pairs = " ".join(f"{key}={value}" for key, value in fields.items())
+        return f"{head} {pairs}{sep}{tail}"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, fields, exc
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# =========================
+# Rate limiting
+# =========================
+class RateLimitFilter(logging.Filter):
+    """
+    At most one record per 'rate_key' every `seconds`; the next record
+    that passes reports how many were suppressed
+    """
+
+    def __init__(self, seconds=LOG_RATE_SECONDS, max_keys=1024):
+        super().__init__()
+        self.seconds = seconds
+        self.max_keys = max_keys
+        self._keys = OrderedDict()   # rate_key → [last emit time, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, 'rate_key', None)
+        if key is None:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            state = self._keys.get(key)
+            if state is not None and now - state[0] < self.seconds:
+                state[1] += 1
+                return False
+
+            suppressed = state[1] if state is not None else 0
+            self._keys[key] = [now, 0]
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+# =========================
+# Queued handler
+# =========================
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    # The queue never leaves the process: enqueue the record as-is and
+    # leave message formatting and tracebacks to the listener thread
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """
+    Route the 'inventory' loggers through a queue to one stdout writer
+    (idempotent: later calls only change the level)
+
+    Args:
+        level: Logging level name
+        fmt: 'text' or 'json'
+        stream: Output stream (default sys.stdout)
+    """
+    global _listener
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+
+    with _setup_lock:
+        if _listener is not None:
+            return root
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+        records = queue.SimpleQueue()
+        handler = _InProcessQueueHandler(records)
+        handler.addFilter(RateLimitFilter())
+
+        root.addHandler(handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    return root
+
+
+def get_logger(name):
+    """
+    Logger below the 'inventory' root, e.g. get_logger("api")
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+# =========================
+# Error aggregation
+# =========================
+class ErrorAggregator:
+    """
+    Failures of one loop, logged as one summary
+
+    Usage:
+        errors = ErrorAggregator(log, "bulk_predict product", store_id=store_id)
+        for product_id in products:
+            try:
+                ...
+            except Exception as e:
+                errors.add(product_id, e)
+        errors.flush()
+    """
+
+    def __init__(self, logger, what, level=logging.WARNING, **fields):
+        self.logger = logger
+        self.what = what
+        self.level = level
+        self.fields = fields
+        self.count = 0
+        self.by_type = OrderedDict()   # error type → [count, sample keys]
+        self.first_exc = None
+
+    def add(self, key, error):
+        """
+        Args:
+            key: The item that failed (e.g. a product ID)
+            error: The exception, or a short reason string
+        """
+        self.count += 1
+        kind = type(error).__name__ if isinstance(error, BaseException) else str(error)
+        entry = self.by_type.setdefault(kind, [0, []])
+        entry[0] += 1
+        if len(entry[1]) < LOG_SAMPLE_KEYS:
+            entry[1].append(str(key))
+
+        if self.first_exc is None and isinstance(error, BaseException):
+            self.first_exc = (type(error), error, error.__traceback__)
+
+    def __len__(self):
+        return self.count
+
+    def summary(self):
+        """
+        {error type: {'count', 'sample'}}
+        """
+        return {kind: {'count': n, 'sample': keys} for kind, (n, keys) in self.by_type.items()}
+
+    def flush(self):
+        """
+        Log the summary (nothing when no failure was recorded)
+        """
+        if not self.count:
+            return
+
+        kinds = ", ".join(
+            f"{kind} x{n} ({', '.join(keys)}{', ...' if n > len(keys) else ''})"
+            for kind, (n, keys) in self.by_type.items()
+        )
+        self.logger.log(
+            self.level,
+            "%d %s failure(s): %s", self.count, self.what, kinds,
+            exc_info=self.first_exc,
+            extra={
+                **self.fields,
+                'failures': self.count,
+                'rate_key': (self.logger.name, self.what, tuple(sorted(self.fields.items())), tuple(self.by_type)),
+            },
+        )
+
@@ -4,7 +4,7 @@ Implements MAPE, SMAPE, WAPE, and other robust metrics
 """
 
 import numpy as np
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+import pandas as pd
 
 
 def calculate_mape(y_true, y_pred, exclude_zeros=True):
@@ -19,8 +19,8 @@ def calculate_mape(y_true, y_pred, exclude_zeros=True):
     Returns:
         MAPE value (percentage)
     """
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
     
     if exclude_zeros:
         # Exclude rows where actual demand is zero
@@ -53,8 +53,8 @@ def calculate_smape(y_true, y_pred):
     Returns:
         SMAPE value (percentage)
     """
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
     
     # SMAPE formula: 100 * mean(|actual - predicted| / (|actual| + |predicted|))
     denominator = np.abs(y_true) + np.abs(y_pred)
@@ -81,8 +81,8 @@ def calculate_wape(y_true, y_pred):
     Returns:
         WAPE value (percentage)
     """
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
     
     # WAPE formula: 100 * sum(|actual - predicted|) / sum(|actual|)
     total_actual = np.sum(np.abs(y_true))
@@ -108,9 +108,9 @@ def calculate_mase(y_true, y_pred, y_train):
     Returns:
         MASE value
     """
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
-    y_train = np.array(y_train)
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    y_train = np.asarray(y_train, dtype=np.float64)
     
     # Calculate MAE of predictions
     mae_pred = np.mean(np.abs(y_true - y_pred))
@@ -142,42 +142,130 @@ def calculate_all_metrics(y_true, y_pred, y_train=None, exclude_zeros=True):
     Returns:
         Dictionary with all metrics
     """
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
-    
-    # Basic metrics
-    mae = mean_absolute_error(y_true, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-    
-    # R² score (handle edge cases)
-    try:
-        r2 = r2_score(y_true, y_pred)
-    except:
-        r2 = 0.0
-    
-    # Percentage-based metrics
-    mape = calculate_mape(y_true, y_pred, exclude_zeros=exclude_zeros)
-    smape = calculate_smape(y_true, y_pred)
-    wape = calculate_wape(y_true, y_pred)
-    
-    # MASE (if training data provided)
-    mase = None
-    if y_train is not None:
-        mase = calculate_mase(y_true, y_pred, y_train)
-    
-    # Calculate accuracies
-    mape_accuracy = max(0, min(100, 100 - mape))
-    smape_accuracy = max(0, min(100, 100 - smape))
-    wape_accuracy = max(0, min(100, 100 - wape))
-    
-    # Count zero-demand records
-    zero_count = np.sum(y_true == 0)
-    zero_pct = (zero_count / len(y_true)) * 100 if len(y_true) > 0 else 0
-    
-    # Count records used in MAPE (non-zero)
-    mape_records = len(y_true) - zero_count if exclude_zeros else len(y_true)
-    
-    metrics = {
+    # One accumulator update: the same reductions as the streaming path
+    return MetricAccumulator().update(y_true, y_pred, y_train).result(exclude_zeros)
+
+
+# =========================
+# Grouped metrics
+# =========================
+SUM_FIELDS = (
+    'n', 'sum_actual', 'sum_predicted', 'sum_abs_actual', 'sum_abs_error',
+    'sum_sq_error', 'zero_records', 'sum_ape', 'sum_smape', 'smape_records',
+    'ss_actual', 'ss_predicted',
+)
+
+
+def _segment_sums(y_true, y_pred, codes, n_groups):
+    """
+    Per-group sums for every metric, one bincount pass per statistic
+
+    The squared deviations for R² and the standard deviations use a second
+    pass around the group means (numerically stable, unlike sum of squares).
+    """
+    def total(weights=None):
+        return np.bincount(codes, weights=weights, minlength=n_groups)
+
+    error = y_true - y_pred
+    abs_error = np.abs(error)
+    nonzero = y_true != 0
+    denominator = np.abs(y_true) + np.abs(y_pred)
+    smape_rows = denominator != 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ape = np.where(nonzero, abs_error / np.abs(y_true), 0.0)
+        smape_terms = np.where(smape_rows, abs_error / denominator, 0.0)
+
+    sums = {
+        'n': total(),
+        'sum_actual': total(y_true),
+        'sum_predicted': total(y_pred),
+        'sum_abs_actual': total(np.abs(y_true)),
+        'sum_abs_error': total(abs_error),
+        'sum_sq_error': total(error * error),
+        'zero_records': total(~nonzero),
+        'sum_ape': total(ape),
+        'sum_smape': total(smape_terms),
+        'smape_records': total(smape_rows),
+    }
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_actual = sums['sum_actual'] / sums['n']
+        mean_predicted = sums['sum_predicted'] / sums['n']
+    sums['ss_actual'] = total((y_true - mean_actual[codes]) ** 2)
+    sums['ss_predicted'] = total((y_pred - mean_predicted[codes]) ** 2)
+
+    return sums
+
+
+def _empty_sums(n_groups):
+    return {field: np.zeros(n_groups) for field in SUM_FIELDS}
+
+
+def _merge_sums(a, b):
+    """
+    Combine the per-group sums of two disjoint sets of rows
+
+    Plain sums add; squared deviations use the parallel-variance update
+    (Chan et al.), so merged values equal a single pass over all rows.
+    """
+    merged = {field: a[field] + b[field] for field in SUM_FIELDS}
+
+    n_a, n_b, n = a['n'], b['n'], merged['n']
+    both = (n_a > 0) & (n_b > 0)
+    weight = np.divide(n_a * n_b, n, out=np.zeros(np.shape(n)), where=both)
+
+    for total, ss in (('sum_actual', 'ss_actual'), ('sum_predicted', 'ss_predicted')):
+        mean_a = np.divide(a[total], n_a, out=np.zeros(np.shape(n)), where=n_a > 0)
+        mean_b = np.divide(b[total], n_b, out=np.zeros(np.shape(n)), where=n_b > 0)
+        merged[ss] = a[ss] + b[ss] + (mean_b - mean_a) ** 2 * weight
+
+    return merged
+
+
+def _metrics_from_sums(sums, exclude_zeros=True):
+    """
+    Metric arrays (one value per group) from _segment_sums output
+
+    Edge cases match the scalar functions: MAPE/SMAPE/WAPE are 0 when
+    undefined; R² follows sklearn (NaN below 2 records, 1.0/0.0 for a
+    constant actual series).
+    """
+    n = sums['n']
+    zero_records = sums['zero_records']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae = sums['sum_abs_error'] / n
+        rmse = np.sqrt(sums['sum_sq_error'] / n)
+
+        sst = sums['ss_actual']
+        r2 = np.where(
+            sst > 0,
+            1 - sums['sum_sq_error'] / sst,
+            np.where(sums['sum_sq_error'] == 0, 1.0, 0.0)
+        )
+        r2 = np.where(n < 2, np.nan, r2)
+
+        mape_records = n - zero_records if exclude_zeros else n
+        mape = np.where(mape_records > 0, 100 * sums['sum_ape'] / mape_records, 0.0)
+        if not exclude_zeros:
+            # Division by a zero actual makes the scalar MAPE inf/nan → 0
+            mape = np.where(zero_records > 0, 0.0, mape)
+
+        smape = np.where(
+            sums['smape_records'] > 0, 100 * sums['sum_smape'] / sums['smape_records'], 0.0
+        )
+        wape = np.where(
+            sums['sum_abs_actual'] > 0, 100 * sums['sum_abs_error'] / sums['sum_abs_actual'], 0.0
+        )
+
+        zero_percentage = np.where(n > 0, zero_records / n * 100, 0.0)
+        mean_actual = sums['sum_actual'] / n
+        mean_predicted = sums['sum_predicted'] / n
+        std_actual = np.sqrt(sums['ss_actual'] / n)
+        std_predicted = np.sqrt(sums['ss_predicted'] / n)
+
+    return {
         # Basic metrics
         'mae': mae,
         'rmse': rmse,
@@ -187,27 +275,238 @@ def calculate_all_metrics(y_true, y_pred, y_train=None, exclude_zeros=True):
         'mape': mape,
         'smape': smape,
         'wape': wape,
-        'mase': mase,
         
         # Accuracies
-        'mape_accuracy': mape_accuracy,
-        'smape_accuracy': smape_accuracy,
-        'wape_accuracy': wape_accuracy,
+        'mape_accuracy': np.clip(100 - mape, 0, 100),
+        'smape_accuracy': np.clip(100 - smape, 0, 100),
+        'wape_accuracy': np.clip(100 - wape, 0, 100),
         
         # Data info
-        'total_records': len(y_true),
-        'zero_records': zero_count,
-        'zero_percentage': zero_pct,
-        'mape_records': mape_records,
+        'total_records': n.astype(np.int64),
+        'zero_records': zero_records.astype(np.int64),
+        'zero_percentage': zero_percentage,
+        'mape_records': np.asarray(mape_records).astype(np.int64),
         
         # Statistics
-        'mean_actual': np.mean(y_true),
-        'mean_predicted': np.mean(y_pred),
-        'std_actual': np.std(y_true),
-        'std_predicted': np.std(y_pred),
+        'mean_actual': mean_actual,
+        'mean_predicted': mean_predicted,
+        'std_actual': std_actual,
+        'std_predicted': std_predicted,
     }
+
+
+def calculate_grouped_metrics(df, by, actual_col='actual', pred_col='predicted',
+                              exclude_zeros=True):
+    """
+    Calculate all metrics for every group of a frame in one pass
+    
+    Rows are mapped to dense group codes once, then each statistic is a
+    single np.bincount over the whole frame - no per-group masks or copies.
+    For data that does not fit in memory, feed chunks to a
+    GroupedMetricAccumulator instead.
+    
+    Args:
+        df: DataFrame with actual and predicted columns
+        by: Column name or list of column names to group on
+        actual_col: Column with actual values
+        pred_col: Column with predicted values
+        exclude_zeros: If True, exclude zero-demand rows from MAPE
+    
+    Returns:
+        Tidy DataFrame: one row per group (sorted by the keys), the key
+        columns followed by the calculate_all_metrics columns (except MASE)
+    """
+    return (
+        GroupedMetricAccumulator(by)
+        .update(df, actual_col, pred_col)
+        .result(exclude_zeros)
+    )
+
+
+# =========================
+# Streaming accumulators
+# =========================
+class MetricAccumulator:
+    """
+    Mergeable running state for calculate_all_metrics
+    
+    update() can be called chunk by chunk and accumulators built by
+    separate workers can be merged; result() then matches
+    calculate_all_metrics on all the rows at once. For MASE, the naive
+    lagged differences of y_train are summed with the last value carried
+    over, so chunk and partition boundaries are counted exactly once.
+    """
     
-    return metrics
+    def __init__(self):
+        self.sums = _empty_sums(1)
+        
+        # Naive-forecast state for MASE (None until y_train is seen)
+        self.train_records = None
+        self.sum_abs_diff = 0.0
+        self.first_train = None
+        self.last_train = None
+    
+    def update(self, y_true, y_pred, y_train=None):
+        """
+        Add a chunk of actual/predicted values (and optionally of y_train)
+        
+        Returns:
+            self
+        """
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        codes = np.zeros(len(y_true), dtype=np.int64)
+        
+        self.sums = _merge_sums(self.sums, _segment_sums(y_true, y_pred, codes, 1))
+        
+        if y_train is not None:
+            self.update_naive(y_train)
+        
+        return self
+    
+    def update_naive(self, y_train):
+        """
+        Add the next chunk of the training series used to scale MASE
+        """
+        y_train = np.asarray(y_train, dtype=np.float64)
+        if self.train_records is None:
+            self.train_records = 0
+        if len(y_train) == 0:
+            return self
+        
+        self.sum_abs_diff += np.abs(np.diff(y_train)).sum()
+        if self.last_train is not None:
+            self.sum_abs_diff += abs(y_train[0] - self.last_train)
+        else:
+            self.first_train = y_train[0]
+        
+        self.last_train = y_train[-1]
+        self.train_records += len(y_train)
+        return self
+    
+    def merge(self, other):
+        """
+        Fold in another accumulator; for MASE its training series is taken
+        to continue this one's
+        
+        Returns:
+            self
+        """
+        self.sums = _merge_sums(self.sums, other.sums)
+        
+        if other.train_records is not None:
+            if self.train_records is None:
+                self.train_records = 0
+            if other.first_train is not None:
+                if self.last_train is not None:
+                    self.sum_abs_diff += abs(other.first_train - self.last_train)
+                else:
+                    self.first_train = other.first_train
+                self.last_train = other.last_train
+            self.sum_abs_diff += other.sum_abs_diff
+            self.train_records += other.train_records
+        
+        return self
+    
+    def result(self, exclude_zeros=True):
+        """
+        Returns:
+            Dictionary with the calculate_all_metrics keys
+        """
+        metrics = {
+            name: values[0].item()
+            for name, values in _metrics_from_sums(self.sums, exclude_zeros).items()
+        }
+        
+        # Same rules as calculate_mase
+        mase = None
+        if self.train_records is not None:
+            if self.train_records < 2:
+                mase = metrics['mae']
+            else:
+                mae_naive = self.sum_abs_diff / (self.train_records - 1)
+                mase = 0.0 if mae_naive == 0 else metrics['mae'] / mae_naive
+        metrics['mase'] = mase
+        
+        return metrics
+
+
+class GroupedMetricAccumulator:
+    """
+    Mergeable per-group running state for calculate_grouped_metrics
+    
+    Holds one row of sums per group seen so far; chunks may contain any
+    subset of the groups.
+    """
+    
+    def __init__(self, by):
+        self.by = [by] if isinstance(by, str) else list(by)
+        self.sums = None
+    
+    def update(self, df, actual_col='actual', pred_col='predicted'):
+        """
+        Add a chunk of rows
+        
+        Returns:
+            self
+        """
+        groups = df.groupby(self.by, sort=True, observed=True, dropna=False)
+        codes = groups.ngroup().to_numpy(dtype=np.int64)
+        index = groups.size().index
+        
+        sums = _segment_sums(
+            df[actual_col].to_numpy(dtype=np.float64),
+            df[pred_col].to_numpy(dtype=np.float64),
+            codes,
+            len(index)
+        )
+        return self._merge_frame(pd.DataFrame(sums, index=index))
+    
+    def merge(self, other):
+        """
+        Fold in another accumulator over the same keys
+        
+        Returns:
+            self
+        """
+        if other.sums is not None:
+            self._merge_frame(other.sums)
+        return self
+    
+    def _merge_frame(self, frame):
+        if self.sums is None:
+            self.sums = frame
+            return self
+        
+        index = self.sums.index.union(frame.index)
+        a = self.sums.reindex(index, fill_value=0)
+        b = frame.reindex(index, fill_value=0)
+        merged = _merge_sums(
+            {field: a[field].to_numpy() for field in SUM_FIELDS},
+            {field: b[field].to_numpy() for field in SUM_FIELDS}
+        )
+        self.sums = pd.DataFrame(merged, index=index)
+        return self
+    
+    def result(self, exclude_zeros=True):
+        """
+        Returns:
+            Tidy DataFrame like calculate_grouped_metrics
+        """
+        if self.sums is None:
+            names = list(_metrics_from_sums(_empty_sums(0), exclude_zeros))
+            return pd.DataFrame(columns=self.by + names)
+        
+        sums = self.sums.sort_index()
+        result = sums.index.to_frame(index=False)
+        
+        metrics = _metrics_from_sums(
+            {field: sums[field].to_numpy() for field in SUM_FIELDS}, exclude_zeros
+        )
+        for name, values in metrics.items():
+            result[name] = values
+        
+        return result
 
 
 def print_metrics(metrics, title="METRICS"):
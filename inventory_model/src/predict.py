@@ -1,11 +1,28 @@
-import pandas as pd
+import argparse
 import numpy as np
 import joblib
 from pathlib import Path
 
-from features import create_features
-from inventory_math import calculate_inventory
-from metrics import calculate_all_metrics, print_metrics
+from features import create_features, FEATURES
+from data_loader import HISTORY_PATH, load_history, encode_categoricals
+from inventory_math import (
+    calculate_inventory,
+    calculate_inventory_from_quantiles,
+    predict_quantiles,
+    quantile_columns,
+    load_quantile_model,
+)
+from config import SERVICE_QUANTILE, SCORING_WINDOW_DAYS
+from metrics import calculate_all_metrics, calculate_grouped_metrics, print_metrics
+from scoring import recent_window
+
+parser = argparse.ArgumentParser(description="Score the history and write reorder recommendations")
+parser.add_argument(
+    "--window", type=int, nargs="?", const=SCORING_WINDOW_DAYS, default=None,
+    help=f"Only run the model on the last N rows of each series (default {SCORING_WINDOW_DAYS}); "
+         "features still use the full history"
+)
+args = parser.parse_args()
 
 # =========================
 # Load model & encoders
@@ -17,40 +34,41 @@ DATA_DIR = BASE_DIR / "data"
 model = joblib.load(MODEL_DIR / "demand_model.pkl")
 encoders = joblib.load(MODEL_DIR / "encoders.pkl")
 
+# Optional multi-quantile model (train.py --quantiles)
+quantile_model, quantile_warning = load_quantile_model(MODEL_DIR / "quantile_model.pkl", encoders)
+if quantile_warning:
+    print(f"⚠️  {quantile_warning}")
+
+# Quantile inventory math needs the median and the service level
+inventory_quantiles = quantile_columns(quantile_model, 0.5, SERVICE_QUANTILE)
+if quantile_model is not None and inventory_quantiles is None:
+    print(f"⚠️  Quantile model lacks P50/P{int(round(SERVICE_QUANTILE * 100))}: "
+          f"using the point forecast for inventory math")
+
 # =========================
 # Load data
 # =========================
-df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-
-df.columns = (
-    df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace("/", "_")
-)
-
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
+df = load_history(HISTORY_PATH)
 
 # =========================
 # Encode categorical columns
 # =========================
-for col, le in encoders.items():
-    df[col] = le.transform(df[col].astype(str))
+df = encode_categoricals(df, encoders)
 
 # =========================
 # Feature engineering
 # =========================
 df = create_features(df)
 
+# Recent-window mode: everything below (accuracy, inventory, reorders)
+# works on the trailing rows only
+if args.window is not None:
+    df = recent_window(df, rows=args.window)
+    print(f"\n🪟 Scoring the last {args.window} rows of each series ({len(df):,} rows)")
+
 # =========================
 # Prediction
 # =========================
-FEATURES = [
-    'store_id','product_id','category','region',
-    'inventory_level','price','discount',
-    'competitor_pricing','holiday_promotion',
-    'seasonality','is_weekend','week','month',
-    'lag_7','lag_14','lag_30','lag_60',
-    'rolling_mean_7','rolling_mean_30'
-]
-
 df['predicted_weekly_demand'] = np.expm1(
     model.predict(df[FEATURES])
 )
@@ -101,23 +119,22 @@ if len(actual) > 0:
     print(f"📍 ACCURACY BY STORE (using WAPE)")
     print(f"{'='*70}")
     
-    for store_id in sorted(df['store_id'].unique()):
-        store_mask = (df['store_id'] == store_id) & mask
-        if store_mask.sum() > 0:
-            store_actual = actual[store_mask[:len(actual)]]
-            store_predicted = predicted[store_mask[:len(predicted)]]
-            if len(store_actual) > 0:
-                store_metrics = calculate_all_metrics(
-                    store_actual, 
-                    store_predicted, 
-                    exclude_zeros=True
-                )
-                print(f"\n   Store {store_id}:")
-                print(f"      Records: {len(store_actual):,}")
-                print(f"      Zero-Demand: {store_metrics['zero_records']:,} ({store_metrics['zero_percentage']:.1f}%)")
-                print(f"      WAPE Accuracy: {store_metrics['wape_accuracy']:.2f}%")
-                print(f"      SMAPE Accuracy: {store_metrics['smape_accuracy']:.2f}%")
-                print(f"      MAPE Accuracy: {store_metrics['mape_accuracy']:.2f}%")
+    store_metrics = calculate_grouped_metrics(
+        df[mask],
+        'store_id',
+        actual_col='units_sold_7d',
+        pred_col='predicted_weekly_demand',
+        exclude_zeros=True
+    )
+    store_metrics['store_id'] = encoders['store_id'].inverse_transform(store_metrics['store_id'])
+    
+    for row in store_metrics.itertuples(index=False):
+        print(f"\n   Store {row.store_id}:")
+        print(f"      Records: {row.total_records:,}")
+        print(f"      Zero-Demand: {row.zero_records:,} ({row.zero_percentage:.1f}%)")
+        print(f"      WAPE Accuracy: {row.wape_accuracy:.2f}%")
+        print(f"      SMAPE Accuracy: {row.smape_accuracy:.2f}%")
+        print(f"      MAPE Accuracy: {row.mape_accuracy:.2f}%")
     
     print(f"\n{'='*70}")
     print(f"🎯 PREDICTION QUALITY ASSESSMENT")
@@ -145,11 +162,24 @@ else:
 # =========================
 # Inventory decisions
 # =========================
-df = calculate_inventory(
-    df,
-    lead_time_weeks=1,
-    service_level=1.65
-)
+if inventory_quantiles is not None:
+    # One batched predict gives every quantile column at once
+    for col, values in predict_quantiles(quantile_model, df[FEATURES]).items():
+        df[col] = values
+
+    median_col, service_col = inventory_quantiles
+    df = calculate_inventory_from_quantiles(
+        df,
+        lead_time_weeks=1,
+        median_col=median_col,
+        service_col=service_col
+    )
+else:
+    df = calculate_inventory(
+        df,
+        lead_time_weeks=1,
+        service_level=1.65
+    )
 
 # =========================
 # Final reorder table
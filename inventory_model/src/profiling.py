@@ -0,0 +1,297 @@
+"""
+Request Profiling
+Per-stage timing spans for every API request, Prometheus histograms of
+them, and an opt-in sampling profiler
+
+Stages (STAGES) are marked in the hot paths with `with span("predict"):`.
+Spans measure self time: a span opened inside another pauses the outer
+one, so the stages of a request add up to at most its wall time.
+
+- RequestProfiler (ASGI middleware) gives each request a timer, records
+  its spans into inventory_api_stage_seconds{endpoint,stage} and the total
+  into inventory_api_request_seconds{endpoint,status}, and adds a
+  Server-Timing header
+- exposition() renders the histograms in the Prometheus text format
+  (served on /metrics)
+- ?profile=1 on any request samples the stacks of the threads that run
+  its spans every PROFILE_SAMPLE_SECONDS and returns them folded
+  ('frame;frame;frame count' per line, the input of flamegraph.pl and
+  speedscope) instead of the response
+
+Without ?profile=1 no sampler thread exists; outside a request, span()
+is a shared no-op.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+
+from config import PROFILE_SAMPLE_SECONDS
+
+STAGES = ('load', 'filter', 'encode', 'featurize', 'predict', 'postprocess', 'serialize')
+
+# Seconds; +Inf is implicit
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+EXPOSITION_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+FOLDED_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+
+# =========================
+# Histograms
+# =========================
+class Histogram:
+    """
+    Prometheus histogram with a fixed label set, safe across threads
+    """
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+
+        for label_values, counts, total in snapshot:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+STAGE_SECONDS = Histogram(
+    "inventory_api_stage_seconds", "Self time of one request stage", ('endpoint', 'stage')
+)
+REQUEST_SECONDS = Histogram(
+    "inventory_api_request_seconds", "Wall time of a request", ('endpoint', 'status')
+)
+
+
+def exposition():
+    """
+    All histograms in the Prometheus text format
+    """
+    return "\n".join(h.exposition() for h in (STAGE_SECONDS, REQUEST_SECONDS)) + "\n"
+
+
+# =========================
+# Spans
+# =========================
+class RequestTimer:
+    """
+    Stage self times of one request
+    """
+
+    def __init__(self, sampler=None):
+        self.stages = {}
+        self.stack = []
+        self.sampler = sampler
+
+
+_current = ContextVar("request_timer", default=None)
+
+
+class _Span:
+    __slots__ = ('timer', 'stage', 'start', 'children')
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        if self.timer.sampler is not None:
+            self.timer.sampler.add_thread(threading.get_ident())
+        self.children = 0.0
+        self.timer.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        timer = self.timer
+        timer.stack.pop()
+        if timer.stack:
+            timer.stack[-1].children += elapsed
+        timer.stages[self.stage] = timer.stages.get(self.stage, 0.0) + elapsed - self.children
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage):
+    """
+    Context manager timing one stage of the current request
+
+    Args:
+        stage: One of STAGES
+    """
+    timer = _current.get()
+    if timer is None:
+        return _NO_SPAN
+    return _Span(timer, stage)
+
+
+# =========================
+# Sampling profiler
+# =========================
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Samples the stacks of the registered threads on a background thread
+    """
+
+    def __init__(self, interval=PROFILE_SAMPLE_SECONDS):
+        self.interval = interval
+        self.threads = set()
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def add_thread(self, ident):
+        self.threads.add(ident)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in tuple(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.counts[_fold(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        """
+        Returns:
+            Folded stacks, heaviest first
+        """
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+# =========================
+# Middleware
+# =========================
+def _wants_profile(scope):
+    query = scope.get("query_string", b"")
+    return b"profile=" in query and any(
+        part in (b"profile=1", b"profile=true") for part in query.split(b"&")
+    )
+
+
+def server_timing(stages):
+    """
+    Server-Timing header value of a request's stages (milliseconds)
+    """
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages.items())
+
+
+class RequestProfiler:
+    """
+    ASGI middleware recording the spans of every HTTP request
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler().start() if _wants_profile(scope) else None
+        timer = RequestTimer(sampler)
+        token = _current.set(timer)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timer.stages).encode()))
+                message = {**message, "headers": headers}
+            if sampler is None:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - start
+
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            for stage, seconds in timer.stages.items():
+                STAGE_SECONDS.observe((endpoint, stage), seconds)
+            REQUEST_SECONDS.observe((endpoint, str(status)), elapsed)
+
+            folded = sampler.stop() if sampler is not None else None
+
+        if folded is not None:
+            body = folded.encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", FOLDED_MEDIA_TYPE.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"server-timing", server_timing(timer.stages).encode()),
+                    (b"x-profile-samples", str(sampler.samples).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
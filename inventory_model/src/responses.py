@@ -0,0 +1,190 @@
+"""
+Response Encoding
+Content negotiation and compact payloads for the API
+
+Formats (?format=... wins over the Accept header):
+    json       default; the endpoint's usual shape, serialized with orjson
+    columnar   JSON with one array per column instead of one object per row
+    msgpack    MessagePack of the columnar payload   (application/msgpack)
+    arrow      Arrow IPC stream of the table         (application/vnd.apache.arrow.stream)
+
+orjson, msgpack and pyarrow are optional: without orjson the default path
+falls back to the standard library, and asking for a binary format whose
+library is missing returns 406.
+"""
+
+import json
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from profiling import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+FORMATS = ('json', 'columnar', 'msgpack', 'arrow')
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.columnar+json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+# =========================
+# JSON
+# =========================
+def _default(value):
+    # numpy/pandas scalars the encoders do not know natively
+    if isinstance(value, (np.generic,)):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    Compact UTF-8 JSON, byte-compatible with Starlette's JSONResponse
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSONResponse rendered with orjson when it is installed
+    """
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return dumps(content)
+
+
+# =========================
+# Negotiation
+# =========================
+def negotiate(request: Request, format: Optional[str] = None) -> str:
+    """
+    Response format from the query parameter or the Accept header
+
+    Raises:
+        HTTPException 406 for unknown formats or missing optional libraries
+    """
+    if format is None:
+        accept = request.headers.get("accept", "").lower()
+        if ARROW_MEDIA_TYPE in accept:
+            format = 'arrow'
+        elif any(media in accept for media in MSGPACK_MEDIA_TYPES):
+            format = 'msgpack'
+        elif COLUMNAR_MEDIA_TYPE in accept:
+            format = 'columnar'
+        else:
+            format = 'json'
+
+    format = format.lower()
+    if format not in FORMATS:
+        raise HTTPException(status_code=406, detail=f"Unknown format '{format}', use one of {FORMATS}")
+    if format == 'msgpack' and msgpack is None:
+        raise HTTPException(status_code=406, detail="MessagePack responses need the msgpack package")
+    if format == 'arrow' and pa is None:
+        raise HTTPException(status_code=406, detail="Arrow responses need the pyarrow package")
+
+    return format
+
+
+# =========================
+# Payloads
+# =========================
+def frame_columns(df: pd.DataFrame) -> dict:
+    """
+    {column: list of Python values}
+    """
+    with span("serialize"):
+        return {col: df[col].tolist() for col in df.columns}
+
+
+def _binary(payload: dict, format: str, metadata: Optional[dict] = None) -> Response:
+    with span("serialize"):
+        return _encode_binary(payload, format, metadata)
+
+
+def _encode_binary(payload: dict, format: str, metadata: Optional[dict] = None) -> Response:
+    if format == 'msgpack':
+        body = msgpack.packb({**(metadata or {}), **payload}, default=_default)
+        return Response(body, media_type=MSGPACK_MEDIA_TYPES[0], headers={"Vary": "Accept"})
+
+    # Arrow: the column arrays as one table, everything else as schema metadata
+    table = pa.table(payload['columns'])
+    if metadata:
+        table = table.replace_schema_metadata({
+            key: dumps(value) for key, value in metadata.items()
+        })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE, headers={"Vary": "Accept"})
+
+
+def table_response(df: pd.DataFrame, format: str, records=None) -> Response:
+    """
+    A tabular result (one row per record) in the negotiated format
+
+    Args:
+        df: The rows, columns already in their response types
+        format: negotiate() result
+        records: JSON payload to send as-is in the default format
+            (default: df.to_dict("records"))
+    """
+    if format == 'json':
+        return FastJSONResponse(df.to_dict("records") if records is None else records,
+                                headers={"Vary": "Accept"})
+
+    payload = {'columns': frame_columns(df)}
+    if format == 'columnar':
+        return FastJSONResponse(payload, headers={"Vary": "Accept"})
+    return _binary(payload, format)
+
+
+def document_response(content: dict, format: str, rows_key: str, compact) -> Response:
+    """
+    A nested result whose `rows_key` list is sent column-wise in the
+    compact formats
+
+    Args:
+        content: Full JSON document (sent as-is in the default format)
+        format: negotiate() result
+        rows_key: Key of the per-row list inside content
+        compact: Function(rows) → (columns dict, extra metadata dict)
+    """
+    if format == 'json':
+        return FastJSONResponse(content, headers={"Vary": "Accept"})
+
+    with span("serialize"):
+        columns, extra = compact(content[rows_key])
+    metadata = {key: value for key, value in content.items() if key != rows_key}
+    metadata.update(extra)
+
+    if format == 'columnar':
+        return FastJSONResponse({**metadata, 'columns': columns}, headers={"Vary": "Accept"})
+    return _binary({'columns': columns}, format, metadata)
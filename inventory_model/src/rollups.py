@@ -0,0 +1,182 @@
+"""
+History Rollups
+Per-series day / week / month tables of actual vs predicted demand,
+precomputed once per history file and model and stored next to the
+dataset, so /history and the context windows of /predict_with_context
+are slices instead of a featurize → predict → resample per request.
+
+Tables are sorted by series and date, with each series' row range kept,
+so a series (and a date range inside it) is an offset lookup plus a
+binary search. Week bins are W-SUN and month bins ME, labelled by their
+last day with the DataFrame.resample means, empty bins included.
+
+The on-disk address is the history file's size and SHA-256, the model's
+fingerprint and ROLLUP_VERSION: new data or a retrained model builds a
+new set, an API restart loads the existing one.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_loader import HISTORY_PATH
+
+SERIES_KEYS = ['store_id', 'product_id']
+ROLLUP_COLUMNS = ['units_sold_7d', 'predicted', 'inventory_level', 'price', 'discount']
+RESOLUTIONS = {'day': None, 'week': 'W-SUN', 'month': 'ME'}
+
+ROLLUP_VERSION = 1
+ROLLUP_DIR = Path(os.environ.get("INVENTORY_ROLLUP_DIR", HISTORY_PATH.parent / "rollups"))
+ROLLUP_KEEP = 2   # rollup sets kept on disk (newest first)
+
+
+# =========================
+# Content addressing
+# =========================
+def rollup_key(manifest, fingerprint, version=ROLLUP_VERSION):
+    """
+    Cache address of the rollups for one data manifest and model
+    """
+    payload = json.dumps({
+        'bytes': manifest['bytes'],
+        'sha256': manifest['sha256'],
+        'model': fingerprint,
+        'rollup_version': version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+# =========================
+# Rollup tables
+# =========================
+def _series_offsets(table):
+    sizes = table.groupby(SERIES_KEYS, sort=False).size()
+    stops = np.cumsum(sizes.to_numpy())
+    return {
+        (int(store), int(product)): (int(stop - size), int(stop))
+        for (store, product), size, stop in zip(sizes.index, sizes.to_numpy(), stops)
+    }
+
+
+class SeriesRollups:
+    """
+    Day, week and month tables of every series
+
+    Columns: store_id, product_id (encoded), date (bin label),
+    period_start (first day of the bin) and ROLLUP_COLUMNS.
+    units_sold_7d is float64 (the 'actual' of the API), predicted float32.
+    """
+
+    def __init__(self, tables, offsets):
+        self.tables = tables
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, scored):
+        """
+        Args:
+            scored: Encoded, featurized history with a 'predicted' column
+        """
+        day = scored.sort_values(SERIES_KEYS + ['date'])[SERIES_KEYS + ['date'] + ROLLUP_COLUMNS]
+        day = day.assign(
+            units_sold_7d=day['units_sold_7d'].astype(np.float64),
+            period_start=day['date']
+        ).reset_index(drop=True)
+
+        tables = {'day': day}
+        for resolution, freq in RESOLUTIONS.items():
+            if freq is None:
+                continue
+            binned = (
+                day.set_index('date')
+                   .groupby(SERIES_KEYS, sort=False)[ROLLUP_COLUMNS]
+                   .resample(freq)
+                   .mean()
+                   .reset_index()
+            )
+            if resolution == 'week':
+                binned['period_start'] = binned['date'] - pd.Timedelta(days=6)
+            else:
+                binned['period_start'] = binned['date'].dt.to_period('M').dt.start_time
+            tables[resolution] = binned
+
+        return cls(tables, {name: _series_offsets(table) for name, table in tables.items()})
+
+    def series(self, resolution, store_code, product_code, start=None, end=None):
+        """
+        Rows of one series, optionally only the bins overlapping [start, end]
+
+        Args:
+            resolution: 'day', 'week' or 'month'
+            store_code, product_code: Encoded series IDs
+            start, end: Inclusive date bounds (None = open)
+
+        Returns:
+            DataFrame slice in date order (empty for unknown series)
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}', use one of {list(RESOLUTIONS)}")
+
+        table = self.tables[resolution]
+        lo, hi = self.offsets[resolution].get((int(store_code), int(product_code)), (0, 0))
+
+        if start is not None:
+            # Bins are sorted and do not overlap, so their labels (last days) are too
+            labels = table['date'].to_numpy()[lo:hi]
+            lo += int(np.searchsorted(labels, np.datetime64(pd.Timestamp(start)), side='left'))
+        if end is not None:
+            starts = table['period_start'].to_numpy()[lo:hi]
+            hi = lo + int(np.searchsorted(starts, np.datetime64(pd.Timestamp(end)), side='right'))
+
+        return table.iloc[lo:max(lo, hi)]
+
+    # =========================
+    # Persistence
+    # =========================
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        joblib.dump({'tables': self.tables, 'offsets': self.offsets}, tmp)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        data = joblib.load(path)
+        return cls(data['tables'], data['offsets'])
+
+
+def load_rollups(key, build, rollup_dir=ROLLUP_DIR):
+    """
+    Rollups stored under `key`, or build() them and store them
+
+    Args:
+        key: rollup_key(...)
+        build: Function() → SeriesRollups, called on a cache miss
+        rollup_dir: Directory next to the dataset
+
+    Returns:
+        (rollups, 'disk' | 'built')
+    """
+    rollup_dir = Path(rollup_dir)
+    path = rollup_dir / f"{key}.pkl"
+
+    if path.exists():
+        return SeriesRollups.load(path), 'disk'
+
+    rollups = build()
+    rollups.save(path)
+    _prune(rollup_dir)
+    return rollups, 'built'
+
+
+def _prune(rollup_dir, keep=ROLLUP_KEEP):
+    entries = sorted(rollup_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[keep:]:
+        stale.unlink(missing_ok=True)
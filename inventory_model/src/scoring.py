@@ -0,0 +1,126 @@
+"""
+Batch Scoring Module
+Scores every (store, product) series in one featurize + predict pass, and
+selects the trailing rows worth scoring: features need the full lookback,
+but the booster only has to run on the window the outputs use
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import SCORING_WINDOW_DAYS
+from data_loader import encode_categoricals
+from features import create_features
+from inventory_math import predict_quantiles, quantile_column
+
+SERIES_KEYS = ['store_id', 'product_id']
+ERROR_WINDOW = 30   # trailing rows behind the error band, as in /bulk_predict
+
+
+def recent_window(df, rows=SCORING_WINDOW_DAYS, since=None, keys=SERIES_KEYS):
+    """
+    Trailing rows of every series, for evaluating the booster only where
+    the results are used
+
+    Args:
+        df: Featurized frame (create_features output, sorted by series and date)
+        rows: Keep the last `rows` rows of each series (None = all rows)
+        since: Also keep every row dated on/after this date
+        keys: Series key columns
+
+    Returns:
+        Filtered view of df (row order preserved)
+    """
+    if rows is None:
+        return df
+
+    mask = df.groupby(keys, sort=False).cumcount(ascending=False).to_numpy() < rows
+    if since is not None:
+        mask |= (df['date'] >= since).to_numpy()
+
+    return df[mask]
+
+
+def score_latest(df, model, encoders, features, quantile_model=None,
+                 low_alpha=0.1, high_alpha=0.9):
+    """
+    Latest predicted weekly demand per series, with interval bounds
+
+    Interval bounds come from the quantile model when it was trained with
+    low_alpha/high_alpha; otherwise from the mean % error of the trailing
+    ERROR_WINDOW predictions (the same band /bulk_predict uses).
+
+    Args:
+        df: Raw history frame (string IDs, parsed 'date' column)
+        model: Point demand model (log1p target)
+        encoders: Fitted LabelEncoders keyed by column
+        features: Feature column order used by the model
+        quantile_model: Optional multi-quantile model
+        low_alpha, high_alpha: Quantiles used as interval bounds
+
+    Returns:
+        DataFrame with one row per series: store_id, product_id, category,
+        region, date, inventory_level, price, predicted, low, high, mean_error
+    """
+    df = df.sort_values(SERIES_KEYS + ['date'])
+
+    # Labels as they were before encoding
+    latest = (
+        df.groupby(SERIES_KEYS, sort=False)
+          .tail(1)[SERIES_KEYS + ['category', 'region', 'date', 'inventory_level', 'price']]
+          .reset_index(drop=True)
+    )
+
+    df = create_features(encode_categoricals(df, encoders))
+
+    # Only the trailing window of each series is scored
+    recent = recent_window(df, ERROR_WINDOW)
+    predicted = np.expm1(model.predict(recent[features]))
+    actual = recent['units_sold_7d'].to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error_pct = np.abs(predicted - actual) / actual * 100
+    error_pct[~np.isfinite(error_pct)] = np.nan
+
+    scored = pd.DataFrame({
+        'store_id': recent['store_id'].to_numpy(),
+        'product_id': recent['product_id'].to_numpy(),
+        'predicted': predicted,
+        'error_pct': error_pct
+    })
+
+    summary = (
+        scored.groupby(SERIES_KEYS, sort=True)
+              .agg(predicted=('predicted', 'last'), mean_error=('error_pct', 'mean'))
+              .reset_index()
+    )
+    summary['mean_error'] = summary['mean_error'].fillna(0)
+
+    # Back to the original labels so rows line up with `latest`
+    for col in SERIES_KEYS:
+        if col in encoders:
+            summary[col] = encoders[col].inverse_transform(summary[col])
+
+    result = latest.merge(summary, on=SERIES_KEYS, how='left')
+
+    quantile_cols = {}
+    if quantile_model is not None:
+        last_rows = df.groupby(SERIES_KEYS, sort=False).tail(1)
+        quantile_cols = predict_quantiles(quantile_model, last_rows[features])
+
+    low_col, high_col = quantile_column(low_alpha), quantile_column(high_alpha)
+
+    if low_col in quantile_cols and high_col in quantile_cols:
+        # Keyed by series like `summary`, not by row position
+        bounds = pd.DataFrame({
+            col: (encoders[col].inverse_transform(last_rows[col]) if col in encoders else last_rows[col].to_numpy())
+            for col in SERIES_KEYS
+        })
+        bounds['low'] = quantile_cols[low_col]
+        bounds['high'] = quantile_cols[high_col]
+        result = result.merge(bounds, on=SERIES_KEYS, how='left')
+    else:
+        result['low'] = np.maximum(result['predicted'] * (1 - result['mean_error'] / 100), 0)
+        result['high'] = result['predicted'] * (1 + result['mean_error'] / 100)
+
+    return result
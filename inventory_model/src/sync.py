@@ -0,0 +1,152 @@
+"""
+Forecast Sync
+Pushes the weekly forecasts and reorder recommendations of a batch
+scoring run (weekly_forecasts.csv, one row per series) into Postgres
+through the Node/Prisma server (POST /api/sync/forecasts)
+
+Rows travel in column-wise batches of SYNC_BATCH_ROWS. The server
+upserts each batch in one transaction with a single
+INSERT ... SELECT FROM unnest(...) ON CONFLICT per table, keyed on
+(storeId, productId, weekStart): re-running the scoring in the same week
+updates the rows instead of duplicating them, and a sync interrupted
+half-way is safe to repeat.
+
+Against a local Postgres:
+    cd server && DATABASE_URL=postgresql://... npx prisma migrate deploy
+    DATABASE_URL=postgresql://... node src/server.js
+    python batch_score.py --window --sync      # or: python sync.py
+
+Tests against a scratch database (skipped when the variables are unset):
+    cd server && TEST_DATABASE_URL=postgresql://... npm test
+    INVENTORY_SYNC_TEST_URL=http://127.0.0.1:5000/api/sync python -m pytest tests/test_sync.py
+
+Usage:
+    python sync.py
+    python sync.py --url http://127.0.0.1:5000/api/sync --batch-rows 10000
+"""
+
+import argparse
+import os
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from config import SYNC_BATCH_ROWS
+from batch_score import FORECASTS_PATH
+
+SYNC_URL = os.environ.get("INVENTORY_SYNC_URL", "http://127.0.0.1:5000/api/sync")
+
+REQUIRED_COLUMNS = [
+    'store_id', 'product_id', 'category', 'region', 'week_start', 'price',
+    'predicted_weekly_demand', 'reorder_point', 'order_quantity', 'stockout_risk'
+]
+
+
+def sync_batches(df, batch_rows=SYNC_BATCH_ROWS):
+    """
+    Column-wise request bodies of at most batch_rows rows each
+    """
+    for start in range(0, len(df), batch_rows):
+        part = df.iloc[start:start + batch_rows]
+        yield {
+            "columns": {
+                "storeName": part['store_id'].astype(str).tolist(),
+                "region": part['region'].astype(str).tolist(),
+                "productName": part['product_id'].astype(str).tolist(),
+                "category": part['category'].astype(str).tolist(),
+                "price": part['price'].astype(float).round(2).tolist(),
+                "weekStart": pd.to_datetime(part['week_start']).dt.strftime('%Y-%m-%d').tolist(),
+                "demand": part['predicted_weekly_demand'].astype(float).round(2).tolist(),
+                "reorderPoint": part['reorder_point'].astype(float).round(2).tolist(),
+                "orderQty": part['order_quantity'].round().astype(int).tolist(),
+                "riskLevel": np.where(part['stockout_risk'] == 1, "HIGH", "LOW").tolist(),
+            }
+        }
+
+
+def sync_forecasts(path=FORECASTS_PATH, url=SYNC_URL, batch_rows=SYNC_BATCH_ROWS,
+                   client=None, timeout=120.0):
+    """
+    Upsert a weekly forecast file into the Forecast and Reorder tables
+
+    Args:
+        path: weekly_forecasts.csv from batch_score.py
+        url: Base URL of the server's sync routes
+        batch_rows: Rows per request (one server transaction each)
+        client: Optional httpx.Client to reuse
+        timeout: Seconds per request
+
+    Returns:
+        Dictionary with 'rows', 'skipped', 'batches', 'seconds' and
+        inserted/updated counts for 'forecasts' and 'reorders'
+
+    Raises:
+        RuntimeError when the server rejects a batch (earlier batches stay
+        committed; re-running the sync is safe)
+    """
+    start = time.perf_counter()
+    df = pd.read_csv(path)
+
+    complete = df[REQUIRED_COLUMNS].notna().all(axis=1)
+    df = df[complete]
+
+    totals = {
+        'rows': 0,
+        'skipped': int((~complete).sum()),
+        'batches': 0,
+        'forecasts': {'inserted': 0, 'updated': 0},
+        'reorders': {'inserted': 0, 'updated': 0},
+    }
+
+    own_client = client is None
+    client = client or httpx.Client(timeout=timeout)
+    endpoint = f"{url.rstrip('/')}/forecasts"
+
+    try:
+        for payload in sync_batches(df, batch_rows):
+            response = client.post(endpoint, json=payload)
+            if response.is_error:
+                raise RuntimeError(
+                    f"Sync batch {totals['batches'] + 1} failed ({response.status_code}): {response.text}"
+                )
+
+            result = response.json()
+            totals['rows'] += result['rows']
+            totals['batches'] += 1
+            for table in ('forecasts', 'reorders'):
+                for key in ('inserted', 'updated'):
+                    totals[table][key] += result[table][key]
+    finally:
+        if own_client:
+            client.close()
+
+    totals['seconds'] = time.perf_counter() - start
+    return totals
+
+
+def print_sync_report(totals):
+    print(f"\n{'='*70}")
+    print(f"🔄 POSTGRES SYNC")
+    print(f"{'='*70}")
+    print(f"\n   Rows: {totals['rows']:,} in {totals['batches']} batch(es), {totals['seconds']:.1f}s")
+    if totals['skipped']:
+        print(f"   ⚠️  Skipped {totals['skipped']:,} incomplete row(s)")
+    for table in ('forecasts', 'reorders'):
+        counts = totals[table]
+        print(f"   {table.capitalize():<10} {counts['inserted']:>8,} inserted  {counts['updated']:>8,} updated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push weekly forecasts and reorders to Postgres")
+    parser.add_argument("--path", default=str(FORECASTS_PATH), help="weekly_forecasts.csv from batch_score.py")
+    parser.add_argument("--url", default=SYNC_URL, help="Base URL of the sync API")
+    parser.add_argument("--batch-rows", type=int, default=SYNC_BATCH_ROWS, help="Rows per request")
+    args = parser.parse_args()
+
+    print_sync_report(sync_forecasts(args.path, args.url, args.batch_rows))
+
+
+if __name__ == "__main__":
+    main()
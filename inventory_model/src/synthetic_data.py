@@ -0,0 +1,159 @@
+"""
+Synthetic Data Generator
+Produces history in the retail_store_inventory.csv schema at any
+store x product x day scale, for benchmarks and load tests
+
+Usage:
+    python synthetic_data.py --stores 50 --products 200 --days 730 --out ../data/synthetic.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = np.array(['Clothing', 'Electronics', 'Furniture', 'Groceries', 'Toys'])
+REGIONS = np.array(['East', 'North', 'South', 'West'])
+WEATHER = np.array(['Cloudy', 'Rainy', 'Snowy', 'Sunny'])
+SEASONS = np.array(['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                    'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter'])
+
+# Named scales: (stores, products, days)
+SCALES = {
+    '10k': (5, 20, 100),
+    '1m': (20, 100, 500),
+    '50m': (100, 500, 1000),
+}
+
+
+def store_ids(n_stores):
+    return np.array([f"S{i + 1:03d}" for i in range(n_stores)])
+
+
+def product_ids(n_products):
+    return np.array([f"P{i + 1:04d}" for i in range(n_products)])
+
+
+def iter_history(n_stores=5, n_products=20, n_days=731,
+                 start_date="2022-01-01", seed=42, chunk_rows=1_000_000):
+    """
+    Yield the synthetic history in date order, a block of whole days at a time
+
+    Category is fixed per product and region per store, so the hierarchy is
+    consistent. Demand has a per-SKU base level, weekly and yearly
+    seasonality, price/discount/promotion effects and ~2% zero-demand days.
+
+    Args:
+        n_stores, n_products, n_days: Scale of the history
+        start_date: First date
+        seed: Random seed (per-SKU parameters and every day block)
+        chunk_rows: Approximate rows per yielded frame
+
+    Yields:
+        DataFrames with the raw CSV column names
+    """
+    rng = np.random.default_rng(seed)
+    n_series = n_stores * n_products
+
+    stores = store_ids(n_stores)
+    products = product_ids(n_products)
+    start = pd.Timestamp(start_date)
+
+    # Per-SKU parameters (series order: store-major, product-minor)
+    base_demand = rng.lognormal(mean=4.5, sigma=0.6, size=n_series)
+    base_price = rng.uniform(10, 100, size=n_series).round(2)
+    product_idx = np.tile(np.arange(n_products), n_stores)
+    store_idx = np.repeat(np.arange(n_stores), n_products)
+
+    days_per_chunk = max(1, chunk_rows // n_series)
+
+    for block, first_day in enumerate(range(0, n_days, days_per_chunk)):
+        days = np.arange(first_day, min(first_day + days_per_chunk, n_days))
+        block_rng = np.random.default_rng([seed, block])
+
+        day = np.repeat(days, n_series)
+        sku = np.tile(np.arange(n_series), len(days))
+        n = len(day)
+
+        dates = start + pd.to_timedelta(day, unit='D')
+        weekday = dates.weekday.to_numpy()
+        month = dates.month.to_numpy()
+
+        discount = block_rng.choice([0, 5, 10, 15, 20], size=n, p=[0.4, 0.2, 0.2, 0.1, 0.1])
+        promotion = (block_rng.random(n) < 0.1).astype(int)
+        price = (base_price[sku] * block_rng.uniform(0.95, 1.05, size=n)).round(2)
+
+        level = (
+            base_demand[sku]
+            * (1 + 0.25 * np.sin(2 * np.pi * day / 365.25))
+            * np.where(weekday >= 5, 1.3, 1.0)
+            * (1 + discount / 100)
+            * np.where(promotion == 1, 1.2, 1.0)
+        )
+        units_sold = block_rng.poisson(level)
+        units_sold[block_rng.random(n) < 0.02] = 0
+
+        yield pd.DataFrame({
+            'Date': dates.strftime('%Y-%m-%d'),
+            'Store ID': stores[store_idx[sku]],
+            'Product ID': products[product_idx[sku]],
+            'Category': CATEGORIES[product_idx[sku] % len(CATEGORIES)],
+            'Region': REGIONS[store_idx[sku] % len(REGIONS)],
+            'Inventory Level': block_rng.integers(50, 500, size=n) + units_sold,
+            'Units Sold': units_sold,
+            'Units Ordered': block_rng.integers(20, 200, size=n),
+            'Demand Forecast': (level * block_rng.normal(1, 0.05, size=n)).round(2),
+            'Price': price,
+            'Discount': discount,
+            'Weather Condition': block_rng.choice(WEATHER, size=n),
+            'Holiday/Promotion': promotion,
+            'Competitor Pricing': (price * block_rng.uniform(0.9, 1.1, size=n)).round(2),
+            'Seasonality': SEASONS[month - 1],
+        })
+
+
+def generate_history(n_stores=5, n_products=20, n_days=731, start_date="2022-01-01", seed=42):
+    """
+    The whole synthetic history as one DataFrame (raw CSV column names)
+    """
+    return pd.concat(
+        iter_history(n_stores, n_products, n_days, start_date, seed),
+        ignore_index=True
+    )
+
+
+def write_history(path, n_stores=5, n_products=20, n_days=731,
+                  start_date="2022-01-01", seed=42):
+    """
+    Stream the synthetic history to CSV without holding it in memory
+
+    Returns:
+        Number of rows written
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = 0
+    for i, chunk in enumerate(iter_history(n_stores, n_products, n_days, start_date, seed)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows += len(chunk)
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic retail inventory history")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="Named scale (overrides sizes)")
+    parser.add_argument("--stores", type=int, default=5)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--days", type=int, default=731)
+    parser.add_argument("--start-date", default="2022-01-01")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="Output CSV path")
+    args = parser.parse_args()
+
+    stores, products, days = SCALES[args.scale] if args.scale else (args.stores, args.products, args.days)
+    rows = write_history(args.out, stores, products, days, args.start_date, args.seed)
+
+    print(f"✅ Wrote {rows:,} rows ({stores} stores x {products} products x {days} days) to {args.out}")
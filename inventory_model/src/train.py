@@ -1,103 +1,198 @@
-import pandas as pd
+import argparse
+import sys
 import numpy as np
 import joblib
 from pathlib import Path
 
 from xgboost import XGBRegressor
-from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
-from features import create_features
+from features import FEATURES, TARGET
+from data_loader import HISTORY_PATH, load_history, clean_history, unseen_labels, memory_report
 from metrics import calculate_all_metrics, print_metrics, compare_metrics
-
-# =========================
-# Load data
-# =========================
-BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_DIR = BASE_DIR / "models"
-DATA_DIR = BASE_DIR / "data"
-
-df = pd.read_csv(DATA_DIR / "retail_store_inventory.csv")
-
-df.columns = (
-    df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace("/", "_")
+from config import QUANTILE_ALPHAS, CV_FOLDS, TRAIN_CHUNK_ROWS, SAMPLE_RATES
+from training import (
+    load_featurized, encode_frame, time_split, fit_model, sampling_tradeoff, print_sampling_report
 )
+from tuning import search_params, print_search, save_best_params, load_model_params
+from incremental import warm_start, print_warm_start
+from external_memory import train_external_memory
+from forest import FlatForest
+from drift import training_reference
+from inventory_math import save_quantile_model
+
+parser = argparse.ArgumentParser(description="Train the weekly demand model")
+parser.add_argument(
+    "--quantiles", action="store_true",
+    help=f"Also train one multi-quantile model (alphas {QUANTILE_ALPHAS}) for safety stock"
+)
+parser.add_argument(
+    "--search", action="store_true",
+    help="Rolling-origin CV hyperparameter search on the training period; "
+         "the winner is used and saved to models/best_params.json"
+)
+parser.add_argument("--trials", type=int, default=12, help="Search candidates (with --search)")
+parser.add_argument("--folds", type=int, default=CV_FOLDS, help="Rolling-origin folds (with --search)")
+parser.add_argument(
+    "--incremental", action="store_true",
+    help="Continue boosting the saved model on recent data; falls back to a "
+         "full retrain when the holdout WAPE guardrail fails"
+)
+parser.add_argument(
+    "--external-memory", action="store_true",
+    help="Stream featurized chunks through an XGBoost DataIter (on-disk page "
+         "cache) so memory is bounded by the chunk size, not the history"
+)
+parser.add_argument("--chunk-rows", type=int, default=TRAIN_CHUNK_ROWS,
+                    help="CSV rows per chunk (with --external-memory)")
+parser.add_argument("--cache-dir", default=None,
+                    help="Directory for the page cache (with --external-memory; default: system temp)")
+parser.add_argument(
+    "--sample", type=float, nargs="*", metavar="RATE",
+    help=f"Experiment only: fit on stratified float32 samples of the training rows "
+         f"(default rates {SAMPLE_RATES}) and report speed/accuracy against a full fit; "
+         f"nothing is saved"
+)
+args = parser.parse_args()
 
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
-
-# =========================
-# BAD DATA REMOVAL (BIGGEST IMPACT)
-# =========================
-df = df[df['units_sold'] >= 0]
-df = df[df['price'] > 0]
-df = df.dropna()
-
-# =========================
-# Encode categoricals
-# =========================
-categorical_cols = [
-    'store_id','product_id','category',
-    'region','weather_condition','seasonality'
-]
-
-encoders = {}
-for col in categorical_cols:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col].astype(str))
-    encoders[col] = le
-
-# =========================
-# Feature engineering
-# =========================
-df = create_features(df)
-
-print("\n📊 Weekly Demand Distribution:")
-print(df['units_sold_7d'].describe())
-
-# =========================
-# Features & Target
-# =========================
-FEATURES = [
-    'store_id','product_id','category','region',
-    'inventory_level','price','discount',
-    'competitor_pricing','holiday_promotion',
-    'seasonality','is_weekend','week','month',
-    'lag_7','lag_14','lag_30','lag_60',
-    'rolling_mean_7','rolling_mean_30'
-]
+if args.external_memory and (args.search or args.incremental or args.quantiles):
+    parser.error("--external-memory cannot be combined with --search, --incremental or --quantiles")
 
-TARGET = 'log_units_sold_7d'
+if args.sample is not None and (args.search or args.incremental or args.quantiles or args.external_memory):
+    parser.error("--sample is an experiment and cannot be combined with other training modes")
 
 # =========================
-# Time-safe split
+# Setup
 # =========================
-split_date = df['date'].quantile(0.80)
-
-X_train = df[df['date'] <= split_date][FEATURES]
-y_train = df[df['date'] <= split_date][TARGET]
-
-X_valid = df[df['date'] > split_date][FEATURES]
-y_valid = df[df['date'] > split_date][TARGET]
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BASE_DIR / "models"
+DATA_DIR = BASE_DIR / "data"
 
-# =========================
-# Train model
-# =========================
-model = XGBRegressor(
-    n_estimators=600,
-    max_depth=6,
-    learning_rate=0.05,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    min_child_weight=5,
-    gamma=0.2,
-    reg_alpha=0.5,
-    reg_lambda=1.5,
-    objective="reg:squarederror",
-    tree_method="hist",
-    random_state=42
-)
+if args.sample is not None:
+    # =========================
+    # Sampled experiment (production artifacts untouched)
+    # =========================
+    frame, cache_info = load_featurized(HISTORY_PATH)
+    df, _ = encode_frame(frame)
+    model_params, params_source = load_model_params()
+
+    print(f"\n⚙️  Model params ({params_source}): {model_params}")
+    print_sampling_report(sampling_tradeoff(df, model_params, args.sample or SAMPLE_RATES))
+    sys.exit(0)
+
+if args.external_memory:
+    # =========================
+    # Out-of-core training
+    # =========================
+    model_params, params_source = load_model_params()
+    training_mode = "external_memory"
+
+    print(f"\n💽 External-memory training ({args.chunk_rows:,} rows per chunk)")
+    print(f"⚙️  Model params ({params_source}): {model_params}")
+
+    result = train_external_memory(
+        HISTORY_PATH, model_params, FEATURES, TARGET,
+        chunk_rows=args.chunk_rows, cache_dir=args.cache_dir
+    )
+    model, encoders, split_date = result['model'], result['encoders'], result['split_date']
+    print(f"   Scanned {result['scanned_rows']:,} rows, split date {split_date}")
+    print(f"   Training matrix: {result['matrix_rows']:,} rows paged to disk")
+    train_metrics, valid_metrics = result['train_metrics'], result['valid_metrics']
+    train_records, valid_records = result['train_records'], result['valid_records']
+    train_range, valid_range = result['train_prediction_range'], result['valid_prediction_range']
 
-model.fit(X_train, y_train)
+else:
+    # =========================
+    # Cleaned, featurized history (cached by content)
+    # =========================
+    frame, cache_info = load_featurized(HISTORY_PATH)
+    print(f"\n🗂️  Featurized history: {len(frame):,} rows "
+          f"({cache_info['source']}, key {cache_info['key']})")
+
+    # =========================
+    # Encode categoricals
+    # =========================
+    encoders = None
+    previous_model = None
+    if args.incremental:
+        # Warm start needs the saved model's encoders to cover every label
+        saved_encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+        unseen = unseen_labels(frame, saved_encoders)
+        if unseen:
+            print(f"\n⚠️  Unseen labels {unseen}: full retrain with new encoders")
+        else:
+            encoders = saved_encoders
+            previous_model = joblib.load(MODEL_DIR / "demand_model.pkl")
+
+    df, encoders = encode_frame(frame, encoders)
+    memory_report(df, "training frame")
+
+    print("\n📊 Weekly Demand Distribution:")
+    print(df['units_sold_7d'].describe())
+
+    # =========================
+    # Time-safe split
+    # =========================
+    split_date, X_train, y_train, X_valid, y_valid = time_split(df)
+
+    # =========================
+    # Train model
+    # =========================
+    model = None
+    training_mode = "full"
+
+    if previous_model is not None:
+        model, refresh_report = warm_start(df, previous_model, FEATURES, TARGET)
+        print_warm_start(refresh_report)
+        if model is not None:
+            training_mode = "incremental"
+            model_params, params_source = model.get_params(), "warm start"
+
+    if training_mode == "full":
+        if args.search:
+            print(f"\n🔎 Searching {args.trials} candidates over {args.folds} rolling-origin folds...")
+            search_result = search_params(
+                X_train, y_train, df.loc[df['date'] <= split_date, 'date'],
+                n_trials=args.trials, n_folds=args.folds
+            )
+            print_search(search_result)
+            model_params, params_source = search_result['params'], "search"
+        else:
+            model_params, params_source = load_model_params()
+
+        print(f"\n⚙️  Model params ({params_source}): {model_params}")
+
+        model = fit_model(X_train, y_train, model_params)
+
+    # =========================
+    # Predictions & metrics
+    # =========================
+    # Training set predictions
+    train_preds = np.expm1(model.predict(X_train))
+    train_true = np.expm1(y_train)
+
+    # Validation set predictions
+    valid_preds = np.expm1(model.predict(X_valid))
+    valid_true = np.expm1(y_valid)
+
+    # Calculate comprehensive metrics
+    train_metrics = calculate_all_metrics(
+        train_true, 
+        train_preds, 
+        y_train=None,
+        exclude_zeros=True  # Exclude zeros from MAPE
+    )
+
+    valid_metrics = calculate_all_metrics(
+        valid_true, 
+        valid_preds, 
+        y_train=train_true,  # For MASE calculation
+        exclude_zeros=True  # Exclude zeros from MAPE
+    )
+
+    train_records, valid_records = len(X_train), len(X_valid)
+    train_range = {'min': train_preds.min(), 'max': train_preds.max(), 'mean': train_preds.mean()}
+    valid_range = {'min': valid_preds.min(), 'max': valid_preds.max(), 'mean': valid_preds.mean()}
 
 # =========================
 # Evaluation with Advanced Metrics
@@ -106,32 +201,18 @@ print("\n" + "="*70)
 print("📊 MODEL EVALUATION WITH ZERO-DEMAND HANDLING")
 print("="*70)
 
-# Training set predictions
-train_preds = np.expm1(model.predict(X_train))
-train_true = np.expm1(y_train)
-
-# Validation set predictions
-valid_preds = np.expm1(model.predict(X_valid))
-valid_true = np.expm1(y_valid)
-
-# Calculate comprehensive metrics
-train_metrics = calculate_all_metrics(
-    train_true, 
-    train_preds, 
-    y_train=None,
-    exclude_zeros=True  # Exclude zeros from MAPE
-)
-
-valid_metrics = calculate_all_metrics(
-    valid_true, 
-    valid_preds, 
-    y_train=train_true,  # For MASE calculation
-    exclude_zeros=True  # Exclude zeros from MAPE
-)
+# An accepted warm start fit its new trees on the last INCREMENTAL_WINDOW_DAYS,
+# which lie inside the validation period: those figures are not a holdout.
+# The refresh's own holdout WAPE (trees fit without its last days) is.
+holdout_validation = training_mode != "incremental"
 
 # Print metrics
 print_metrics(train_metrics, "TRAINING SET PERFORMANCE")
-print_metrics(valid_metrics, "VALIDATION SET PERFORMANCE")
+print_metrics(
+    valid_metrics,
+    "VALIDATION SET PERFORMANCE" if holdout_validation
+    else "VALIDATION SET PERFORMANCE (NOT HOLDOUT: includes the refresh window)"
+)
 
 # Compare metrics
 compare_metrics(train_metrics, valid_metrics)
@@ -141,8 +222,9 @@ print(f"\n{'='*70}")
 print(f"🎯 DATA SPLIT INFORMATION")
 print(f"{'='*70}")
 print(f"\n   Split Date: {split_date}")
-print(f"   Training: {len(X_train):,} records ({len(X_train)/len(df)*100:.1f}%)")
-print(f"   Validation: {len(X_valid):,} records ({len(X_valid)/len(df)*100:.1f}%)")
+total_records = train_records + valid_records
+print(f"   Training: {train_records:,} records ({train_records/total_records*100:.1f}%)")
+print(f"   Validation: {valid_records:,} records ({valid_records/total_records*100:.1f}%)")
 print(f"\n   Training Zero-Demand: {train_metrics['zero_records']:,} ({train_metrics['zero_percentage']:.1f}%)")
 print(f"   Validation Zero-Demand: {valid_metrics['zero_records']:,} ({valid_metrics['zero_percentage']:.1f}%)")
 
@@ -151,9 +233,9 @@ print(f"\n{'='*70}")
 print(f"📊 PREDICTION RANGE")
 print(f"{'='*70}")
 print(f"\n   Training:")
-print(f"      Min: {train_preds.min():.2f}, Max: {train_preds.max():.2f}, Mean: {train_preds.mean():.2f}")
+print(f"      Min: {train_range['min']:.2f}, Max: {train_range['max']:.2f}, Mean: {train_range['mean']:.2f}")
 print(f"   Validation:")
-print(f"      Min: {valid_preds.min():.2f}, Max: {valid_preds.max():.2f}, Mean: {valid_preds.mean():.2f}")
+print(f"      Min: {valid_range['min']:.2f}, Max: {valid_range['max']:.2f}, Mean: {valid_range['mean']:.2f}")
 
 # Final interpretation
 print(f"\n{'='*70}")
@@ -161,10 +243,18 @@ print(f"🎓 FINAL MODEL ASSESSMENT")
 print(f"{'='*70}")
 
 # Use WAPE as primary metric (most robust to zeros)
-primary_accuracy = valid_metrics['wape_accuracy']
+if holdout_validation:
+    primary_accuracy = valid_metrics['wape_accuracy']
+    primary_source = "validation"
+else:
+    primary_accuracy = float(np.clip(100 - refresh_report['candidate_holdout_wape'], 0, 100))
+    primary_source = "incremental holdout"
 
-print(f"\n   PRIMARY METRIC: WAPE Accuracy = {primary_accuracy:.2f}%")
+print(f"\n   PRIMARY METRIC: WAPE Accuracy = {primary_accuracy:.2f}% ({primary_source})")
 print(f"   (WAPE is most robust to zero-demand records)")
+if not holdout_validation:
+    print(f"   (from the refresh's last {refresh_report['holdout_rows']:,} holdout rows; "
+          f"the validation figures above are in-sample)")
 
 if primary_accuracy >= 90:
     print(f"\n   🌟 EXCELLENT! Model is highly accurate")
@@ -191,6 +281,19 @@ print(f"\n{'='*70}")
 joblib.dump(model, MODEL_DIR / "demand_model.pkl")
 joblib.dump(encoders, MODEL_DIR / "encoders.pkl")
 
+# Flattened node arrays for NumPy-only, low-latency scoring
+forest_path = FlatForest.from_model(model).save(MODEL_DIR / "demand_forest.npz")
+
+# Training-period distribution the drift monitor compares uploads against
+if args.external_memory:
+    drift_reference = training_reference(
+        lambda: (clean_history(chunk) for chunk in load_history(HISTORY_PATH, chunksize=args.chunk_rows)),
+        split_date
+    )
+else:
+    drift_reference = training_reference(lambda: [frame], split_date)
+drift_path = drift_reference.save(MODEL_DIR / "drift_reference.pkl")
+
 # Save comprehensive metrics
 metrics = {
     # Training metrics
@@ -221,17 +324,65 @@ metrics = {
     'valid_zero_percentage': valid_metrics['zero_percentage'],
     
     # Data info
-    'train_records': len(X_train),
-    'valid_records': len(X_valid),
+    'train_records': train_records,
+    'valid_records': valid_records,
     'split_date': str(split_date),
     
+    # False after an accepted warm start: valid_* then include rows the
+    # added trees were fit on
+    'valid_is_holdout': holdout_validation,
+    
     # Primary metric (WAPE - most robust)
-    'primary_accuracy': valid_metrics['wape_accuracy'],
-    'primary_metric': 'WAPE'
+    'primary_accuracy': primary_accuracy,
+    'primary_metric': 'WAPE',
+    'primary_source': primary_source,
+    
+    # Hyperparameters
+    'model_params': model_params,
+    'params_source': params_source,
+    'training_mode': training_mode
 }
 
+if args.incremental:
+    metrics['incremental_refresh'] = refresh_report if previous_model is not None else {
+        'accepted': False, 'reason': 'unseen labels'
+    }
+
+if args.search and training_mode == "full":
+    print(f"💾 Best params saved to: {save_best_params(search_result)}")
+
+# =========================
+# Quantile model (optional)
+# =========================
+if args.quantiles:
+    print(f"\n🔄 Training quantile model for alphas {QUANTILE_ALPHAS}...")
+
+    # One booster, one output per alpha. The log target is fine here:
+    # quantiles survive monotonic transforms, so expm1(q) is the demand quantile.
+    # Same (tuned) hyperparameters as the point model, quantile objective.
+    quantile_model = XGBRegressor(**{
+        **load_model_params()[0],
+        'objective': "reg:quantileerror",
+        'quantile_alpha': np.array(QUANTILE_ALPHAS),
+    })
+
+    quantile_model.fit(X_train, y_train)
+
+    valid_quantiles = np.expm1(quantile_model.predict(X_valid)).reshape(len(X_valid), -1)
+
+    print(f"\n📊 QUANTILE COVERAGE (validation):")
+    for i, alpha in enumerate(QUANTILE_ALPHAS):
+        coverage = np.mean(valid_true.values <= valid_quantiles[:, i]) * 100
+        metrics[f'valid_coverage_p{int(round(alpha * 100))}'] = coverage
+        print(f"   P{int(round(alpha * 100))}: {coverage:.2f}% of actuals at or below (target {alpha * 100:.0f}%)")
+
+    save_quantile_model(quantile_model, encoders, MODEL_DIR / "quantile_model.pkl")
+    print(f"✅ Quantile model saved to: {MODEL_DIR / 'quantile_model.pkl'}")
+
 joblib.dump(metrics, MODEL_DIR / "model_metrics.pkl")
 
 print("\n✅ Weekly demand model trained & saved")
 print(f"✅ Model metrics saved to: {MODEL_DIR / 'model_metrics.pkl'}")
-print(f"\n🎯 PRIMARY ACCURACY (WAPE): {valid_metrics['wape_accuracy']:.2f}%")
+print(f"✅ Flattened forest exported to: {forest_path}")
+print(f"✅ Drift reference ({drift_reference.sketch.rows:,} rows) saved to: {drift_path}")
+print(f"\n🎯 PRIMARY ACCURACY (WAPE): {primary_accuracy:.2f}% ({primary_source})")
@@ -0,0 +1,269 @@
+"""
+Training Engine
+The one load → clean → featurize → encode → split → fit pipeline behind
+train.py and the /train_model endpoint.
+
+The cleaned, featurized history (labels still unencoded) is cached on disk
+under a content address: the history file's size and SHA-256 plus
+CLEAN_VERSION and FEATURE_VERSION. A retrain with other hyperparameters,
+for another store or from another process skips straight to encoding and
+fit; changing the data, the cleaning or the features changes the key. Encoding happens after
+featurization, which yields exactly the rows and order of encoding first
+(label codes sort like the labels).
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+from xgboost import XGBRegressor
+
+from config import TRAIN_SPLIT_QUANTILE, SAMPLE_RATES, RANDOM_STATE
+from data_loader import (
+    HISTORY_PATH,
+    CATEGORICAL_COLUMNS,
+    CLEAN_VERSION,
+    load_history,
+    clean_history,
+    encode_categoricals,
+    fit_encoders,
+)
+from features import create_features, FEATURES, TARGET, FEATURE_VERSION
+from metrics import calculate_all_metrics
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = Path(os.environ.get("INVENTORY_FEATURE_CACHE", BASE_DIR / "cache" / "features"))
+CACHE_KEEP = 2   # featurized frames kept on disk (newest first)
+
+# In-process memo: (path, size, mtime_ns) → manifest, and key → frame
+_manifests = {}
+_frames = {}
+
+
+# =========================
+# Content addressing
+# =========================
+def data_manifest(path=HISTORY_PATH):
+    """
+    Content identity of the history file
+
+    The SHA-256 is memoized per (size, mtime), so an unchanged file is
+    hashed once per process.
+
+    Returns:
+        Dictionary {'path', 'bytes', 'sha256'}
+    """
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+
+    if memo_key not in _manifests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _manifests[memo_key] = {'path': str(path), 'bytes': stat.st_size, 'sha256': digest.hexdigest()}
+
+    return _manifests[memo_key]
+
+
+def cache_key(manifest, feature_version=FEATURE_VERSION, clean_version=CLEAN_VERSION):
+    """
+    Cache address of the featurized frame for one data manifest
+    """
+    payload = json.dumps({
+        'bytes': manifest['bytes'],
+        'sha256': manifest['sha256'],
+        'clean_version': clean_version,
+        'feature_version': feature_version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+# =========================
+# Featurized history
+# =========================
+def load_featurized(path=HISTORY_PATH, cache_dir=CACHE_DIR, source=None):
+    """
+    Cleaned, featurized history with unencoded labels, from the cache when
+    the data and feature version are unchanged
+
+    The returned frame is shared with the in-process memo: derive frames
+    from it (encode_frame does) instead of modifying it.
+
+    Args:
+        path: History CSV
+        cache_dir: Directory of the featurized frames
+        source: Optional history source (data_loader.HistoryCache or
+            db_loader.PostgresHistory) read instead of path
+
+    Returns:
+        (frame, info) where info = {'key', 'source': 'memory' | 'disk' | 'built'}
+    """
+    key = cache_key(source.manifest() if source is not None else data_manifest(path))
+
+    if key in _frames:
+        return _frames[key], {'key': key, 'source': 'memory'}
+
+    cache_dir = Path(cache_dir)
+    cached = cache_dir / f"{key}.pkl"
+
+    if cached.exists():
+        frame, origin = joblib.load(cached), 'disk'
+    else:
+        history = source.get() if source is not None else load_history(path)
+        frame, origin = create_features(clean_history(history)), 'built'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix('.tmp')
+        joblib.dump(frame, tmp)
+        os.replace(tmp, cached)
+        _prune(cache_dir)
+
+    _frames.clear()
+    _frames[key] = frame
+    return frame, {'key': key, 'source': origin}
+
+
+def _prune(cache_dir, keep=CACHE_KEEP):
+    entries = sorted(cache_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[keep:]:
+        stale.unlink(missing_ok=True)
+
+
+def encode_frame(frame, encoders=None, store_id=None, columns=CATEGORICAL_COLUMNS):
+    """
+    Model-ready copy of a featurized frame
+
+    Args:
+        frame: Output of load_featurized (left untouched)
+        encoders: Fitted encoders to apply (None: fit new ones on the rows)
+        store_id: Restrict to one store label (per-store models)
+        columns: Label columns to fit when encoders is None
+
+    Returns:
+        (encoded frame, encoders)
+    """
+    df = frame[frame['store_id'] == store_id] if store_id is not None else frame.copy(deep=False)
+
+    if encoders is None:
+        encoders = fit_encoders(df, columns)
+    else:
+        encode_categoricals(df, encoders)
+
+    return df, encoders
+
+
+# =========================
+# Split & fit
+# =========================
+def time_split(df, quantile=TRAIN_SPLIT_QUANTILE, features=FEATURES, target=TARGET):
+    """
+    Time-safe split: rows dated up to the date quantile train
+
+    Returns:
+        (split_date, X_train, y_train, X_valid, y_valid)
+    """
+    split_date = df['date'].quantile(quantile)
+    is_train = df['date'] <= split_date
+
+    return (
+        split_date,
+        df.loc[is_train, features], df.loc[is_train, target],
+        df.loc[~is_train, features], df.loc[~is_train, target],
+    )
+
+
+def fit_model(X_train, y_train, params):
+    """
+    XGBRegressor with params, fit on the training rows
+    """
+    model = XGBRegressor(**params)
+    model.fit(X_train, y_train)
+    return model
+
+
+# =========================
+# Sampled experimental fits
+# =========================
+def stratified_sample(df, rate, seed=RANDOM_STATE, keys=('store_id', 'category')):
+    """
+    Rows sampled at `rate` within every store × category × zero-demand
+    stratum (at least one row each), in their original order
+
+    Features are computed on the full history beforehand, so sampled rows
+    keep their real lags; the boolean mask preserves series/date order.
+    """
+    strata = df[list(keys)].assign(zero_demand=df['units_sold_7d'].to_numpy() == 0)
+    codes = strata.groupby(list(strata.columns), observed=True, sort=False).ngroup().to_numpy()
+
+    sizes = np.bincount(codes)
+    take = np.maximum(1, np.round(sizes * rate)).astype(np.int64)
+    starts = np.cumsum(sizes) - sizes
+
+    # Random rank of each row inside its stratum
+    order = np.lexsort((np.random.default_rng(seed).random(len(df)), codes))
+    rank = np.empty(len(df), dtype=np.int64)
+    rank[order] = np.arange(len(df)) - starts[codes[order]]
+
+    return df[rank < take[codes]]
+
+
+def sampling_tradeoff(df, params, rates=SAMPLE_RATES, seed=RANDOM_STATE):
+    """
+    Fit time and validation accuracy of sampled float32 fits against a
+    full fit
+
+    The split date comes from the full frame, only training rows are
+    sampled, and every fit is scored on the same full validation period.
+
+    Args:
+        df: Encoded, featurized frame (encode_frame)
+        params: XGBRegressor params
+        rates: Training-row fractions to try
+        seed: Sampling seed
+
+    Returns:
+        List of dicts (full fit first): rate, rows, fit_seconds, speedup,
+        metrics (calculate_all_metrics) and wape_accuracy_delta
+    """
+    split_date, X_train, y_train, X_valid, y_valid = time_split(df)
+    train_rows = df.loc[df['date'] <= split_date]
+    valid_true = np.expm1(y_valid)
+    X_valid32 = X_valid.astype(np.float32)
+
+    def run(rate, X, y, X_eval):
+        start = time.perf_counter()
+        model = fit_model(X, y, params)
+        seconds = time.perf_counter() - start
+        metrics = calculate_all_metrics(valid_true, np.expm1(model.predict(X_eval)), exclude_zeros=True)
+        return {'rate': rate, 'rows': len(X), 'fit_seconds': seconds, 'metrics': metrics}
+
+    results = [run(1.0, X_train, y_train, X_valid)]
+    for rate in sorted(rates):
+        sample = stratified_sample(train_rows, rate, seed)
+        results.append(run(rate, sample[FEATURES].astype(np.float32), sample[TARGET], X_valid32))
+
+    full = results[0]
+    for result in results:
+        result['speedup'] = full['fit_seconds'] / result['fit_seconds']
+        result['wape_accuracy_delta'] = result['metrics']['wape_accuracy'] - full['metrics']['wape_accuracy']
+
+    return results
+
+
+def print_sampling_report(results):
+    print(f"\n{'='*70}")
+    print(f"🧪 SAMPLED FIT TRADE-OFF (validation = full held-out period)")
+    print(f"{'='*70}")
+    print(f"\n   {'Rate':>6} {'Rows':>10} {'Fit (s)':>9} {'Speedup':>8} {'WAPE Acc':>9} {'Δ pts':>7} {'MAE':>8}")
+
+    for result in results:
+        label = "full" if result['rate'] == 1.0 else f"{result['rate']:.0%}"
+        metrics = result['metrics']
+        print(f"   {label:>6} {result['rows']:>10,} {result['fit_seconds']:>9.2f} "
+              f"{result['speedup']:>7.1f}x {metrics['wape_accuracy']:>8.2f}% "
+              f"{result['wape_accuracy_delta']:>+7.2f} {metrics['mae']:>8.2f}")
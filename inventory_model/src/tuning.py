@@ -0,0 +1,234 @@
+"""
+Hyperparameter Search
+Rolling-origin cross-validation for the demand model: the featurized
+matrix is turned into one XGBoost DMatrix, sliced once per fold, and every
+candidate trains on those slices with early stopping. Folds run in
+parallel threads (XGBoost releases the GIL), each owning its own slices,
+so the quantized histogram index is built once per fold and reused by
+every candidate.
+"""
+
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from config import (
+    MODEL_PARAMS,
+    SEARCH_SPACE,
+    CV_FOLDS,
+    CV_HORIZON_DAYS,
+    MAX_BOOST_ROUNDS,
+    EARLY_STOPPING_ROUNDS,
+    RANDOM_STATE,
+)
+from metrics import calculate_wape
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BASE_DIR / "models"
+BEST_PARAMS_PATH = MODEL_DIR / "best_params.json"
+
+
+# =========================
+# Folds & candidates
+# =========================
+def rolling_origin_folds(dates, n_folds=CV_FOLDS, horizon_days=CV_HORIZON_DAYS):
+    """
+    Expanding-window folds ending at the last date
+
+    Fold k trains on every row dated up to its origin and validates on the
+    following horizon_days; origins are horizon_days apart.
+
+    Returns:
+        List of (origin, train_rows, valid_rows), row positions as int arrays
+    """
+    dates = pd.to_datetime(np.asarray(dates)).to_numpy()
+    last = dates.max()
+    horizon = np.timedelta64(horizon_days, 'D')
+
+    folds = []
+    for k in range(n_folds, 0, -1):
+        origin = last - k * horizon
+        train_rows = np.flatnonzero(dates <= origin)
+        valid_rows = np.flatnonzero((dates > origin) & (dates <= origin + horizon))
+        if len(train_rows) and len(valid_rows):
+            folds.append((pd.Timestamp(origin), train_rows, valid_rows))
+
+    return folds
+
+
+def sample_candidates(n_trials, space=SEARCH_SPACE, base=MODEL_PARAMS, seed=RANDOM_STATE):
+    """
+    The base params plus n_trials - 1 distinct random points of the grid
+    """
+    rng = random.Random(seed)
+    names = sorted(space)
+    grid_size = int(np.prod([len(space[name]) for name in names]))
+
+    candidates = [dict(base)]
+    seen = {tuple(base.get(name) for name in names)}
+
+    while len(candidates) < min(n_trials, grid_size + 1):
+        point = tuple(rng.choice(space[name]) for name in names)
+        if point in seen:
+            continue
+        seen.add(point)
+        candidates.append({**base, **dict(zip(names, point))})
+
+    return candidates
+
+
+def native_params(params, nthread):
+    """
+    XGBRegressor params → xgb.train params (boosting rounds are set by
+    early stopping, not n_estimators)
+    """
+    params = dict(params)
+    params.pop('n_estimators', None)
+    params['seed'] = params.pop('random_state', RANDOM_STATE)
+    params['nthread'] = nthread
+    return params
+
+
+# =========================
+# Cross-validation
+# =========================
+def _run_fold(fold, candidates, nthread):
+    dtrain, dvalid, valid_true = fold
+    results = []
+
+    for params in candidates:
+        booster = xgb.train(
+            native_params(params, nthread),
+            dtrain,
+            num_boost_round=MAX_BOOST_ROUNDS,
+            evals=[(dvalid, 'valid')],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            verbose_eval=False
+        )
+        rounds = booster.best_iteration + 1
+        preds = np.expm1(booster.predict(dvalid, iteration_range=(0, rounds)))
+
+        results.append({'wape': calculate_wape(valid_true, preds), 'rounds': rounds})
+
+    return results
+
+
+def search_params(X, y, dates, n_trials=12, n_folds=CV_FOLDS,
+                  horizon_days=CV_HORIZON_DAYS, workers=None, seed=RANDOM_STATE):
+    """
+    Rolling-origin CV search, scored by mean validation WAPE
+
+    Args:
+        X: Feature frame (training period only)
+        y: log1p target aligned with X
+        dates: Row dates aligned with X
+        n_trials: Candidates to evaluate (the current defaults included)
+        n_folds, horizon_days: Fold layout
+        workers: Parallel fold threads (default: one per fold, up to CPUs)
+        seed: Candidate sampling seed
+
+    Returns:
+        Dictionary with the winning 'params' (n_estimators = mean best
+        rounds), its 'cv_wape', the 'folds' and every candidate's scores
+    """
+    folds = rolling_origin_folds(dates, n_folds, horizon_days)
+    if not folds:
+        raise ValueError("Not enough history for rolling-origin folds")
+
+    y = np.asarray(y, dtype=np.float32)
+
+    # One matrix, one slice per fold, shared by every candidate
+    dmatrix = xgb.DMatrix(X, label=y, nthread=-1)
+    fold_data = [
+        (dmatrix.slice(train_rows), dmatrix.slice(valid_rows), np.expm1(y[valid_rows]))
+        for _, train_rows, valid_rows in folds
+    ]
+
+    candidates = sample_candidates(n_trials, seed=seed)
+
+    cpus = os.cpu_count() or 1
+    workers = workers or min(len(folds), cpus)
+    nthread = max(1, cpus // workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_fold = list(pool.map(lambda fold: _run_fold(fold, candidates, nthread), fold_data))
+
+    scored = []
+    for i, params in enumerate(candidates):
+        wapes = [fold_results[i]['wape'] for fold_results in per_fold]
+        rounds = [fold_results[i]['rounds'] for fold_results in per_fold]
+        scored.append({
+            'params': {**params, 'n_estimators': int(round(np.mean(rounds)))},
+            'cv_wape': float(np.mean(wapes)),
+            'fold_wape': [float(w) for w in wapes],
+            'fold_rounds': rounds,
+        })
+
+    scored.sort(key=lambda c: c['cv_wape'])
+
+    return {
+        'params': scored[0]['params'],
+        'cv_wape': scored[0]['cv_wape'],
+        'folds': [
+            {'origin': str(origin.date()), 'train_rows': len(train_rows), 'valid_rows': len(valid_rows)}
+            for origin, train_rows, valid_rows in folds
+        ],
+        'candidates': scored,
+    }
+
+
+def print_search(result, top=5):
+    print(f"\n{'='*70}")
+    print(f"🔎 HYPERPARAMETER SEARCH (rolling-origin CV)")
+    print(f"{'='*70}")
+
+    for fold in result['folds']:
+        print(f"   Fold origin {fold['origin']}: {fold['train_rows']:,} train / {fold['valid_rows']:,} valid rows")
+
+    names = sorted(SEARCH_SPACE)
+    print(f"\n   {'Rank':<5} {'CV WAPE':>8} {'Rounds':>7}  " + "  ".join(names))
+    for rank, candidate in enumerate(result['candidates'][:top], 1):
+        params = candidate['params']
+        values = "  ".join(f"{params[name]}" for name in names)
+        print(f"   {rank:<5} {candidate['cv_wape']:>7.2f}% {params['n_estimators']:>7}  {values}")
+
+    print(f"\n   🏆 Best CV WAPE Accuracy: {100 - result['cv_wape']:.2f}%")
+
+
+# =========================
+# Persistence
+# =========================
+def save_best_params(result, path=BEST_PARAMS_PATH):
+    """
+    Store the winning config next to the model
+    """
+    path = Path(path)
+    path.write_text(json.dumps({
+        'params': result['params'],
+        'cv_wape': result['cv_wape'],
+        'folds': result['folds'],
+        'candidates': result['candidates'],
+        'searched_at': datetime.now().isoformat(timespec='seconds'),
+    }, indent=2))
+    return path
+
+
+def load_model_params(path=BEST_PARAMS_PATH):
+    """
+    Model params: config defaults, overridden by a saved search result
+
+    Returns:
+        (params dict, source label)
+    """
+    path = Path(path)
+    if path.exists():
+        saved = json.loads(path.read_text())
+        return {**MODEL_PARAMS, **saved['params']}, f"tuned ({path.name})"
+    return dict(MODEL_PARAMS), "config defaults"
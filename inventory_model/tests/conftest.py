@@ -0,0 +1,9 @@
+"""
+The modules in src/ import each other by bare name (they are run from
+src/), so the tests put src/ on the path the same way
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
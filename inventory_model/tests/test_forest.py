@@ -0,0 +1,62 @@
+"""
+FlatForest parity: the flattened forest must score history rows exactly
+like the XGBoost model it was exported from
+
+Run from inventory_model/:
+    python -m pytest tests/test_forest.py
+"""
+
+import joblib
+import numpy as np
+import pytest
+
+from data_loader import HISTORY_PATH, load_history, clean_history
+from features import create_features, FEATURES
+from forest import MODEL_DIR, FlatForest
+from training import encode_frame
+
+SAMPLE_ROWS = 2000
+
+
+@pytest.fixture(scope="module")
+def model_and_rows():
+    if not (MODEL_DIR / "demand_model.pkl").exists() or not HISTORY_PATH.exists():
+        pytest.skip("needs a trained model (train.py) and the history CSV")
+
+    model = joblib.load(MODEL_DIR / "demand_model.pkl")
+    encoders = joblib.load(MODEL_DIR / "encoders.pkl")
+
+    frame = create_features(clean_history(load_history()))
+    df, _ = encode_frame(frame, encoders)
+    X = df[FEATURES].sample(n=min(SAMPLE_ROWS, len(df)), random_state=0)
+    return model, X
+
+
+def test_predict_is_bit_identical(model_and_rows):
+    model, X = model_and_rows
+    forest = FlatForest.from_model(model)
+
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+
+def test_single_rows_are_bit_identical(model_and_rows):
+    model, X = model_and_rows
+    forest = FlatForest.from_model(model)
+
+    for i in range(20):
+        row = X.iloc[[i]]
+        np.testing.assert_array_equal(forest.predict(row), model.predict(row))
+
+
+def test_saved_export_is_reused_only_for_its_model(model_and_rows, tmp_path):
+    model, X = model_and_rows
+    path = tmp_path / "demand_forest.npz"
+    FlatForest.from_model(model).save(path)
+
+    loaded = FlatForest.for_model(model, path)
+    assert loaded.fingerprint == FlatForest.from_model(model).fingerprint
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(X))
+
+    other = model.__class__(**{**model.get_params(), 'n_estimators': 3})
+    other.fit(X, model.predict(X))
+    assert FlatForest.for_model(other, path).fingerprint != loaded.fingerprint
@@ -0,0 +1,58 @@
+"""
+sync.py: column-wise batches, and an end-to-end run against the Node
+server on a local Postgres
+
+The end-to-end test runs only when INVENTORY_SYNC_TEST_URL points at a
+server whose DATABASE_URL is a scratch database (rows use TEST-* names):
+    cd server && DATABASE_URL=postgresql://.../inventory_test npx prisma migrate deploy
+    DATABASE_URL=postgresql://.../inventory_test node src/server.js
+    INVENTORY_SYNC_TEST_URL=http://127.0.0.1:5000/api/sync python -m pytest tests/test_sync.py
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from sync import sync_batches, sync_forecasts
+
+SYNC_TEST_URL = os.environ.get("INVENTORY_SYNC_TEST_URL")
+
+
+def forecast_frame(demand):
+    return pd.DataFrame({
+        'store_id': ["TEST-S1", "TEST-S1", "TEST-S2"],
+        'product_id': ["TEST-P1", "TEST-P2", "TEST-P1"],
+        'category': ["Toys", "Groceries", "Toys"],
+        'region': ["North", "North", "South"],
+        'week_start': ["2024-01-01"] * 3,
+        'price': [10.5, 3.25, 10.5],
+        'predicted_weekly_demand': [demand, demand + 1, demand + 2],
+        'reorder_point': [demand * 1.5] * 3,
+        'order_quantity': [5.0, 0.0, 12.4],
+        'stockout_risk': [1, 0, 1],
+    })
+
+
+def test_batches_are_column_wise_and_bounded():
+    batches = list(sync_batches(forecast_frame(20.0), batch_rows=2))
+
+    assert [len(b['columns']['storeName']) for b in batches] == [2, 1]
+    first = batches[0]['columns']
+    assert first['weekStart'] == ["2024-01-01", "2024-01-01"]
+    assert first['riskLevel'] == ["HIGH", "LOW"]
+    assert batches[1]['columns']['orderQty'] == [12]
+
+
+@pytest.mark.skipif(not SYNC_TEST_URL, reason="INVENTORY_SYNC_TEST_URL is not set")
+def test_resync_updates_instead_of_duplicating(tmp_path):
+    path = tmp_path / "weekly_forecasts.csv"
+
+    forecast_frame(20.0).to_csv(path, index=False)
+    first = sync_forecasts(path, SYNC_TEST_URL, batch_rows=2)
+    forecast_frame(30.0).to_csv(path, index=False)
+    second = sync_forecasts(path, SYNC_TEST_URL, batch_rows=2)
+
+    assert first['rows'] == second['rows'] == 3
+    assert second['forecasts'] == {'inserted': 0, 'updated': 3}
+    assert second['reorders'] == {'inserted': 0, 'updated': 3}
@@ -0,0 +1,134 @@
+-- Stores and products are matched by name when the scoring run syncs
+-- (the Python service knows them by label, e.g. S001 / P0001)
+
+-- Dedupe: stores/products sharing a name are merged into the lowest id
+CREATE TEMP TABLE "StoreMerge" AS
+SELECT "id", MIN("id") OVER (PARTITION BY "name") AS "keepId" FROM "Store";
+DELETE FROM "StoreMerge" WHERE "id" = "keepId";
+
+CREATE TEMP TABLE "ProductMerge" AS
+SELECT "id", MIN("id") OVER (PARTITION BY "name") AS "keepId" FROM "Product";
+DELETE FROM "ProductMerge" WHERE "id" = "keepId";
+
+-- Inventory is unique per (storeId, productId): keep the most recently
+-- updated row of every merged pair
+DELETE FROM "Inventory" i
+USING (
+    SELECT inv."id", ROW_NUMBER() OVER (
+        PARTITION BY COALESCE(sm."keepId", inv."storeId"), COALESCE(pm."keepId", inv."productId")
+        ORDER BY inv."updatedAt" DESC, inv."id" DESC
+    ) AS "rank"
+    FROM "Inventory" inv
+    LEFT JOIN "StoreMerge" sm ON sm."id" = inv."storeId"
+    LEFT JOIN "ProductMerge" pm ON pm."id" = inv."productId"
+) ranked
+WHERE i."id" = ranked."id" AND ranked."rank" > 1;
+
+UPDATE "Inventory" t SET "storeId" = m."keepId" FROM "StoreMerge" m WHERE t."storeId" = m."id";
+UPDATE "Inventory" t SET "productId" = m."keepId" FROM "ProductMerge" m WHERE t."productId" = m."id";
+UPDATE "Sales" t SET "storeId" = m."keepId" FROM "StoreMerge" m WHERE t."storeId" = m."id";
+UPDATE "Sales" t SET "productId" = m."keepId" FROM "ProductMerge" m WHERE t."productId" = m."id";
+UPDATE "Forecast" t SET "storeId" = m."keepId" FROM "StoreMerge" m WHERE t."storeId" = m."id";
+UPDATE "Forecast" t SET "productId" = m."keepId" FROM "ProductMerge" m WHERE t."productId" = m."id";
+UPDATE "Reorder" t SET "storeId" = m."keepId" FROM "StoreMerge" m WHERE t."storeId" = m."id";
+UPDATE "Reorder" t SET "productId" = m."keepId" FROM "ProductMerge" m WHERE t."productId" = m."id";
+
+DELETE FROM "Store" WHERE "id" IN (SELECT "id" FROM "StoreMerge");
+DELETE FROM "Product" WHERE "id" IN (SELECT "id" FROM "ProductMerge");
+
+DROP TABLE "StoreMerge";
+DROP TABLE "ProductMerge";
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Store_name_key" ON "Store"("name");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Product_name_key" ON "Product"("name");
+
+-- AlterTable
+ALTER TABLE "Forecast" ADD COLUMN "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- AlterTable: existing reorders are dated by the week they were created in
+ALTER TABLE "Reorder" ADD COLUMN "weekStart" TIMESTAMP(3),
+ADD COLUMN "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+UPDATE "Reorder" SET "weekStart" = date_trunc('week', "createdAt");
+
+ALTER TABLE "Reorder" ALTER COLUMN "weekStart" SET NOT NULL;
+
+-- Dedupe: one forecast and one reorder per (storeId, productId, weekStart),
+-- the newest (what the sync's upsert would have left)
+DELETE FROM "Forecast" f
+USING (
+    SELECT "id", ROW_NUMBER() OVER (
+        PARTITION BY "storeId", "productId", "weekStart" ORDER BY "createdAt" DESC, "id" DESC
+    ) AS "rank"
+    FROM "Forecast"
+) ranked
+WHERE f."id" = ranked."id" AND ranked."rank" > 1;
+
+DELETE FROM "Reorder" r
+USING (
+    SELECT "id", ROW_NUMBER() OVER (
+        PARTITION BY "storeId", "productId", "weekStart" ORDER BY "createdAt" DESC, "id" DESC
+    ) AS "rank"
+    FROM "Reorder"
+) ranked
+WHERE r."id" = ranked."id" AND ranked."rank" > 1;
+
+-- CreateIndex: upsert key of the sync
+CREATE UNIQUE INDEX "Forecast_storeId_productId_weekStart_key" ON "Forecast"("storeId", "productId", "weekStart");
+
+-- CreateIndex: upsert key of the sync
+CREATE UNIQUE INDEX "Reorder_storeId_productId_weekStart_key" ON "Reorder"("storeId", "productId", "weekStart");
+
+-- CreateIndex: keyset pagination of GET /api/reorders (newest first)
+CREATE INDEX "Reorder_createdAt_id_idx" ON "Reorder"("createdAt" DESC, "id" DESC);
+
+-- CreateTable (declared in schema.prisma, missing from the init migration)
+CREATE TABLE "UploadedData" (
+    "id" SERIAL NOT NULL,
+    "storeId" TEXT NOT NULL,
+    "productId" TEXT NOT NULL,
+    "date" TIMESTAMP(3) NOT NULL,
+    "category" TEXT NOT NULL,
+    "region" TEXT NOT NULL,
+    "inventoryLevel" INTEGER NOT NULL,
+    "unitsSold" INTEGER NOT NULL,
+    "unitsOrdered" INTEGER NOT NULL,
+    "demandForecast" DOUBLE PRECISION NOT NULL,
+    "price" DOUBLE PRECISION NOT NULL,
+    "discount" DOUBLE PRECISION NOT NULL,
+    "weatherCondition" TEXT NOT NULL,
+    "holidayPromotion" INTEGER NOT NULL,
+    "competitorPricing" DOUBLE PRECISION NOT NULL,
+    "seasonality" TEXT NOT NULL,
+    "uploadedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "UploadedData_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable (declared in schema.prisma, missing from the init migration)
+CREATE TABLE "TrainedModel" (
+    "id" SERIAL NOT NULL,
+    "storeId" TEXT NOT NULL,
+    "modelPath" TEXT NOT NULL,
+    "encoderPath" TEXT NOT NULL,
+    "accuracy" DOUBLE PRECISION NOT NULL,
+    "trainedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "recordCount" INTEGER NOT NULL,
+
+    CONSTRAINT "TrainedModel_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "UploadedData_storeId_idx" ON "UploadedData"("storeId");
+
+-- CreateIndex
+CREATE INDEX "UploadedData_productId_idx" ON "UploadedData"("productId");
+
+-- CreateIndex
+CREATE INDEX "UploadedData_date_idx" ON "UploadedData"("date");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "TrainedModel_storeId_key" ON "TrainedModel"("storeId");
@@ -0,0 +1,28 @@
+-- Composite indexes for the keyset-paginated list routes: one series
+-- (storeId, productId) or one store over a time range, newest first.
+-- Each index ends with "id" so the (time, id) keyset predicate and the
+-- ORDER BY ... DESC, id DESC are served by a backward index scan.
+
+-- CreateIndex
+CREATE INDEX "Sales_storeId_productId_date_id_idx" ON "Sales"("storeId", "productId", "date", "id");
+
+-- CreateIndex
+CREATE INDEX "Sales_storeId_date_id_idx" ON "Sales"("storeId", "date", "id");
+
+-- CreateIndex
+CREATE INDEX "Forecast_storeId_weekStart_id_idx" ON "Forecast"("storeId", "weekStart", "id");
+
+-- CreateIndex
+CREATE INDEX "Reorder_storeId_productId_createdAt_id_idx" ON "Reorder"("storeId", "productId", "createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "Reorder_storeId_createdAt_id_idx" ON "Reorder"("storeId", "createdAt", "id");
+
+-- DropIndex: covered by the composite indexes below (leading column)
+DROP INDEX "UploadedData_storeId_idx";
+
+-- CreateIndex
+CREATE INDEX "UploadedData_storeId_productId_date_id_idx" ON "UploadedData"("storeId", "productId", "date", "id");
+
+-- CreateIndex
+CREATE INDEX "UploadedData_storeId_date_id_idx" ON "UploadedData"("storeId", "date", "id");
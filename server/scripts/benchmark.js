@@ -0,0 +1,193 @@
+// Seeded query benchmark for the keyset-paginated list routes
+//
+// Seeds BENCH-* stores/products with generate_series (default 50 stores ×
+// 200 products × 365 days = 3.65M Sales rows, plus weekly Forecast and
+// Reorder rows), then times the queries the routes run: first pages per
+// series and per store, a deep keyset page, and the OFFSET equivalent.
+//
+// Usage (use a scratch database):
+//   DATABASE_URL=postgresql://.../inventory_bench npx prisma migrate deploy
+//   DATABASE_URL=postgresql://.../inventory_bench npm run benchmark -- --seed
+//   npm run benchmark -- --seed --stores 100 --products 500 --days 730
+//   npm run benchmark                 # re-run the queries on existing data
+//   npm run benchmark -- --reset      # delete the BENCH-* rows and reseed
+
+require("dotenv").config();
+const prisma = require("../src/db");
+const { keysetList } = require("../src/pagination");
+
+const DEFAULTS = { stores: 50, products: 200, days: 365, repeats: 20, pages: 50, limit: 100 };
+const START = "2023-01-02"; // a Monday
+
+function parseArgs(argv) {
+  const args = { ...DEFAULTS, seed: false, reset: false };
+  for (let i = 0; i < argv.length; i++) {
+    const key = argv[i].replace(/^--/, "");
+    if (key === "seed" || key === "reset") args[key] = true;
+    else if (key in DEFAULTS) args[key] = parseInt(argv[++i], 10);
+  }
+  if (args.reset) args.seed = true;
+  return args;
+}
+
+// =========================
+// Seeding
+// =========================
+async function reset() {
+  const stores = `SELECT "id" FROM "Store" WHERE "name" LIKE 'BENCH-S%'`;
+  for (const table of ["Sales", "Forecast", "Reorder", "Inventory"]) {
+    await prisma.$executeRawUnsafe(`DELETE FROM "${table}" WHERE "storeId" IN (${stores})`);
+  }
+  await prisma.$executeRawUnsafe(`DELETE FROM "Store" WHERE "name" LIKE 'BENCH-S%'`);
+  await prisma.$executeRawUnsafe(`DELETE FROM "Product" WHERE "name" LIKE 'BENCH-P%'`);
+}
+
+async function seed({ stores, products, days }) {
+  await prisma.$executeRawUnsafe(`
+    INSERT INTO "Store" ("name", "region")
+    SELECT 'BENCH-S' || lpad(s::text, 4, '0'), 'Region ' || (s % 4)
+    FROM generate_series(1, $1::int) s
+    ON CONFLICT ("name") DO NOTHING`, stores);
+
+  await prisma.$executeRawUnsafe(`
+    INSERT INTO "Product" ("name", "category", "price")
+    SELECT 'BENCH-P' || lpad(p::text, 5, '0'), 'Category ' || (p % 5), 10 + (p % 90)
+    FROM generate_series(1, $1::int) p
+    ON CONFLICT ("name") DO NOTHING`, products);
+
+  const series = `"Store" s, "Product" p
+    WHERE s."name" LIKE 'BENCH-S%' AND p."name" LIKE 'BENCH-P%'`;
+
+  // Rows go in in date order, the way daily uploads arrive
+  await prisma.$executeRawUnsafe(`
+    INSERT INTO "Sales" ("storeId", "productId", "date", "unitsSold", "discount", "holiday")
+    SELECT s."id", p."id", d, (random() * 200)::int, (random() * 20)::int, random() < 0.05
+    FROM generate_series($1::timestamp, $1::timestamp + ($2::int - 1) * interval '1 day', interval '1 day') d,
+         ${series}
+    ORDER BY d`, START, days);
+
+  const weeks = `generate_series($1::timestamp, $1::timestamp + ($2::int - 1) * interval '1 day', interval '7 days') w`;
+
+  await prisma.$executeRawUnsafe(`
+    INSERT INTO "Forecast" ("storeId", "productId", "weekStart", "demand", "createdAt")
+    SELECT s."id", p."id", w, random() * 1000, w - interval '1 day'
+    FROM ${weeks}, ${series}
+    ORDER BY w
+    ON CONFLICT ("storeId", "productId", "weekStart") DO NOTHING`, START, days);
+
+  await prisma.$executeRawUnsafe(`
+    INSERT INTO "Reorder" ("storeId", "productId", "weekStart", "demand", "reorderPoint", "orderQty", "riskLevel", "createdAt")
+    SELECT s."id", p."id", w, random() * 1000, random() * 1200, (random() * 500)::int,
+           CASE WHEN random() < 0.3 THEN 'HIGH' ELSE 'LOW' END,
+           w - interval '1 day' + random() * interval '1 hour'
+    FROM ${weeks}, ${series}
+    ORDER BY w
+    ON CONFLICT ("storeId", "productId", "weekStart") DO NOTHING`, START, days);
+
+  await prisma.$executeRawUnsafe(`ANALYZE "Sales", "Forecast", "Reorder"`);
+}
+
+// =========================
+// Timing
+// =========================
+async function median(fn, repeats) {
+  await fn(); // warm-up
+  const times = [];
+  for (let i = 0; i < repeats; i++) {
+    const start = process.hrtime.bigint();
+    await fn();
+    times.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  times.sort((a, b) => a - b);
+  return times[Math.floor(times.length / 2)];
+}
+
+// Cursor of page `pages` of a keyset listing (walked once, not timed)
+async function deepCursor(delegate, query, field, pages) {
+  let cursor;
+  for (let i = 0; i < pages; i++) {
+    const { body } = await keysetList(delegate, { ...query, cursor }, field);
+    if (!body.nextCursor) break;
+    cursor = body.nextCursor;
+  }
+  return cursor;
+}
+
+async function run(args) {
+  const store = await prisma.store.findFirst({ where: { name: { startsWith: "BENCH-S" } } });
+  const product = await prisma.product.findFirst({ where: { name: { startsWith: "BENCH-P" } } });
+  if (!store || !product) throw new Error("No BENCH-* rows: run with --seed first");
+
+  const counts = {
+    Sales: await prisma.sales.count(),
+    Forecast: await prisma.forecast.count(),
+    Reorder: await prisma.reorder.count(),
+  };
+  console.log("\n📦 Rows:", Object.entries(counts).map(([t, n]) => `${t} ${n.toLocaleString()}`).join(", "));
+
+  const limit = String(args.limit);
+  const from = START;
+  const tables = [
+    ["Sales", prisma.sales, "date"],
+    ["Forecast", prisma.forecast, "weekStart"],
+    ["Reorder", prisma.reorder, "createdAt"],
+  ];
+
+  console.log(`\n⏱️  MEDIAN LATENCY (${args.repeats} runs, limit ${args.limit})`);
+  console.log(`   ${"Table".padEnd(9)} ${"Query".padEnd(34)} ${"ms".padStart(9)}`);
+
+  for (const [name, delegate, field] of tables) {
+    const seriesQuery = { storeId: String(store.id), productId: String(product.id), from, limit };
+    const storeQuery = { storeId: String(store.id), from, limit };
+    const cursor = await deepCursor(delegate, storeQuery, field, args.pages);
+
+    const cases = [
+      ["series, first page", () => keysetList(delegate, seriesQuery, field)],
+      ["store, first page", () => keysetList(delegate, storeQuery, field)],
+      [`store, keyset page ${args.pages + 1}`, () => keysetList(delegate, { ...storeQuery, cursor }, field)],
+      [`store, OFFSET page ${args.pages + 1}`, () => delegate.findMany({
+        where: { storeId: store.id, [field]: { gte: new Date(from) } },
+        orderBy: [{ [field]: "desc" }, { id: "desc" }],
+        skip: args.pages * args.limit,
+        take: args.limit,
+      })],
+    ];
+
+    for (const [label, fn] of cases) {
+      const ms = await median(fn, args.repeats);
+      console.log(`   ${name.padEnd(9)} ${label.padEnd(34)} ${ms.toFixed(2).padStart(9)}`);
+    }
+  }
+
+  // The plan of the per-store page shows which index serves it
+  const plan = await prisma.$queryRawUnsafe(`
+    EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT)
+    SELECT * FROM "Sales" WHERE "storeId" = $1 AND "date" >= $2::timestamp
+    ORDER BY "date" DESC, "id" DESC LIMIT $3`, store.id, from, args.limit + 1);
+  console.log("\n🔍 Sales per-store page plan:");
+  for (const row of plan) console.log(`   ${row["QUERY PLAN"]}`);
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+
+  if (args.reset) {
+    console.log("🧹 Deleting BENCH-* rows...");
+    await reset();
+  }
+  if (args.seed) {
+    console.log(`🌱 Seeding ${args.stores} stores × ${args.products} products × ${args.days} days...`);
+    const start = Date.now();
+    await seed(args);
+    console.log(`   done in ${((Date.now() - start) / 1000).toFixed(1)}s`);
+  }
+
+  await run(args);
+}
+
+main()
+  .catch((err) => {
+    console.error(err);
+    process.exitCode = 1;
+  })
+  .finally(() => prisma.$disconnect());
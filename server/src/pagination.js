@@ -0,0 +1,106 @@
+// Keyset pagination helpers: a cursor is the (timestamp, id) of the last
+// row of a page, so the next page is an index range scan, not an OFFSET
+
+const DEFAULT_LIMIT = 100;
+const MAX_LIMIT = 1000;
+
+function pageLimit(value) {
+  const limit = parseInt(value, 10);
+  if (Number.isNaN(limit)) return DEFAULT_LIMIT;
+  return Math.min(Math.max(limit, 1), MAX_LIMIT);
+}
+
+function encodeCursor(row, field) {
+  return Buffer.from(`${row[field].toISOString()}|${row.id}`).toString("base64url");
+}
+
+// → { at: Date, id: Int } or null when the cursor is malformed
+function decodeCursor(cursor) {
+  const [at, id] = Buffer.from(String(cursor), "base64url").toString().split("|");
+  const date = new Date(at);
+  const rowId = parseInt(id, 10);
+  if (Number.isNaN(date.getTime()) || Number.isNaN(rowId)) return null;
+  return { at: date, id: rowId };
+}
+
+// Rows strictly after the cursor in (field DESC, id DESC) order
+function afterCursor(cursor, field) {
+  return {
+    OR: [
+      { [field]: { lt: cursor.at } },
+      { [field]: cursor.at, id: { lt: cursor.id } },
+    ],
+  };
+}
+
+// One page from `limit + 1` fetched rows
+function page(rows, limit, field) {
+  const items = rows.slice(0, limit);
+  return {
+    items,
+    nextCursor: rows.length > limit ? encodeCursor(items[items.length - 1], field) : null,
+  };
+}
+
+// ?storeId=&productId=&from=&to= → Prisma where (dates inclusive), or an error
+function listFilters(query, field, idType = "int") {
+  const where = {};
+
+  for (const key of ["storeId", "productId"]) {
+    if (query[key] === undefined) continue;
+    if (idType === "int") {
+      const id = parseInt(query[key], 10);
+      if (Number.isNaN(id)) return { error: `${key} must be an integer` };
+      where[key] = id;
+    } else {
+      where[key] = String(query[key]);
+    }
+  }
+
+  const range = {};
+  for (const [key, op] of [["from", "gte"], ["to", "lte"]]) {
+    if (query[key] === undefined) continue;
+    const date = new Date(query[key]);
+    if (Number.isNaN(date.getTime())) return { error: `${key} must be a date` };
+    range[op] = date;
+  }
+  if (Object.keys(range).length) where[field] = range;
+
+  return { where };
+}
+
+// One keyset page of a model, newest `field` first, with the list filters
+// → { status, body }
+async function keysetList(delegate, query, field, { idType = "int", include } = {}) {
+  const { where, error } = listFilters(query, field, idType);
+  if (error) return { status: 400, body: { error } };
+
+  const conditions = [where];
+  if (query.cursor) {
+    const cursor = decodeCursor(query.cursor);
+    if (!cursor) return { status: 400, body: { error: "Invalid cursor" } };
+    conditions.push(afterCursor(cursor, field));
+  }
+
+  const limit = pageLimit(query.limit);
+  const rows = await delegate.findMany({
+    where: { AND: conditions },
+    orderBy: [{ [field]: "desc" }, { id: "desc" }],
+    take: limit + 1,
+    include,
+  });
+
+  return { status: 200, body: page(rows, limit, field) };
+}
+
+module.exports = {
+  DEFAULT_LIMIT,
+  MAX_LIMIT,
+  pageLimit,
+  encodeCursor,
+  decodeCursor,
+  afterCursor,
+  page,
+  listFilters,
+  keysetList,
+};
@@ -1,5 +1,6 @@
 const express = require("express");
 const prisma = require("../db");
+const { keysetList } = require("../pagination");
 
 const router = express.Router();
 
@@ -13,6 +14,27 @@ router.get("/", async (req, res) => {
   res.json(inventory);
 });
 
+// Keyset-paginated history, newest first:
+//   ?storeId=&productId=&from=&to=&limit=100&cursor=<nextCursor>
+
+// GET /api/inventory/sales (from/to bound date)
+router.get("/sales", async (req, res) => {
+  const { status, body } = await keysetList(prisma.sales, req.query, "date");
+  res.status(status).json(body);
+});
+
+// GET /api/inventory/forecasts (from/to bound weekStart)
+router.get("/forecasts", async (req, res) => {
+  const { status, body } = await keysetList(prisma.forecast, req.query, "weekStart");
+  res.status(status).json(body);
+});
+
+// GET /api/inventory/uploads (UploadedData: storeId/productId are labels, e.g. S001)
+router.get("/uploads", async (req, res) => {
+  const { status, body } = await keysetList(prisma.uploadedData, req.query, "date", { idType: "string" });
+  res.status(status).json(body);
+});
+
 router.get("/:id", async (req, res) => {
   const inventory = await prisma.inventory.findUnique({
     where: { id: parseInt(req.params.id) },
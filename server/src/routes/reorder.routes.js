@@ -1,13 +1,15 @@
 const express = require("express");
 const prisma = require("../db");
+const { keysetList } = require("../pagination");
 
 const router = express.Router();
 
+// GET /api/reorders?storeId=&productId=&from=&to=&limit=100&cursor=...
+// Newest first (from/to bound createdAt); pass `nextCursor` back as
+// `cursor` for the next page
 router.get("/", async (req, res) => {
-  const reorders = await prisma.reorder.findMany({
-    orderBy: { createdAt: "desc" },
-  });
-  res.json(reorders);
+  const { status, body } = await keysetList(prisma.reorder, req.query, "createdAt");
+  res.status(status).json(body);
 });
 
 module.exports = router;
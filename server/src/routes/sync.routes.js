@@ -0,0 +1,140 @@
+const express = require("express");
+const prisma = require("../db");
+
+const router = express.Router();
+
+// Rows accepted per request (the Python client sends 5,000 by default)
+const MAX_BATCH_ROWS = 20000;
+
+// Column-wise batch: one array per field, all the same length
+const FIELDS = {
+  storeName: "string",
+  region: "string",
+  productName: "string",
+  category: "string",
+  price: "number",
+  weekStart: "date",
+  demand: "number",
+  reorderPoint: "number",
+  orderQty: "number",
+  riskLevel: "string",
+};
+
+function readBatch(body) {
+  const columns = body && body.columns;
+  if (!columns || !Array.isArray(columns.storeName)) {
+    return { error: "columns.storeName is required" };
+  }
+
+  const rows = columns.storeName.length;
+  if (rows > MAX_BATCH_ROWS) {
+    return { error: `At most ${MAX_BATCH_ROWS} rows per batch` };
+  }
+
+  for (const [field, type] of Object.entries(FIELDS)) {
+    const values = columns[field];
+    if (!Array.isArray(values) || values.length !== rows) {
+      return { error: `columns.${field} must be an array of ${rows} values` };
+    }
+    const valid = values.every((v) =>
+      type === "date" ? !Number.isNaN(Date.parse(v)) : typeof v === type && v !== ""
+    );
+    if (!valid) return { error: `columns.${field} has invalid ${type} values` };
+  }
+
+  return { columns, rows };
+}
+
+// Last occurrence of every key: ON CONFLICT cannot touch a row twice
+function lastByKey(rows, key) {
+  const byKey = new Map();
+  for (let i = 0; i < rows; i++) byKey.set(key(i), i);
+  return [...byKey.values()];
+}
+
+function pick(values, indices) {
+  return indices.map((i) => values[i]);
+}
+
+function counts(returned) {
+  const inserted = returned.filter((r) => r.inserted).length;
+  return { inserted, updated: returned.length - inserted };
+}
+
+// POST /api/sync/forecasts
+// Upserts stores/products by name, then Forecast and Reorder rows keyed on
+// (storeId, productId, weekStart), all in one transaction per batch
+router.post("/forecasts", async (req, res) => {
+  const { columns: c, rows, error } = readBatch(req.body);
+  if (error) return res.status(400).json({ error });
+  if (rows === 0) return res.json({ rows: 0, forecasts: counts([]), reorders: counts([]) });
+
+  const stores = lastByKey(rows, (i) => c.storeName[i]);
+  const products = lastByKey(rows, (i) => c.productName[i]);
+  const keep = lastByKey(rows, (i) => `${c.storeName[i]}|${c.productName[i]}|${c.weekStart[i]}`);
+  const col = (field) => pick(c[field], keep);
+
+  try {
+    const result = await prisma.$transaction(async (tx) => {
+      await tx.$executeRaw`
+        INSERT INTO "Store" ("name", "region")
+        SELECT * FROM unnest(${pick(c.storeName, stores)}::text[], ${pick(c.region, stores)}::text[])
+        ON CONFLICT ("name") DO UPDATE SET "region" = EXCLUDED."region"`;
+
+      await tx.$executeRaw`
+        INSERT INTO "Product" ("name", "category", "price")
+        SELECT * FROM unnest(
+          ${pick(c.productName, products)}::text[],
+          ${pick(c.category, products)}::text[],
+          ${pick(c.price, products)}::float8[]
+        )
+        ON CONFLICT ("name") DO UPDATE
+        SET "category" = EXCLUDED."category", "price" = EXCLUDED."price"`;
+
+      const forecasts = await tx.$queryRaw`
+        INSERT INTO "Forecast" ("storeId", "productId", "weekStart", "demand")
+        SELECT s."id", p."id", r."weekStart", r."demand"
+        FROM unnest(
+          ${col("storeName")}::text[],
+          ${col("productName")}::text[],
+          ${col("weekStart")}::timestamp(3)[],
+          ${col("demand")}::float8[]
+        ) AS r("storeName", "productName", "weekStart", "demand"), "Store" s, "Product" p
+        WHERE s."name" = r."storeName" AND p."name" = r."productName"
+        ON CONFLICT ("storeId", "productId", "weekStart") DO UPDATE
+        SET "demand" = EXCLUDED."demand", "updatedAt" = CURRENT_TIMESTAMP
+        RETURNING ("xmax" = 0) AS "inserted"`;
+
+      const reorders = await tx.$queryRaw`
+        INSERT INTO "Reorder" ("storeId", "productId", "weekStart", "demand", "reorderPoint", "orderQty", "riskLevel")
+        SELECT s."id", p."id", r."weekStart", r."demand", r."reorderPoint", r."orderQty", r."riskLevel"
+        FROM unnest(
+          ${col("storeName")}::text[],
+          ${col("productName")}::text[],
+          ${col("weekStart")}::timestamp(3)[],
+          ${col("demand")}::float8[],
+          ${col("reorderPoint")}::float8[],
+          ${col("orderQty")}::int[],
+          ${col("riskLevel")}::text[]
+        ) AS r("storeName", "productName", "weekStart", "demand", "reorderPoint", "orderQty", "riskLevel"),
+          "Store" s, "Product" p
+        WHERE s."name" = r."storeName" AND p."name" = r."productName"
+        ON CONFLICT ("storeId", "productId", "weekStart") DO UPDATE
+        SET "demand" = EXCLUDED."demand",
+            "reorderPoint" = EXCLUDED."reorderPoint",
+            "orderQty" = EXCLUDED."orderQty",
+            "riskLevel" = EXCLUDED."riskLevel",
+            "updatedAt" = CURRENT_TIMESTAMP
+        RETURNING ("xmax" = 0) AS "inserted"`;
+
+      return { forecasts: counts(forecasts), reorders: counts(reorders) };
+    }, { timeout: 60000 });
+
+    res.json({ rows: keep.length, ...result });
+  } catch (err) {
+    console.error("Sync batch failed:", err);
+    res.status(500).json({ error: err.message });
+  }
+});
+
+module.exports = router;
@@ -4,9 +4,12 @@ const cors = require("cors");
 
 const inventoryRoutes = require("./routes/inventory.routes");
 const reorderRoutes = require("./routes/reorder.routes");
+const syncRoutes = require("./routes/sync.routes");
 
 const app = express();
 app.use(cors());
+// Sync batches are large column-wise payloads: parsed with their own limit
+app.use("/api/sync", express.json({ limit: "20mb" }), syncRoutes);
 app.use(express.json());
 
 app.use("/api/inventory", inventoryRoutes);
@@ -0,0 +1,123 @@
+// POST /api/sync/forecasts against a local Postgres
+//
+// Runs only when TEST_DATABASE_URL points at a scratch database with the
+// migrations applied; skipped otherwise. Rows use TEST-* store/product
+// names and are deleted afterwards.
+//
+// Usage:
+//   DATABASE_URL=postgresql://.../inventory_test npx prisma migrate deploy
+//   TEST_DATABASE_URL=postgresql://.../inventory_test npm test
+
+const { test, before, after } = require("node:test");
+const assert = require("node:assert");
+
+const DATABASE_URL = process.env.TEST_DATABASE_URL;
+const skip = DATABASE_URL ? false : "TEST_DATABASE_URL is not set";
+
+let prisma;
+let server;
+let baseUrl;
+
+const STORES = `SELECT "id" FROM "Store" WHERE "name" LIKE 'TEST-S%'`;
+
+async function cleanup() {
+  for (const table of ["Forecast", "Reorder"]) {
+    await prisma.$executeRawUnsafe(`DELETE FROM "${table}" WHERE "storeId" IN (${STORES})`);
+  }
+  await prisma.$executeRawUnsafe(`DELETE FROM "Store" WHERE "name" LIKE 'TEST-S%'`);
+  await prisma.$executeRawUnsafe(`DELETE FROM "Product" WHERE "name" LIKE 'TEST-P%'`);
+}
+
+function batch(demand) {
+  return {
+    columns: {
+      storeName: ["TEST-S1", "TEST-S1", "TEST-S2"],
+      region: ["North", "North", "South"],
+      productName: ["TEST-P1", "TEST-P2", "TEST-P1"],
+      category: ["Toys", "Groceries", "Toys"],
+      price: [10.5, 3.25, 10.5],
+      weekStart: ["2024-01-01", "2024-01-01", "2024-01-01"],
+      demand: [demand, demand + 1, demand + 2],
+      reorderPoint: [demand * 1.5, demand * 1.5, demand * 1.5],
+      orderQty: [5, 0, 12],
+      riskLevel: ["HIGH", "LOW", "HIGH"],
+    },
+  };
+}
+
+async function post(body) {
+  const response = await fetch(`${baseUrl}/api/sync/forecasts`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  return { status: response.status, body: await response.json() };
+}
+
+before(async () => {
+  if (skip) return;
+  process.env.DATABASE_URL = DATABASE_URL;
+
+  const express = require("express");
+  prisma = require("../src/db");
+  const syncRoutes = require("../src/routes/sync.routes");
+
+  const app = express();
+  app.use("/api/sync", express.json({ limit: "20mb" }), syncRoutes);
+  server = app.listen(0);
+  baseUrl = `http://127.0.0.1:${server.address().port}`;
+
+  await cleanup();
+});
+
+after(async () => {
+  if (skip) return;
+  await cleanup();
+  server.close();
+  await prisma.$disconnect();
+});
+
+test("first sync inserts, a re-run of the same week updates", { skip }, async () => {
+  const first = await post(batch(20));
+  assert.strictEqual(first.status, 200);
+  assert.deepStrictEqual(first.body, {
+    rows: 3,
+    forecasts: { inserted: 3, updated: 0 },
+    reorders: { inserted: 3, updated: 0 },
+  });
+
+  const second = await post(batch(30));
+  assert.strictEqual(second.status, 200);
+  assert.deepStrictEqual(second.body.forecasts, { inserted: 0, updated: 3 });
+  assert.deepStrictEqual(second.body.reorders, { inserted: 0, updated: 3 });
+
+  const rows = await prisma.$queryRawUnsafe(
+    `SELECT "demand" FROM "Forecast" WHERE "storeId" IN (${STORES}) ORDER BY "demand"`
+  );
+  assert.deepStrictEqual(rows.map((r) => r.demand), [30, 31, 32]);
+});
+
+test("duplicate keys in one batch keep the last row", { skip }, async () => {
+  const body = batch(40);
+  for (const values of Object.values(body.columns)) values[2] = values[0];
+  body.columns.demand[2] = 99;
+
+  const result = await post(body);
+  assert.strictEqual(result.status, 200);
+  assert.strictEqual(result.body.rows, 2);
+
+  const [row] = await prisma.$queryRawUnsafe(`
+    SELECT f."demand" FROM "Forecast" f
+    JOIN "Store" s ON s."id" = f."storeId" JOIN "Product" p ON p."id" = f."productId"
+    WHERE s."name" = 'TEST-S1' AND p."name" = 'TEST-P1'`);
+  assert.strictEqual(row.demand, 99);
+});
+
+test("malformed batches are rejected before touching the database", { skip }, async () => {
+  const body = batch(20);
+  body.columns.demand.pop();
+
+  const result = await post(body);
+  assert.strictEqual(result.status, 400);
+  assert.match(result.body.error, /columns\.demand/);
+});